@@ -0,0 +1,106 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks the embedding update throughput of `OptimizerWrapper` in
+asynchronous SGD with and without Hogwild mode.
+
+Every thread plays the role of a gRPC handler thread of the PS serving one
+worker, and keeps calling `apply_gradients` with a sparse gradient of an
+embedding table. For example:
+
+    python docs/benchmark/ps/optimizer_wrapper_benchmark.py \
+        --num_threads 32,64,128 --updates_per_thread 20
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from elasticdl.python.ps.embedding_table import EmbeddingTable
+from elasticdl.python.ps.optimizer_wrapper import OptimizerWrapper
+from elasticdl.python.ps.parameters import Parameters
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        description="OptimizerWrapper Hogwild benchmark"
+    )
+    parser.add_argument("--num_threads", type=str, default="32,64,128")
+    parser.add_argument("--updates_per_thread", type=int, default=20)
+    parser.add_argument("--vocab_size", type=int, default=100000)
+    parser.add_argument("--embedding_dim", type=int, default=16)
+    parser.add_argument("--batch_ids", type=int, default=512)
+    return parser.parse_args()
+
+
+def _create_parameters(vocab_size, embedding_dim):
+    params = Parameters()
+    table = EmbeddingTable("embedding", embedding_dim, "uniform")
+    table.set(
+        range(vocab_size),
+        np.random.rand(vocab_size, embedding_dim).astype(np.float32),
+    )
+    params.embedding_params["embedding"] = table
+    return params
+
+
+def _run(num_threads, use_hogwild, args):
+    params = _create_parameters(args.vocab_size, args.embedding_dim)
+    opt_wrapper = OptimizerWrapper(
+        tf.keras.optimizers.SGD(0.1),
+        use_async=True,
+        lookup_embedding_func=params.get_embedding_param,
+        update_embedding_func=params.set_embedding_param,
+        use_hogwild=use_hogwild,
+    )
+    barrier = threading.Barrier(num_threads + 1)
+
+    def _worker():
+        rng = np.random.RandomState()
+        barrier.wait()
+        for _ in range(args.updates_per_thread):
+            ids = rng.randint(0, args.vocab_size, args.batch_ids)
+            values = rng.rand(args.batch_ids, args.embedding_dim)
+            grad = tf.IndexedSlices(
+                tf.constant(values, dtype=tf.float32), tf.constant(ids)
+            )
+            opt_wrapper.apply_gradients([(grad, "embedding")])
+
+    threads = [threading.Thread(target=_worker) for _ in range(num_threads)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.time()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    return num_threads * args.updates_per_thread / elapsed
+
+
+def main():
+    args = _parse_args()
+    print("threads  locked(updates/s)  hogwild(updates/s)  speedup")
+    for num_threads in [int(n) for n in args.num_threads.split(",")]:
+        locked = _run(num_threads, False, args)
+        hogwild = _run(num_threads, True, args)
+        print(
+            "%7d  %17.1f  %18.1f  %7.2f"
+            % (num_threads, locked, hogwild, hogwild / locked)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,6 @@ import (
 
 	"elasticdl.org/elasticdl/pkg/common"
 	"elasticdl.org/elasticdl/pkg/proto"
-	"github.com/golang/protobuf/ptypes/empty"
 	"github.com/stretchr/testify/assert"
 	"github.com/tensorflow/tensorflow/tensorflow/go/core/framework/tensor_go_proto"
 	"google.golang.org/grpc"
@@ -59,8 +58,8 @@ func (s *masterServer) stop() {
 }
 
 // ReportVersion grpc service
-func (s *masterServer) ReportVersion(ctx context.Context, in *proto.ReportVersionRequest) (*empty.Empty, error) {
-	var res empty.Empty
+func (s *masterServer) ReportVersion(ctx context.Context, in *proto.ReportVersionRequest) (*proto.ReportVersionResponse, error) {
+	var res proto.ReportVersionResponse
 	if in.ModelVersion > s.modelVersion {
 		s.modelVersion = in.ModelVersion
 	}
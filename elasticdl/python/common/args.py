@@ -17,6 +17,7 @@ from elasticdl.python.common.log_utils import default_logger as logger
 from elasticdl_client.common.args import (
     add_common_args_between_master_and_worker,
     add_common_params,
+    add_ps_params,
     add_train_params,
 )
 from elasticdl_client.common.constants import DistributionStrategy
@@ -37,6 +38,11 @@ MODEL_SPEC_GROUP = [
 
 EVALUATION_GROUP = [
     "evaluation_steps",
+    "max_concurrent_evaluation_jobs",
+    "collapse_pending_evaluations",
+    "evaluation_sample_fraction",
+    "evaluation_early_stop_tolerance",
+    "full_evaluation_steps",
     "validation_data",
 ]
 
@@ -64,15 +70,6 @@ def pos_int(arg):
     return res
 
 
-def non_neg_int(arg):
-    res = int(arg)
-    if res < 0:
-        raise ValueError(
-            "Non-negative integer argument required. Get %s" % res
-        )
-    return res
-
-
 def print_args(args, groups=None):
     """
     Args:
@@ -159,6 +156,19 @@ def _check_master_args_validity(args):
         logger.warning(
             "grads_to_wait is set to 1 while using asynchronous SGD."
         )
+    if not 0 < args.evaluation_sample_fraction <= 1:
+        raise ValueError(
+            "evaluation_sample_fraction must be in (0, 1], got %s"
+            % args.evaluation_sample_fraction
+        )
+    if args.full_evaluation_steps < 0:
+        raise ValueError(
+            "full_evaluation_steps must be non-negative, got %s"
+            % args.full_evaluation_steps
+        )
+    if args.max_concurrent_evaluation_jobs < 1:
+        args.max_concurrent_evaluation_jobs = 1
+        logger.warning("max_concurrent_evaluation_jobs is set to 1.")
     if (
         args.num_ps_pods == 0
         and args.distribution_strategy != DistributionStrategy.ALLREDUCE
@@ -191,13 +201,25 @@ def _build_ps_args_parser():
         "--port", help="Port used by the PS pod", type=int, required=True
     )
     parser.add_argument("--master_addr", help="Master ip:port")
-
     add_common_params(parser)
     add_train_params(parser)
 
     return parser
 
 
+def get_non_default_ps_params(args):
+    """Return the names of the arguments of `add_ps_params` which are not
+    set to their defaults in `args`."""
+    parser = argparse.ArgumentParser()
+    add_ps_params(parser)
+    defaults = vars(parser.parse_args([]))
+    return [
+        name
+        for name, default in defaults.items()
+        if getattr(args, name, default) != default
+    ]
+
+
 def parse_ps_args(ps_args=None):
     parser = _build_ps_args_parser()
 
@@ -213,6 +235,43 @@ def parse_ps_args(ps_args=None):
         logger.warning(
             "grads_to_wait is set to 1 while using asynchronous SGD."
         )
+    if args.use_async and (
+        args.num_backup_workers > 0 or args.sync_deadline_secs > 0
+    ):
+        args.num_backup_workers = 0
+        args.sync_deadline_secs = 0
+        logger.warning(
+            "num_backup_workers and sync_deadline_secs are ignored while "
+            "using asynchronous SGD."
+        )
+    if (
+        args.full_checkpoint_steps
+        and args.checkpoint_steps
+        and args.full_checkpoint_steps % args.checkpoint_steps
+    ):
+        args.full_checkpoint_steps = args.checkpoint_steps * (
+            args.full_checkpoint_steps // args.checkpoint_steps + 1
+        )
+        logger.warning(
+            "full_checkpoint_steps is rounded up to %d, a multiple of "
+            "checkpoint_steps." % args.full_checkpoint_steps
+        )
+    if not args.use_async and args.ssp_staleness > 0:
+        args.ssp_staleness = 0
+        logger.warning(
+            "ssp_staleness is set to 0 while using synchronous SGD."
+        )
+    if not args.use_async and args.use_hogwild:
+        args.use_hogwild = False
+        logger.warning(
+            "use_hogwild is set to False while using synchronous SGD."
+        )
+    if args.max_evaluation_snapshots > 0 and not args.evaluation_steps:
+        args.max_evaluation_snapshots = 0
+        logger.warning(
+            "max_evaluation_snapshots is set to 0 without step-based "
+            "evaluation."
+        )
 
     return args
 
@@ -0,0 +1,197 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The chunked checkpoint format of a model shard.
+
+A model shard is saved to a directory with a small JSON manifest and raw
+binary files:
+
+- `dense-{i}.bin`: the values of the i-th non-embedding parameter.
+- `embedding-{i}.ids` and `embedding-{i}.values`: the ids in int64 and the
+  embedding vectors of the i-th embedding table, written chunk by chunk.
+
+The manifest records the dtype and shape of every file and the CRC32
+checksum of every chunk. It is written after all binary files, so a shard
+directory without a manifest is incomplete. Both saving and loading only
+hold a chunk of an embedding table in memory, so there is no limit on the
+shard size such as the 2GB limit of a protobuf message.
+"""
+
+import itertools
+import json
+import os
+import zlib
+
+import numpy as np
+
+from elasticdl.proto import elasticdl_pb2
+from elasticdl.python.common.dtypes import dtype_tensor_to_numpy
+
+MANIFEST_FILE = "manifest.json"
+DEFAULT_CHUNK_ROWS = 65536
+
+
+def _write_array(f, array):
+    array = np.ascontiguousarray(array)
+    f.write(array.tobytes())
+    return zlib.crc32(array)
+
+
+def _read_array(f, dtype, count, crc32, file_name):
+    array = np.fromfile(f, dtype=dtype, count=count)
+    if len(array) != count:
+        raise ValueError("Unexpected end of checkpoint file %s" % file_name)
+    if zlib.crc32(array) != crc32:
+        raise ValueError("Checksum mismatch in checkpoint file %s" % file_name)
+    return array
+
+
+def save_snapshot_to_chunked_dir(
+    snapshot, shard_dir, chunk_rows=DEFAULT_CHUNK_ROWS
+):
+    """Save a `ParametersSnapshot` to a directory in the chunked format.
+
+    Args:
+        snapshot: A `ParametersSnapshot` instance.
+        shard_dir: The directory to save the model shard.
+        chunk_rows: The maximum number of embedding vectors in a chunk.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest = {
+        "version": snapshot.version,
+        "dense_parameters": [],
+        "embedding_tables": [],
+    }
+    for i, (name, value) in enumerate(snapshot.dense_params.items()):
+        file_name = "dense-%d.bin" % i
+        with open(os.path.join(shard_dir, file_name), "wb") as f:
+            crc32 = _write_array(f, value)
+        manifest["dense_parameters"].append(
+            {
+                "name": name,
+                "file": file_name,
+                "dtype": value.dtype.name,
+                "shape": list(value.shape),
+                "crc32": crc32,
+            }
+        )
+
+    for i, info in enumerate(snapshot.embedding_table_infos):
+        dtype = dtype_tensor_to_numpy(info.dtype)
+        ids_file = "embedding-%d.ids" % i
+        values_file = "embedding-%d.values" % i
+        chunks = []
+        embedding_vectors = snapshot.embedding_tables.get(info.name, {})
+        items = iter(embedding_vectors.items())
+        with open(os.path.join(shard_dir, ids_file), "wb") as ids_f, open(
+            os.path.join(shard_dir, values_file), "wb"
+        ) as values_f:
+            while True:
+                chunk = list(itertools.islice(items, chunk_rows))
+                if not chunk:
+                    break
+                ids = np.fromiter(
+                    (id for id, _ in chunk), dtype=np.int64, count=len(chunk)
+                )
+                values = np.stack([v for _, v in chunk]).astype(
+                    dtype, copy=False
+                )
+                chunks.append(
+                    {
+                        "rows": len(chunk),
+                        "ids_crc32": _write_array(ids_f, ids),
+                        "values_crc32": _write_array(values_f, values),
+                    }
+                )
+        manifest["embedding_tables"].append(
+            {
+                "name": info.name,
+                "dim": info.dim,
+                "initializer": info.initializer,
+                "dtype": dtype.name,
+                "ids_file": ids_file,
+                "values_file": values_file,
+                "chunks": chunks,
+            }
+        )
+
+    manifest_path = os.path.join(shard_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+class ChunkedCheckpointReader(object):
+    """Read a model shard saved by `save_snapshot_to_chunked_dir`."""
+
+    def __init__(self, shard_dir):
+        self._shard_dir = shard_dir
+        manifest_path = os.path.join(shard_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise ValueError("Incomplete checkpoint shard %s" % shard_dir)
+        with open(manifest_path) as f:
+            self._manifest = json.load(f)
+
+    @property
+    def version(self):
+        return self._manifest["version"]
+
+    def get_embedding_table_infos(self):
+        """Returns a list of `EmbeddingTableInfo` of the embedding tables."""
+        infos = []
+        for table in self._manifest["embedding_tables"]:
+            info = elasticdl_pb2.EmbeddingTableInfo()
+            info.name = table["name"]
+            info.dim = table["dim"]
+            info.initializer = table["initializer"]
+            infos.append(info)
+        return infos
+
+    def get_dense_parameters(self):
+        """Returns a dict from the parameter name to the value."""
+        dense_params = {}
+        for param in self._manifest["dense_parameters"]:
+            file_name = os.path.join(self._shard_dir, param["file"])
+            count = int(np.prod(param["shape"]))
+            with open(file_name, "rb") as f:
+                value = _read_array(
+                    f, param["dtype"], count, param["crc32"], file_name
+                )
+            dense_params[param["name"]] = value.reshape(param["shape"])
+        return dense_params
+
+    def get_embedding_table_chunks(self):
+        """Yields `(name, ids, values)` of the embedding tables chunk by
+        chunk, where `ids` is a 1-D int64 numpy.ndarray and `values` is a
+        2-D numpy.ndarray.
+        """
+        for table in self._manifest["embedding_tables"]:
+            ids_file = os.path.join(self._shard_dir, table["ids_file"])
+            values_file = os.path.join(self._shard_dir, table["values_file"])
+            dim = table["dim"]
+            with open(ids_file, "rb") as ids_f, open(
+                values_file, "rb"
+            ) as values_f:
+                for chunk in table["chunks"]:
+                    rows = chunk["rows"]
+                    ids = _read_array(
+                        ids_f, np.int64, rows, chunk["ids_crc32"], ids_file
+                    )
+                    values = _read_array(
+                        values_f,
+                        table["dtype"],
+                        rows * dim,
+                        chunk["values_crc32"],
+                        values_file,
+                    )
+                    yield table["name"], ids, values.reshape(rows, dim)
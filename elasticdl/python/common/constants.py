@@ -82,6 +82,7 @@ class ReaderType(object):
     CSV_READER = "CSV"
     ODPS_READER = "ODPS"
     RECORDIO_READER = "RecordIO"
+    PARQUET_READER = "Parquet"
 
 
 class Initializer(object):
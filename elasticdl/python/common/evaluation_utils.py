@@ -11,7 +11,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
+
 import numpy as np
+import tensorflow as tf
 from tensorflow.python.keras import metrics as metrics_module
 
 from elasticdl.python.common.constants import MetricsDictKey
@@ -60,16 +63,40 @@ class EvaluationMetrics(object):
                         metric, name=metric_name
                     )
 
-    def update_evaluation_metrics(self, model_outputs, labels):
+    def update_evaluation_metrics(self, model_outputs, labels, additive=None):
+        """Updates the metrics with the model outputs and labels.
+
+        Args:
+            model_outputs: A dictionary from the output name to the outputs.
+            labels: The labels.
+            additive: If True or False, only the metrics whose states are
+                additive or not are updated. See `is_additive_metric`.
+        """
         for key in model_outputs:
             metrics = self._metrics_dict.get(key, {})
             if not metrics:
                 continue
             outputs = model_outputs.get(key)
             for metric_inst in metrics.values():
-                self._update_metric_by_small_chunk(
-                    metric_inst, labels, outputs
-                )
+                if (
+                    additive is not None
+                    and is_additive_metric(metric_inst) != additive
+                ):
+                    continue
+                if isinstance(metric_inst, StreamingGroupAUC):
+                    metric_inst.update_state(
+                        labels,
+                        outputs,
+                        groups=model_outputs[metric_inst.group_output_name],
+                    )
+                elif isinstance(metric_inst, StreamingMetric):
+                    # Streaming metrics update the states with numpy, so
+                    # the outputs need not to be split into small chunks.
+                    metric_inst.update_state(labels, outputs)
+                else:
+                    self._update_metric_by_small_chunk(
+                        metric_inst, labels, outputs
+                    )
 
     def get_evaluation_summary(self):
         if self._model_have_multiple_outputs:
@@ -87,6 +114,53 @@ class EvaluationMetrics(object):
             ].items()
         }
 
+    def has_non_additive_metrics(self):
+        """Returns True if the states of some metrics cannot be merged by
+        `merge_metric_states`, so they need the model outputs and labels.
+        """
+        return any(
+            not is_additive_metric(metric_inst)
+            for metrics in self._metrics_dict.values()
+            for metric_inst in metrics.values()
+        )
+
+    def get_metric_states(self):
+        """Returns the states of the additive metrics in a dictionary of
+        `{output_name: {metric_name: values}}`, where `values` is a list
+        of the values of the state variables of the metric.
+        """
+        return {
+            output_name: {
+                metric_name: (
+                    metric_inst.get_state_values()
+                    if isinstance(metric_inst, StreamingMetric)
+                    else [v.numpy() for v in metric_inst.variables]
+                )
+                for metric_name, metric_inst in metrics.items()
+                if is_additive_metric(metric_inst)
+            }
+            for output_name, metrics in self._metrics_dict.items()
+        }
+
+    def merge_metric_states(self, metric_states):
+        """Merges the metric states returned by `get_metric_states` of
+        another `EvaluationMetrics` with the same metrics, e.g. computed by
+        a worker. The states are summed up, or merged by the streaming
+        metrics, so only the states of the additive metrics are merged and
+        the others are ignored.
+        """
+        for output_name, states in metric_states.items():
+            metrics = self._metrics_dict.get(output_name, {})
+            for metric_name, values in states.items():
+                metric_inst = metrics.get(metric_name)
+                if metric_inst is None or not is_additive_metric(metric_inst):
+                    continue
+                if isinstance(metric_inst, StreamingMetric):
+                    metric_inst.merge_state_values(values)
+                    continue
+                for variable, value in zip(metric_inst.variables, values):
+                    variable.assign_add(value)
+
     def reset_metric_states(self):
         """Resets all of the metric state variables."""
         for metrics in self._metrics_dict.values():
@@ -108,3 +182,349 @@ class EvaluationMetrics(object):
         output_chunks = np.array_split(outputs, chunk_boundaries)
         for label, output in zip(label_chunks, output_chunks):
             metric.update_state(label, output)
+
+
+def _to_flat_numpy(values, dtype=np.float64):
+    if values is None:
+        return None
+    if isinstance(values, tf.Tensor):
+        values = values.numpy()
+    return np.asarray(values, dtype=dtype).reshape(-1)
+
+
+def _bucketize(predictions, num_buckets):
+    return np.clip(
+        (predictions * num_buckets).astype(np.int64), 0, num_buckets - 1
+    )
+
+
+def _roc_auc_from_histograms(positives, negatives):
+    """Computes the ROC AUC from the histograms of the positive and negative
+    weights over the prediction buckets along the last axis. A positive and
+    a negative in the same bucket count as a half correctly ordered pair.
+    """
+    positives_above = np.cumsum(positives[..., ::-1], axis=-1)[..., ::-1]
+    positives_above = positives_above - positives
+    ordered_pairs = np.sum(
+        negatives * (positives_above + positives / 2.0), axis=-1
+    )
+    total_pairs = np.sum(positives, axis=-1) * np.sum(negatives, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return ordered_pairs / total_pairs
+
+
+class StreamingMetric(metrics_module.Metric):
+    """The base class of the metrics updated with numpy for binary
+    classification, e.g. CTR models.
+
+    The states are variables in float64 whose sizes are independent of the
+    number of evaluation samples, and the states of the same metrics can be
+    merged by summation, so the metrics can be computed on workers and
+    merged by the master. `labels` and `predictions` are flattened to 1-D,
+    and `predictions` are the probabilities of the positive class.
+    """
+
+    def _add_state(self, name, shape=()):
+        return self.add_weight(
+            name, shape=shape, initializer="zeros", dtype=tf.float64
+        )
+
+    def update_state(self, labels, predictions, sample_weight=None):
+        self._update_state(
+            *self._to_numpy_inputs(labels, predictions, sample_weight)
+        )
+
+    def _update_state(self, labels, predictions, sample_weight):
+        raise NotImplementedError()
+
+    def reset_states(self):
+        for variable in self.variables:
+            variable.assign(tf.zeros_like(variable))
+
+    def get_state_values(self):
+        """Returns the states as a list of numpy.ndarray."""
+        return [v.numpy() for v in self.variables]
+
+    def merge_state_values(self, values):
+        """Merges the states returned by `get_state_values` of the same
+        metric computed on other samples.
+        """
+        for variable, value in zip(self.variables, values):
+            variable.assign_add(value)
+
+    @staticmethod
+    def _to_numpy_inputs(labels, predictions, sample_weight):
+        labels = _to_flat_numpy(labels)
+        predictions = _to_flat_numpy(predictions)
+        sample_weight = _to_flat_numpy(sample_weight)
+        if sample_weight is None:
+            sample_weight = np.ones_like(labels)
+        return labels, predictions, sample_weight
+
+
+class StreamingAUC(StreamingMetric):
+    """The area under the ROC or PR curve computed with the histograms of
+    predictions in `num_buckets` equal-width buckets in [0, 1].
+
+    For the PR curve, it computes the average precision at the bucket
+    boundaries.
+    """
+
+    def __init__(self, num_buckets=10000, curve="ROC", name=None, dtype=None):
+        if curve not in ("ROC", "PR"):
+            raise ValueError("Unsupported curve %s" % curve)
+        super(StreamingAUC, self).__init__(name=name, dtype=dtype)
+        self.num_buckets = num_buckets
+        self.curve = curve
+        self.positives = self._add_state("positives", (num_buckets,))
+        self.negatives = self._add_state("negatives", (num_buckets,))
+
+    def _update_state(self, labels, predictions, sample_weight):
+        buckets = _bucketize(predictions, self.num_buckets)
+        positive_weight = sample_weight * labels
+        self.positives.assign_add(
+            np.bincount(
+                buckets, weights=positive_weight, minlength=self.num_buckets
+            )
+        )
+        self.negatives.assign_add(
+            np.bincount(
+                buckets,
+                weights=sample_weight - positive_weight,
+                minlength=self.num_buckets,
+            )
+        )
+
+    def result(self):
+        positives = self.positives.numpy()
+        negatives = self.negatives.numpy()
+        if self.curve == "ROC":
+            auc = _roc_auc_from_histograms(positives, negatives)
+        else:
+            # Accumulate from the highest threshold to the lowest one.
+            true_positives = np.cumsum(positives[::-1])
+            false_positives = np.cumsum(negatives[::-1])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                precisions = true_positives / (
+                    true_positives + false_positives
+                )
+                auc = np.sum(
+                    np.nan_to_num(precisions) * positives[::-1]
+                ) / np.sum(positives)
+        return tf.constant(np.nan_to_num(auc), dtype=tf.float64)
+
+
+class StreamingLogLoss(StreamingMetric):
+    """The mean binary cross-entropy of the predictions."""
+
+    def __init__(self, epsilon=1e-7, name=None, dtype=None):
+        super(StreamingLogLoss, self).__init__(name=name, dtype=dtype)
+        self.epsilon = epsilon
+        self.total = self._add_state("total")
+        self.count = self._add_state("count")
+
+    def _update_state(self, labels, predictions, sample_weight):
+        predictions = np.clip(predictions, self.epsilon, 1 - self.epsilon)
+        losses = -(
+            labels * np.log(predictions)
+            + (1 - labels) * np.log(1 - predictions)
+        )
+        self.total.assign_add(np.dot(losses, sample_weight))
+        self.count.assign_add(np.sum(sample_weight))
+
+    def result(self):
+        return tf.math.divide_no_nan(self.total, self.count)
+
+
+class StreamingCalibration(StreamingMetric):
+    """The calibration of the predictions, i.e. the ratio of the sum of
+    the predictions to the sum of the labels. A well calibrated model
+    gets 1.0.
+    """
+
+    def __init__(self, name=None, dtype=None):
+        super(StreamingCalibration, self).__init__(name=name, dtype=dtype)
+        self.prediction_sum = self._add_state("prediction_sum")
+        self.label_sum = self._add_state("label_sum")
+
+    def _update_state(self, labels, predictions, sample_weight):
+        self.prediction_sum.assign_add(np.dot(predictions, sample_weight))
+        self.label_sum.assign_add(np.dot(labels, sample_weight))
+
+    def result(self):
+        return tf.math.divide_no_nan(self.prediction_sum, self.label_sum)
+
+
+class _GroupHistograms(object):
+    """The histograms of the positive and negative weights of the
+    predictions of groups. The histograms of a group are a row of dense
+    arrays, indexed by a dictionary from the group id, so adding weights
+    only touches the rows of their own groups.
+
+    It is a plain object rather than attributes of the Keras metric, since
+    Keras tracks the dictionaries and lists assigned to the attributes and
+    checks them for modifications on every access.
+    """
+
+    def __init__(self, num_buckets):
+        self.num_buckets = num_buckets
+        # A dict from group id to the row of the group
+        self.group_rows = {}
+        self.group_ids = []
+        # The arrays grow by doubling, and the rows beyond the number of
+        # groups are unused.
+        self._positives = np.zeros((0, num_buckets))
+        self._negatives = np.zeros((0, num_buckets))
+
+    @property
+    def positives(self):
+        return self._positives[: len(self.group_ids)]
+
+    @property
+    def negatives(self):
+        return self._negatives[: len(self.group_ids)]
+
+    def _get_rows(self, group_ids):
+        """Returns the rows of the unique `group_ids`, and adds the rows of
+        the new groups.
+        """
+        # No Python loop here since Keras converts `update_state` with
+        # AutoGraph, which makes every iteration of a loop expensive.
+        group_ids = group_ids.tolist()
+        new_group_ids = list(
+            itertools.filterfalse(self.group_rows.__contains__, group_ids)
+        )
+        num_groups = len(self.group_ids) + len(new_group_ids)
+        self.group_rows.update(
+            zip(new_group_ids, range(len(self.group_ids), num_groups))
+        )
+        self.group_ids.extend(new_group_ids)
+        capacity = len(self._positives)
+        if num_groups > capacity:
+            new_rows = max(num_groups, capacity * 2) - capacity
+            padding = np.zeros((new_rows, self.num_buckets))
+            self._positives = np.concatenate([self._positives, padding])
+            self._negatives = np.concatenate([self._negatives, padding])
+        return np.fromiter(
+            map(self.group_rows.__getitem__, group_ids),
+            dtype=np.int64,
+            count=len(group_ids),
+        )
+
+    def add(self, groups, buckets, positives, negatives):
+        """Adds the positive and negative weights of the samples in the
+        `buckets` of the `groups`.
+        """
+        unique_groups, inverse = np.unique(groups, return_inverse=True)
+        rows = self._get_rows(unique_groups)[inverse.reshape(-1)]
+        cells, inverse = np.unique(
+            rows * self.num_buckets + buckets, return_inverse=True
+        )
+        inverse = inverse.reshape(-1)
+        # The arrays are C-contiguous, so `reshape` returns views.
+        self._positives.reshape(-1)[cells] += np.bincount(
+            inverse, weights=positives, minlength=len(cells)
+        )
+        self._negatives.reshape(-1)[cells] += np.bincount(
+            inverse, weights=negatives, minlength=len(cells)
+        )
+
+
+class StreamingGroupAUC(StreamingMetric):
+    """The average ROC AUC of groups, e.g. users, weighted by the total
+    sample weight of the groups. Groups with only positive or only negative
+    samples are skipped.
+
+    The integer group ids are taken from the model output named
+    `group_output_name` by `EvaluationMetrics`. Each group has its own
+    histograms of predictions, so the metric is exact up to the bucketing.
+    The memory grows with the number of groups rather than the number of
+    samples.
+    """
+
+    def __init__(
+        self, group_output_name, num_buckets=200, name=None, dtype=None
+    ):
+        super(StreamingGroupAUC, self).__init__(name=name, dtype=dtype)
+        self.group_output_name = group_output_name
+        self.num_buckets = num_buckets
+        self._histograms = _GroupHistograms(num_buckets)
+
+    def update_state(self, labels, predictions, groups, sample_weight=None):
+        labels, predictions, sample_weight = self._to_numpy_inputs(
+            labels, predictions, sample_weight
+        )
+        positive_weight = sample_weight * labels
+        self._histograms.add(
+            _to_flat_numpy(groups, dtype=np.int64),
+            _bucketize(predictions, self.num_buckets),
+            positive_weight,
+            sample_weight - positive_weight,
+        )
+
+    def reset_states(self):
+        self._histograms = _GroupHistograms(self.num_buckets)
+
+    def get_state_values(self):
+        """Returns the `(group id, bucket)` pairs of the non-empty buckets,
+        and the positive and negative weights of the pairs.
+        """
+        positives = self._histograms.positives
+        negatives = self._histograms.negatives
+        rows, buckets = np.nonzero((positives != 0) | (negatives != 0))
+        group_ids = np.array(self._histograms.group_ids, dtype=np.int64)
+        pairs = np.stack([group_ids[rows], buckets], axis=1)
+        return [pairs, positives[rows, buckets], negatives[rows, buckets]]
+
+    def merge_state_values(self, values):
+        pairs, positives, negatives = values
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        self._histograms.add(pairs[:, 0], pairs[:, 1], positives, negatives)
+
+    def result(self):
+        positives = self._histograms.positives
+        negatives = self._histograms.negatives
+        group_positives = np.sum(positives, axis=1)
+        group_negatives = np.sum(negatives, axis=1)
+        # The positive weights in the higher buckets of the same group
+        positives_above = group_positives[:, None] - np.cumsum(
+            positives, axis=1
+        )
+        ordered_pairs = np.sum(
+            negatives * (positives_above + positives / 2.0), axis=1
+        )
+        weights = group_positives + group_negatives
+        valid = (group_positives > 0) & (group_negatives > 0)
+        total_weight = np.sum(weights[valid])
+        if total_weight == 0:
+            return tf.constant(0.0, dtype=tf.float64)
+        aucs = ordered_pairs[valid] / (
+            group_positives[valid] * group_negatives[valid]
+        )
+        group_auc = np.dot(aucs, weights[valid]) / total_weight
+        return tf.constant(group_auc, dtype=tf.float64)
+
+
+# The metric classes whose states computed on disjoint samples are merged,
+# i.e. the state variables are counts or sums over the samples, or the
+# streaming metrics merging the states by `merge_state_values`.
+# `tf.keras.metrics.Mean` includes the wrapped metric functions.
+_ADDITIVE_METRIC_CLASSES = (
+    metrics_module.Mean,
+    metrics_module.Sum,
+    metrics_module.AUC,
+    metrics_module.Precision,
+    metrics_module.Recall,
+    metrics_module.TruePositives,
+    metrics_module.FalsePositives,
+    metrics_module.TrueNegatives,
+    metrics_module.FalseNegatives,
+    StreamingMetric,
+)
+
+
+def is_additive_metric(metric):
+    """Returns True if the states of the metric computed on disjoint
+    samples are merged by summation.
+    """
+    return isinstance(metric, _ADDITIVE_METRIC_CLASSES)
@@ -0,0 +1,159 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Reshard a checkpoint saved by N PS instances into M shards offline, so
+that a job with M PS instances restores it without repartitioning.
+
+Usage:
+    python -m elasticdl.python.common.reshard_checkpoint \
+        /ckpt/version-100 /new_ckpt --num_shards 4 --num_processes 4
+
+The output shards are saved to `/new_ckpt/version-100`. Each input shard
+file is read once and its parameters are routed to the output shards which
+own them. The output shards are split into groups built from disjoint
+input shard files, and each group is built in a worker process. There are
+`gcd(N, M)` groups, so a process holds `M / gcd(N, M)` output shards in
+memory, e.g. one output shard if N == M, and the whole model if N and M
+are coprime.
+If the input is a delta checkpoint, the checkpoints it is based on are
+merged into the output, which is a full checkpoint.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from elasticdl.python.common.args import pos_int
+from elasticdl.python.common.log_utils import default_logger as logger
+from elasticdl.python.common.save_utils import CheckpointSaver
+from elasticdl_client.common.constants import CheckpointFormat
+
+
+def _reshard(
+    checkpoint_dir, output_dir, shard_indices, num_shards, checkpoint_format
+):
+    shard_parameters = CheckpointSaver.restore_params_shards_from_checkpoint(
+        checkpoint_dir, shard_indices, num_shards
+    )
+    saver = CheckpointSaver(
+        output_dir, 0, 0, False, checkpoint_format=checkpoint_format
+    )
+    for shard_index in shard_indices:
+        parameters = shard_parameters.pop(shard_index)
+        saver.save_snapshot(parameters.snapshot(), shard_index, num_shards)
+
+
+def reshard_checkpoint(
+    checkpoint_dir,
+    output_dir,
+    num_shards,
+    num_processes=1,
+    checkpoint_format=CheckpointFormat.PROTOBUF,
+):
+    """Reshard the checkpoint of a version into `num_shards` shards.
+
+    Args:
+        checkpoint_dir: The version directory of the checkpoint, e.g.
+            "/ckpt/version-100".
+        output_dir: The directory to save the output checkpoint. The output
+            shards are saved in its version subdirectory.
+        num_shards: The number of output shards, i.e. the number of PS
+            instances to restore the output checkpoint.
+        num_processes: The number of processes to build the groups of
+            output shards in parallel. If 1, they are built in this
+            process.
+        checkpoint_format: The format of the output shards.
+
+    Return:
+        The version directory of the output checkpoint.
+    """
+    if not CheckpointSaver.check_checkpoint_valid(checkpoint_dir):
+        raise ValueError("Invalid checkpoint directory %s" % checkpoint_dir)
+    version = CheckpointSaver.get_version_from_checkpoint(checkpoint_dir)
+    version_dir = os.path.join(output_dir, "version-%d" % version)
+    if os.path.exists(version_dir) and os.listdir(version_dir):
+        raise ValueError("The output directory %s is not empty" % version_dir)
+
+    shard_groups = CheckpointSaver.get_independent_shard_groups(
+        checkpoint_dir, num_shards
+    )
+    args_list = [
+        (checkpoint_dir, output_dir, group, num_shards, checkpoint_format)
+        for group in shard_groups
+    ]
+    if num_processes > 1 and len(shard_groups) > 1:
+        # Spawn instead of fork the worker processes, since TensorFlow is
+        # not fork-safe.
+        with ProcessPoolExecutor(
+            max_workers=min(num_processes, len(shard_groups)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [executor.submit(_reshard, *args) for args in args_list]
+            for future in futures:
+                future.result()
+    else:
+        for args in args_list:
+            _reshard(*args)
+
+    logger.info(
+        "Resharded the checkpoint of version %d into %d shards in %s"
+        % (version, num_shards, version_dir)
+    )
+    return version_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Reshard a checkpoint for a different number of PS "
+        "instances."
+    )
+    parser.add_argument(
+        "checkpoint_dir",
+        help="The version directory of the checkpoint, e.g. "
+        "/ckpt/version-100",
+    )
+    parser.add_argument(
+        "output_dir", help="The directory to save the output checkpoint"
+    )
+    parser.add_argument(
+        "--num_shards",
+        type=pos_int,
+        required=True,
+        help="The number of output shards, i.e. the number of PS instances",
+    )
+    parser.add_argument(
+        "--num_processes",
+        type=pos_int,
+        default=1,
+        help="The number of processes to build the groups of output shards",
+    )
+    parser.add_argument(
+        "--checkpoint_format",
+        default=CheckpointFormat.PROTOBUF,
+        choices=[CheckpointFormat.PROTOBUF, CheckpointFormat.CHUNKED],
+        help="The format of the output shards",
+    )
+    args = parser.parse_args(argv)
+    reshard_checkpoint(
+        args.checkpoint_dir,
+        args.output_dir,
+        args.num_shards,
+        args.num_processes,
+        args.checkpoint_format,
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
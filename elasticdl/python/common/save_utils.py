@@ -12,20 +12,39 @@
 # limitations under the License.
 
 import contextlib
+import math
 import os
 import shutil
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import tensorflow as tf
 
 from elasticdl.proto import elasticdl_pb2
+from elasticdl.python.common.chunked_checkpoint import (
+    MANIFEST_FILE,
+    ChunkedCheckpointReader,
+    save_snapshot_to_chunked_dir,
+)
 from elasticdl.python.common.hash_utils import int_to_id, string_to_id
+from elasticdl.python.common.log_utils import default_logger as logger
 from elasticdl.python.common.tensor_utils import (
     pb_to_indexed_slices,
     pb_to_ndarray,
 )
 from elasticdl.python.ps.embedding_table import create_embedding_table
 from elasticdl.python.ps.parameters import Parameters
+from elasticdl_client.common.constants import CheckpointFormat
+
+_CHECKPOINT_FILE_SUFFIX = ".ckpt"
+_CHUNKED_CHECKPOINT_SUFFIX = ".chunks"
+# The tag in the name of the shard files of a delta checkpoint, which only
+# contain the embedding vectors updated since the previous checkpoint.
+_DELTA_CHECKPOINT_TAG = ".delta"
+# The maximum number of shard files of a version read in parallel when
+# restoring a checkpoint.
+_MAX_RESTORE_THREADS = 8
 
 
 def save_pb_to_file(pb_obj, file_name):
@@ -42,36 +61,61 @@ def load_pb_from_file(pb_obj, file_name):
     return pb_obj
 
 
-def _get_params_shard_from_pb(model_pb, shard_index, shard_num):
-    """Get parameters including variables values and embedding table
-    from a model protobuf.
-    Args:
-        model_pb: A Model protobuf instance.
-        shard_index: Model shard index.
-        shard_num: The total number of model shards.
-    Return:
-        non_embedding_vars: A Python dict in which the key is a variable
-            name and the value is a `tf.Variable` object.
-        embedding_table_values: A Python dict in which the key is an embedding
-            table name and the value is a tuple with 2 elements. The value[0]
-            is indices and value[1] is the corresponding embedding vector.
-    """
-    non_embedding_vars = {}
-    embedding_table_values = {}
+def _create_embedding_tables(embedding_table_infos, shards):
+    for embedding_info_pb in embedding_table_infos:
+        for _, embedding_tables in shards.values():
+            embedding_table = create_embedding_table(embedding_info_pb)
+            embedding_tables.setdefault(embedding_table.name, embedding_table)
+
+
+def _set_dense_parameter(shards, name, value, shard_num):
+    shard_index = string_to_id(name, shard_num)
+    if shard_index in shards:
+        non_embedding_vars, _ = shards[shard_index]
+        non_embedding_vars[name] = tf.Variable(
+            initial_value=value, trainable=True
+        )
+
+
+def _set_embedding_vectors(shards, name, ids, values, shard_num):
+    if len(ids) == 0:
+        return
+    owners = int_to_id(ids, shard_num)
+    for shard_index, (_, embedding_tables) in shards.items():
+        mask = owners == shard_index
+        if mask.any():
+            embedding_tables[name].set(ids[mask].tolist(), values[mask])
 
+
+def _restore_params_shards_from_pb_file(file_name, shards, shard_num):
+    """Restore the parameters of the model shards from a protobuf file and
+    return the version. `shards` is a dict from a model shard index to a
+    tuple `(non_embedding_vars, embedding_tables)` to restore into, so the
+    file is read once for all of them.
+    """
+    model_pb = elasticdl_pb2.Model()
+    model_pb = load_pb_from_file(model_pb, file_name)
+    _create_embedding_tables(model_pb.embedding_table_infos, shards)
     for name, pb in model_pb.dense_parameters.items():
-        if string_to_id(name, shard_num) == shard_index:
-            non_embedding_vars[name] = tf.Variable(
-                initial_value=pb_to_ndarray(pb), trainable=True
-            )
+        _set_dense_parameter(shards, name, pb_to_ndarray(pb), shard_num)
     for name, pb in model_pb.embedding_tables.items():
-        embedding_table_values.setdefault(name, ([], []))
         t = pb_to_indexed_slices(pb)
-        for embedding_id, vector in zip(t.indices, t.values):
-            if int_to_id(embedding_id, shard_num) == shard_index:
-                embedding_table_values[name][0].append(embedding_id)
-                embedding_table_values[name][1].append(vector)
-    return non_embedding_vars, embedding_table_values
+        _set_embedding_vectors(shards, name, t.indices, t.values, shard_num)
+    return model_pb.version
+
+
+def _restore_params_shards_from_chunked_dir(shard_dir, shards, shard_num):
+    """Restore the parameters of the model shards from a directory in the
+    chunked format and return the version. `shards` is the same as
+    `_restore_params_shards_from_pb_file`.
+    """
+    reader = ChunkedCheckpointReader(shard_dir)
+    _create_embedding_tables(reader.get_embedding_table_infos(), shards)
+    for name, value in reader.get_dense_parameters().items():
+        _set_dense_parameter(shards, name, value, shard_num)
+    for name, ids, values in reader.get_embedding_table_chunks():
+        _set_embedding_vectors(shards, name, ids, values, shard_num)
+    return reader.version
 
 
 def save_checkpoint_without_embedding(model, checkpoint_dir, version=100):
@@ -99,6 +143,8 @@ class CheckpointSaver(object):
         checkpoint_steps,
         keep_checkpoint_max,
         include_evaluation,
+        full_checkpoint_steps=0,
+        checkpoint_format=CheckpointFormat.PROTOBUF,
     ):
         """
         Arguments:
@@ -107,10 +153,19 @@ class CheckpointSaver(object):
             checkpoint_steps: Save checkpoint every this many steps.
             keep_checkpoint_max: The maximum number of recent checkpoint
                                  files to keep.
+            full_checkpoint_steps: Save a full checkpoint every this many
+                                   steps and delta checkpoints between
+                                   them. If 0, all checkpoints are full.
+            checkpoint_format: The format to save a model shard, either a
+                               protobuf file or a directory in the chunked
+                               format.
         """
         self._directory = checkpoint_dir
         self._steps = checkpoint_steps
         self._max_versions = keep_checkpoint_max
+        self._full_steps = full_checkpoint_steps
+        self._last_full_version = None
+        self._format = checkpoint_format
         if not self._directory:
             self._directory = os.getcwd() + "/checkpoint_dir"
         if self._steps:
@@ -122,7 +177,13 @@ class CheckpointSaver(object):
         )
 
     def _get_checkpoint_file(
-        self, version, is_eval_checkpoint=False, shard_index=0, shard_num=1
+        self,
+        version,
+        is_eval_checkpoint=False,
+        shard_index=0,
+        shard_num=1,
+        is_delta=False,
+        is_chunked=False,
     ):
         checkpoint_dir = (
             self._eval_checkpoint_dir
@@ -134,10 +195,17 @@ class CheckpointSaver(object):
         )
         with contextlib.suppress(FileExistsError):
             os.makedirs(checkpoint_version_dir, exist_ok=True)
-        return "%s/variables-%s-of-%s.ckpt" % (
+        suffix = (
+            _CHUNKED_CHECKPOINT_SUFFIX
+            if is_chunked
+            else _CHECKPOINT_FILE_SUFFIX
+        )
+        return "%s/variables-%s-of-%s%s%s" % (
             checkpoint_version_dir,
             str(shard_index),
             str(shard_num),
+            _DELTA_CHECKPOINT_TAG if is_delta else "",
+            suffix,
         )
 
     def is_enabled(self):
@@ -148,8 +216,28 @@ class CheckpointSaver(object):
         """Check if the given model version needs to be checkpointed"""
         return self.is_enabled() and version % self._steps == 0
 
+    def is_delta_enabled(self):
+        """Delta checkpoint is enabled or not"""
+        return bool(self._full_steps)
+
+    def need_full_checkpoint(self, version):
+        """Check if the given model version needs a full checkpoint rather
+        than a delta checkpoint. The first checkpoint is always full.
+        """
+        return (
+            not self._full_steps
+            or self._last_full_version is None
+            or version % self._full_steps == 0
+        )
+
     def save(
-        self, version, model, is_eval_checkpoint, shard_index=0, shard_num=1
+        self,
+        version,
+        model,
+        is_eval_checkpoint,
+        shard_index=0,
+        shard_num=1,
+        is_delta=False,
     ):
         """Checkpoint the given model
 
@@ -164,28 +252,73 @@ class CheckpointSaver(object):
             shard_number (int): default 1. The number of model shards,
                 e.g. shard_number is the number of PS instances using
                 ParameterServerStrategy.
+            is_delta (bool): default False. If True, the model only
+                contains the embedding vectors updated since the previous
+                checkpoint.
         """
         filename = self._get_checkpoint_file(
-            version, is_eval_checkpoint, shard_index, shard_num
+            version, is_eval_checkpoint, shard_index, shard_num, is_delta
         )
         save_pb_to_file(model, filename)
         if not is_eval_checkpoint:
-            self._checkpoint_dir_list.append(os.path.dirname(filename))
-            if self._max_versions:
-                self._delete_old_checkpoints_if_needed()
+            self._add_checkpoint(version, filename, is_delta)
+
+    def save_snapshot(
+        self, snapshot, shard_index=0, shard_num=1, is_delta=False
+    ):
+        """Checkpoint the given `ParametersSnapshot` in the format of the
+        saver. In the chunked format, the snapshot is streamed to files
+        without building a model protobuf.
+
+        Args:
+            snapshot: a `ParametersSnapshot` instance.
+            shard_index (int): the same as `save`.
+            shard_num (int): the same as `save`.
+            is_delta (bool): the same as `save`.
+        """
+        is_chunked = self._format == CheckpointFormat.CHUNKED
+        filename = self._get_checkpoint_file(
+            snapshot.version,
+            shard_index=shard_index,
+            shard_num=shard_num,
+            is_delta=is_delta,
+            is_chunked=is_chunked,
+        )
+        if is_chunked:
+            save_snapshot_to_chunked_dir(snapshot, filename)
+        else:
+            save_pb_to_file(snapshot.to_model_pb(), filename)
+        self._add_checkpoint(snapshot.version, filename, is_delta)
+
+    def _add_checkpoint(self, version, filename, is_delta):
+        if not is_delta:
+            self._last_full_version = version
+        self._checkpoint_dir_list.append(os.path.dirname(filename))
+        if self._max_versions:
+            self._delete_old_checkpoints_if_needed()
 
     def _delete_old_checkpoints_if_needed(self):
         """Delete the oldest checkpoint files and keep the number of
-        checkpoints is not beyond max_version.
+        checkpoints is not beyond max_version. A full checkpoint is deleted
+        together with the delta checkpoints based on it, so there may be
+        more checkpoints than max_version until the next full checkpoint.
         """
-        if len(self._checkpoint_dir_list) > self._max_versions:
-            old_version_dir = self._checkpoint_dir_list[0]
-
-            # Some PS instances have not saved checkpoint shard files of
-            # the version if invalid. And the slowest PS will remove the
-            # old version checkpoint.
-            if self.check_checkpoint_valid(old_version_dir):
-                self._checkpoint_dir_list.pop(0)
+        dir_list = self._checkpoint_dir_list
+        chain_len = 1
+        while chain_len < len(dir_list) and self.is_delta_checkpoint(
+            dir_list[chain_len]
+        ):
+            chain_len += 1
+        if len(dir_list) - chain_len < self._max_versions:
+            return
+
+        old_version_dirs = dir_list[:chain_len]
+        # Some PS instances have not saved checkpoint shard files of
+        # the version if invalid. And the slowest PS will remove the
+        # old version checkpoint.
+        if all(self.check_checkpoint_valid(d) for d in old_version_dirs):
+            del dir_list[:chain_len]
+            for old_version_dir in old_version_dirs:
                 with contextlib.suppress(FileNotFoundError):
                     shutil.rmtree(old_version_dir)
 
@@ -214,6 +347,8 @@ class CheckpointSaver(object):
         in the checkpoint directory like "variables-{i}-of-{N}.ckpt". We will
         parse any filename to get N which is the total number of parameters
         shards. It is valid if the number of files in the directory N.
+        A shard directory in the chunked format is only counted if its
+        manifest exists, because the manifest is written last.
         """
         if not os.path.exists(checkpoint_dir):
             return False
@@ -224,12 +359,67 @@ class CheckpointSaver(object):
 
         shard_file_prefix = shard_files[0].split(".")[0]
         expected_shard_num = int(shard_file_prefix.split("-")[-1])
-        return expected_shard_num == len(shard_files)
+        complete_shard_files = [
+            f
+            for f in shard_files
+            if not f.endswith(_CHUNKED_CHECKPOINT_SUFFIX)
+            or os.path.exists(os.path.join(checkpoint_dir, f, MANIFEST_FILE))
+        ]
+        return expected_shard_num == len(complete_shard_files)
+
+    @staticmethod
+    def is_delta_checkpoint(checkpoint_dir):
+        """Check whether the checkpoint directory is a delta checkpoint.
+        A directory with both full and delta shard files, e.g. saved by a
+        relaunched PS instance, is also a delta checkpoint.
+        """
+        return any(
+            _DELTA_CHECKPOINT_TAG + "." in f
+            for f in os.listdir(checkpoint_dir)
+        )
+
+    @staticmethod
+    def _get_checkpoint_chain(checkpoint_dir):
+        """Get the checkpoint directories to restore the checkpoint in
+        the order of version. For a delta checkpoint, they are the full
+        checkpoint it is based on and all delta checkpoints after it.
+        """
+        chain = [checkpoint_dir]
+        if not CheckpointSaver.is_delta_checkpoint(checkpoint_dir):
+            return chain
+
+        checkpoint_dir = os.path.normpath(checkpoint_dir)
+        parent_dir = os.path.dirname(checkpoint_dir)
+        version = int(os.path.basename(checkpoint_dir).split("-")[-1])
+        version_folder_pairs = sorted(
+            [
+                (int(folder.split("-")[-1]), folder)
+                for folder in os.listdir(parent_dir)
+            ],
+            reverse=True,
+        )
+        for folder_version, folder in version_folder_pairs:
+            if folder_version >= version:
+                continue
+            folder_dir = os.path.join(parent_dir, folder)
+            if not CheckpointSaver.check_checkpoint_valid(folder_dir):
+                raise ValueError(
+                    "Invalid checkpoint %s before the delta checkpoint %s"
+                    % (folder_dir, checkpoint_dir)
+                )
+            chain.append(folder_dir)
+            if not CheckpointSaver.is_delta_checkpoint(folder_dir):
+                return chain[::-1]
+        raise ValueError(
+            "No full checkpoint for the delta checkpoint %s" % checkpoint_dir
+        )
 
     @staticmethod
     def restore_params_from_checkpoint(checkpoint_dir, shard_index, shard_num):
         """Restore a shard parameters from the checkpoint directory.
         If shard_num=1, a entire model parameters will be restored.
+        If the checkpoint is a delta checkpoint, the full checkpoint it is
+        based on and the delta checkpoints until it are replayed in order.
 
         Args:
             checkpoint_dir: a directory with checkpoint files.
@@ -244,42 +434,121 @@ class CheckpointSaver(object):
                 non-embedding parameters and embedding tables for the
                 PS instance with ps_id.
         """
+        return CheckpointSaver.restore_params_shards_from_checkpoint(
+            checkpoint_dir, [shard_index], shard_num
+        )[shard_index]
 
-        variable_shard_files = os.listdir(checkpoint_dir)
-        non_embedding_vars = {}
-        embedding_tables = {}
-        version = None
-        for shard_file in variable_shard_files:
-            shard_file_path = os.path.join(checkpoint_dir, shard_file)
-            model_pb = elasticdl_pb2.Model()
-            model_pb = load_pb_from_file(model_pb, shard_file_path)
-            if version is None:
-                version = model_pb.version
-            elif version != model_pb.version:
-                raise ValueError(
-                    "The versions in model shards are not consistent"
-                )
+    @staticmethod
+    def restore_params_shards_from_checkpoint(
+        checkpoint_dir, shard_indices, shard_num
+    ):
+        """Restore the parameters of several model shards from the
+        checkpoint directory. Each shard file is read once and its
+        parameters are routed to the model shards which own them.
+
+        Args:
+            checkpoint_dir: the same as `restore_params_from_checkpoint`.
+            shard_indices: A list of model shard indices.
+            shard_num: The total number of model shards.
+
+        Return:
+            A dict from a model shard index to a Parameter object.
+        """
+        shard_parameters = {i: Parameters() for i in shard_indices}
+        for version_dir in CheckpointSaver._get_checkpoint_chain(
+            checkpoint_dir
+        ):
+            CheckpointSaver._restore_params_from_version_dir(
+                shard_parameters, version_dir, shard_num
+            )
+        return shard_parameters
+
+    @staticmethod
+    def get_independent_shard_groups(checkpoint_dir, shard_num):
+        """Split the model shards into groups which are restored from
+        disjoint sets of shard files, so the groups can be restored
+        independently and every shard file is read by only one group.
+
+        The shard file "variables-{i}-of-{N}" only has parameters for the
+        model shards with `shard_index % g == i % g`, where `g` is the
+        greatest common divisor of N and `shard_num`. So the model shards
+        are grouped by their index modulo the greatest common divisor of
+        `shard_num` and the N of all shard files to restore.
+        """
+        g = shard_num
+        for version_dir in CheckpointSaver._get_checkpoint_chain(
+            checkpoint_dir
+        ):
+            for shard_file in os.listdir(version_dir):
+                num = shard_file.split(".")[0].split("-")[-1]
+                g = math.gcd(g, int(num))
+        return [list(range(r, shard_num, g)) for r in range(g)]
 
-            for embedding_info_pb in model_pb.embedding_table_infos:
-                embedding_table = create_embedding_table(embedding_info_pb)
-                embedding_tables.setdefault(
-                    embedding_table.name, embedding_table
+    @staticmethod
+    def _restore_params_from_version_dir(
+        shard_parameters, checkpoint_dir, shard_num
+    ):
+        """Restore the parameters of the model shards from the checkpoint
+        files of a version on top of `shard_parameters`, which is a dict
+        from a model shard index to a Parameter object.
+        """
+        shard_files = set()
+        for shard_index in shard_parameters:
+            shard_files.update(
+                CheckpointSaver._get_shard_files_to_restore(
+                    checkpoint_dir, shard_index, shard_num
                 )
+            )
+        shards = {
+            shard_index: ({}, parameters.embedding_params)
+            for shard_index, parameters in shard_parameters.items()
+        }
 
-            (
-                shard_non_embedding_vars,
-                shard_embedding_table_values,
-            ) = _get_params_shard_from_pb(model_pb, shard_index, shard_num)
+        def _restore_shard_file(shard_file):
+            shard_file_path = os.path.join(checkpoint_dir, shard_file)
+            if shard_file.endswith(_CHUNKED_CHECKPOINT_SUFFIX):
+                restore_shard_fn = _restore_params_shards_from_chunked_dir
+            else:
+                restore_shard_fn = _restore_params_shards_from_pb_file
+            return restore_shard_fn(shard_file_path, shards, shard_num)
+
+        # The shard files own disjoint parameters, so they are restored
+        # in parallel into the shared dicts.
+        with ThreadPoolExecutor(
+            max_workers=min(len(shard_files), _MAX_RESTORE_THREADS)
+        ) as executor:
+            shard_versions = list(
+                executor.map(_restore_shard_file, sorted(shard_files))
+            )
+        if len(set(shard_versions)) > 1:
+            raise ValueError("The versions in model shards are not consistent")
 
-            non_embedding_vars.update(shard_non_embedding_vars)
-            for name, pair in shard_embedding_table_values.items():
-                embedding_tables[name].set(pair[0], pair[1])
+        for shard_index, parameters in shard_parameters.items():
+            non_embedding_vars, _ = shards[shard_index]
+            parameters.non_embedding_params.update(non_embedding_vars)
+            parameters.version = shard_versions[0]
 
-        parameters = Parameters()
-        parameters.non_embedding_params.update(non_embedding_vars)
-        parameters.embedding_params.update(embedding_tables)
-        parameters.version = version
-        return parameters
+    @staticmethod
+    def _get_shard_files_to_restore(checkpoint_dir, shard_index, shard_num):
+        """Get the shard files in the checkpoint directory which may contain
+        the parameters of the model shard.
+
+        The shard file "variables-{i}-of-{N}" saved by the i-th PS instance
+        only contains the parameters owned by it, i.e. whose embedding id
+        or name hash `h` satisfies `h % N == i`. The model shard needs the
+        parameters with `h % shard_num == shard_index`. Both hold for some
+        `h` only if `i % g == shard_index % g`, where `g` is the greatest
+        common divisor of N and `shard_num`. So the other shard files are
+        skipped, e.g. a PS instance only reads its own shard file if the
+        number of PS instances is not changed.
+        """
+        shard_files = []
+        for shard_file in sorted(os.listdir(checkpoint_dir)):
+            _, index, _, num = shard_file.split(".")[0].split("-")
+            g = math.gcd(int(num), shard_num)
+            if int(index) % g == shard_index % g:
+                shard_files.append(shard_file)
+        return shard_files
 
     @staticmethod
     def get_version_from_checkpoint(checkpoint_dir):
@@ -289,6 +558,68 @@ class CheckpointSaver(object):
         """
         variable_shard_files = os.listdir(checkpoint_dir)
         shard_file_path = os.path.join(checkpoint_dir, variable_shard_files[0])
+        if shard_file_path.endswith(_CHUNKED_CHECKPOINT_SUFFIX):
+            return ChunkedCheckpointReader(shard_file_path).version
         model_pb = elasticdl_pb2.Model()
         model_pb = load_pb_from_file(model_pb, shard_file_path)
         return model_pb.version
+
+
+class AsyncCheckpointWriter(object):
+    """
+    AsyncCheckpointWriter saves checkpoints from `ParametersSnapshot`s with
+    a `CheckpointSaver` in a background thread, so that taking a checkpoint
+    does not stall the training. The checkpoints are saved in the order of
+    submission.
+
+    Each snapshot holds the embedding vectors replaced after it is taken,
+    so the number of in-flight checkpoints is bounded to bound the memory.
+    `submit` blocks if there are already `max_inflight_checkpoints`
+    checkpoints being saved.
+    """
+
+    def __init__(self, checkpoint_saver, max_inflight_checkpoints):
+        self._checkpoint_saver = checkpoint_saver
+        self._max_inflight_checkpoints = max_inflight_checkpoints
+        self._inflight_semaphore = threading.BoundedSemaphore(
+            max_inflight_checkpoints
+        )
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, snapshot, shard_index=0, shard_num=1, is_delta=False):
+        """Submit a `ParametersSnapshot` to save as a checkpoint.
+
+        Returns:
+            A `concurrent.futures.Future` of the saving.
+        """
+        if not self._inflight_semaphore.acquire(blocking=False):
+            logger.warning(
+                "Wait for %d in-flight checkpoints to save the checkpoint "
+                "for version %d"
+                % (self._max_inflight_checkpoints, snapshot.version)
+            )
+            self._inflight_semaphore.acquire()
+        return self._executor.submit(
+            self._save, snapshot, shard_index, shard_num, is_delta
+        )
+
+    def _save(self, snapshot, shard_index, shard_num, is_delta):
+        try:
+            self._checkpoint_saver.save_snapshot(
+                snapshot,
+                shard_index=shard_index,
+                shard_num=shard_num,
+                is_delta=is_delta,
+            )
+        except Exception as e:
+            logger.error(
+                "Failed to save checkpoint for version %d: %s"
+                % (snapshot.version, e)
+            )
+            raise
+        finally:
+            self._inflight_semaphore.release()
+
+    def flush(self):
+        """Wait until all submitted checkpoints are saved."""
+        self._executor.submit(lambda: None).result()
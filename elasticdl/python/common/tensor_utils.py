@@ -97,7 +97,7 @@ def pb_to_ndarray(pb):
 
 def pb_to_indexed_slices(pb):
     concat_tensors = pb_to_ndarray(pb.concat_tensors)
-    ids = np.array([int(i) for i in pb.ids])
+    ids = np.fromiter(pb.ids, dtype=np.int64, count=len(pb.ids))
     return Tensor(None, concat_tensors, ids)
 
 
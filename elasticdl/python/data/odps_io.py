@@ -11,18 +11,40 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import multiprocessing
 import os
+import random
 import sys
 import time
-from multiprocessing import Process, Queue
 
+import numpy as np
 import odps
 from odps import ODPS
 from odps.models import Schema
+from tensorflow.core.framework import types_pb2
 
 from elasticdl.python.common.constants import MaxComputeConfig
+from elasticdl.python.common.dtypes import (
+    MAXCOMPUTE_DTYPE_TO_TF_DTYPE,
+    dtype_tensor_to_numpy,
+)
 from elasticdl.python.common.log_utils import default_logger as logger
 
+try:
+    import pyarrow as pa
+    from odps.tunnel import TableDownloadSession
+except ImportError:
+    pa = None
+    TableDownloadSession = None
+
+# The worker processes of `ODPSReader` are started with "spawn" rather
+# than "fork", since forking a process with the threads of TensorFlow and
+# gRPC is unsafe.
+DEFAULT_START_METHOD = "spawn"
+# The seconds `ODPSReader.stop` waits for the worker processes to exit
+# before terminating them.
+_STOP_TIMEOUT_SECS = 10
+
 
 def _nested_list_size(nested_list):
     """
@@ -57,6 +79,47 @@ def _configure_odps_options(endpoint, options=None):
             odps.options.tunnel.endpoint = "http://dt.odps.aliyun-inc.com"
 
 
+def _column_numpy_dtype(odps_type):
+    """Return the numpy dtype of the values of a column with the
+    MaxCompute type, or `None` if the values are read as strings."""
+    tf_dtype = MAXCOMPUTE_DTYPE_TO_TF_DTYPE.get(odps_type)
+    if tf_dtype is None or tf_dtype == types_pb2.DT_STRING:
+        return None
+    return dtype_tensor_to_numpy(tf_dtype)
+
+
+def _values_to_numpy(values, odps_type):
+    """Convert the list of values of a column to a numpy array, where
+    a missing value is converted to zero or an empty string."""
+    dtype = _column_numpy_dtype(odps_type)
+    if dtype is not None:
+        return np.array([0 if v is None else v for v in values], dtype=dtype)
+    return np.array(
+        ["" if v is None else str(v) for v in values], dtype=object
+    )
+
+
+def _arrow_array_to_numpy(array, odps_type):
+    """Convert a column of an Arrow record batch to a numpy array like
+    `_values_to_numpy` without converting the values one by one."""
+    dtype = _column_numpy_dtype(odps_type)
+    if dtype is not None:
+        if array.null_count:
+            array = array.fill_null(dtype.type(0).item())
+        return array.to_numpy(zero_copy_only=False).astype(dtype, copy=False)
+    if not pa.types.is_string(array.type):
+        array = array.cast(pa.string())
+    if array.null_count:
+        array = array.fill_null("")
+    return array.to_numpy(zero_copy_only=False)
+
+
+def _is_arrow_tunnel_supported():
+    return TableDownloadSession is not None and hasattr(
+        TableDownloadSession, "open_arrow_reader"
+    )
+
+
 def is_odps_configured():
     return all(
         k in os.environ
@@ -81,6 +144,7 @@ class ODPSReader(object):
         options=None,
         transform_fn=None,
         columns=None,
+        start_method=DEFAULT_START_METHOD,
     ):
         """
         Constructs a `ODPSReader` instance.
@@ -96,8 +160,11 @@ class ODPSReader(object):
             options: Other options passed to ODPS context.
             num_processes: Number of parallel processes on this worker.
                 If `None`, use the number of cores.
-            transform_fn: Customized transfrom function
+            transform_fn: Customized transfrom function. It is pickled to
+                the worker processes unless `start_method` is "fork".
             columns: list of table column names
+            start_method: The start method of the worker processes, e.g.
+                "spawn", "forkserver" or "fork".
         """
         super(ODPSReader, self).__init__()
 
@@ -112,15 +179,43 @@ class ODPSReader(object):
         self._table = table
         self._partition = partition
         self._num_processes = num_processes
-        _configure_odps_options(self._endpoint, options)
-        self._odps_table = ODPS(
-            self._access_id, self._access_key, self._project, self._endpoint,
-        ).get_table(self._table)
+        self._options = options
+        self._open_table()
 
         self._transform_fn = transform_fn
         self._columns = columns
+        self._mp_context = multiprocessing.get_context(start_method)
+        self._workers = []
+        self._index_queues = []
+        self._reset_id = 0
+
+    def _open_table(self):
+        _configure_odps_options(self._endpoint, self._options)
+        self._odps_table = ODPS(
+            self._access_id, self._access_key, self._project, self._endpoint,
+        ).get_table(self._table)
 
-    def reset(self, shards, shard_size):
+    def __getstate__(self):
+        # The reader is pickled to the worker processes which are not
+        # forked. They open the table again, and get the queues as the
+        # arguments of the processes.
+        state = self.__dict__.copy()
+        for name in [
+            "_odps_table",
+            "_mp_context",
+            "_workers",
+            "_index_queues",
+            "_result_queue",
+            "_results",
+        ]:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open_table()
+
+    def reset(self, shards, shard_size, shuffle=False, batch_size=None):
         """
         The parallel reader launches multiple worker processes to read
         records from an ODPS table and applies `transform_fn` to each record.
@@ -138,55 +233,128 @@ class ODPSReader(object):
         2. put shard to index queue of workers in round-robin way
         3. call `get_records`  to get transformed data from result queue
         4. call `stop` to stop the workers
-        """
-        self._result_queue = Queue()
-        self._index_queues = []
-        self._workers = []
 
+        The worker processes are launched by the first `reset` and reused
+        by the later ones until `stop`. At most `2 * num_processes` shards
+        are read ahead of `get_records`.
+
+        Args:
+            shards: A pair (start, count) of the rows to read.
+            shard_size: The number of rows in a shard read by a worker.
+            shuffle: If true, the shards are read in a random order and
+                `get_records` returns them once they are read. Otherwise,
+                it returns them in the order of the rows.
+            batch_size: If positive, the workers read the typed column
+                batches of at most `batch_size` rows of a shard with
+                `column_batch_generator_with_retry` instead of records.
+        """
+        if not self._workers:
+            self._start_workers()
+        # The results of the shards of the previous resets are dropped.
+        self._reset_id += 1
         self._shards = []
         self._shard_idx = 0
-        self._worker_idx = 0
+        self._create_shards(shards, shard_size)
+        if shuffle:
+            random.shuffle(self._shards)
+        self._in_order = not shuffle
+        self._batch_size = batch_size
+        # The index of the next shard returned by `get_records`, and the
+        # shards read before it from the index to the records.
+        self._next_result_idx = 0
+        self._results = {}
+        for i in range(2 * self._num_processes):
+            self._put_index()
 
-        for i in range(self._num_processes):
-            index_queue = Queue()
+    def _start_workers(self):
+        self._result_queue = self._mp_context.Queue()
+        self._index_queues = []
+        self._worker_idx = 0
+        for _ in range(self._num_processes):
+            index_queue = self._mp_context.Queue()
             self._index_queues.append(index_queue)
 
-            p = Process(target=self._worker_loop, args=(i,))
+            p = self._mp_context.Process(
+                target=self._worker_loop,
+                args=(index_queue, self._result_queue),
+            )
             p.daemon = True
             p.start()
             self._workers.append(p)
 
-        self._create_shards(shards, shard_size)
-        for i in range(2 * self._num_processes):
-            self._put_index()
-
     def get_shards_count(self):
         return len(self._shards)
 
     def get_records(self):
-        data = self._result_queue.get()
+        """Return the records of the next shard, or the list of column
+        batches if `batch_size` is positive in `reset`. An exception
+        raised by a worker to read the shard is raised again."""
+        while True:
+            if self._next_result_idx in self._results:
+                data = self._results.pop(self._next_result_idx)
+                break
+            reset_id, shard_idx, data = self._result_queue.get()
+            if reset_id != self._reset_id:
+                continue
+            if not self._in_order or shard_idx == self._next_result_idx:
+                break
+            self._results[shard_idx] = data
+        self._next_result_idx += 1
         self._put_index()
+        if isinstance(data, Exception):
+            raise data
         return data
 
     def stop(self):
+        """Stop the worker processes, and terminate the ones not exiting
+        within `_STOP_TIMEOUT_SECS`, e.g. reading a large shard."""
         for q in self._index_queues:
-            q.put((None, None))
+            q.put(None)
+        deadline = time.time() + _STOP_TIMEOUT_SECS
+        for p in self._workers:
+            p.join(max(deadline - time.time(), 0))
+            if p.is_alive():
+                p.terminate()
+                p.join()
+        self._index_queues = []
+        self._workers = []
 
-    def _worker_loop(self, worker_id):
+    def _worker_loop(self, index_queue, result_queue):
+        # The results not read by the main process are dropped when the
+        # worker is stopped, instead of blocking the worker from exiting.
+        result_queue.cancel_join_thread()
         while True:
-            index = self._index_queues[worker_id].get()
-            if index[0] is None and index[1] is None:
+            index = index_queue.get()
+            if index is None:
                 break
 
-            records = []
-            for record in self.record_generator_with_retry(
-                start=index[0],
-                end=index[0] + index[1],
-                columns=self._columns,
-                transform_fn=self._transform_fn,
-            ):
-                records.append(record)
-            self._result_queue.put(records)
+            reset_id, shard_idx, (start, count), batch_size = index
+            try:
+                if batch_size:
+                    data = list(
+                        self.column_batch_generator_with_retry(
+                            start=start,
+                            end=start + count,
+                            columns=self._columns,
+                            batch_size=batch_size,
+                        )
+                    )
+                else:
+                    data = list(
+                        self.record_generator_with_retry(
+                            start=start,
+                            end=start + count,
+                            columns=self._columns,
+                            transform_fn=self._transform_fn,
+                        )
+                    )
+            except Exception as e:
+                # Not every exception can be pickled to the main process.
+                data = RuntimeError(
+                    "Failed to read %d rows from %d of %s: %s"
+                    % (count, start, self._table, e)
+                )
+            result_queue.put((reset_id, shard_idx, data))
 
     def _create_shards(self, shards, shard_size):
         start = shards[0]
@@ -212,7 +380,9 @@ class ODPSReader(object):
         if self._shard_idx < len(self._shards):
             worker_id = self._next_worker_id()
             shard = self._shards[self._shard_idx]
-            self._index_queues[worker_id].put(shard)
+            self._index_queues[worker_id].put(
+                (self._reset_id, self._shard_idx, shard, self._batch_size)
+            )
             self._shard_idx += 1
 
     def read_batch(self, start, end, columns=None, max_retries=3):
@@ -285,6 +455,91 @@ class ODPSReader(object):
             ):
                 yield [str(record[column]) for column in columns]
 
+    def column_batch_generator_with_retry(
+        self, start, end, columns=None, batch_size=1024, max_retries=3
+    ):
+        """Wrap column_batch_generator with retry to avoid ODPS table read
+        failure due to network instability. The read is resumed from the
+        first row not yielded yet.
+        """
+        retry_count = 0
+        while start < end:
+            try:
+                for batch in self.column_batch_generator(
+                    start, end, columns, batch_size
+                ):
+                    start += len(next(iter(batch.values())))
+                    yield batch
+                break
+            except Exception as e:
+                if retry_count >= max_retries:
+                    raise Exception("Exceeded maximum number of retries")
+                logger.warning(
+                    "ODPS read exception {} for {} in {}."
+                    "Retrying time: {}".format(
+                        e, columns, self._table, retry_count
+                    )
+                )
+                time.sleep(5)
+                retry_count += 1
+
+    def column_batch_generator(
+        self, start, end, columns=None, batch_size=1024
+    ):
+        """Generate batches of at most `batch_size` rows from an ODPS table.
+        A batch is a dictionary from a column name to a numpy array of the
+        typed values of the column, e.g. int64 for a BIGINT column, and the
+        values of the column types without a numeric dtype are strings. The
+        columns are read with the Arrow tunnel if pyarrow is installed and
+        supported by pyodps, without converting the values one by one.
+        """
+        if columns is None:
+            columns = self._odps_table.schema.names
+        column_types = [
+            self._odps_table.schema[column].type for column in columns
+        ]
+        if _is_arrow_tunnel_supported():
+            with self._odps_table.open_reader(
+                partition=self._partition, reopen=False, arrow=True
+            ) as reader:
+                for record_batch in reader.read(
+                    start=start, count=end - start, columns=columns
+                ):
+                    arrays = [
+                        _arrow_array_to_numpy(
+                            record_batch.column(i), column_types[i]
+                        )
+                        for i in range(len(columns))
+                    ]
+                    for i in range(0, record_batch.num_rows, batch_size):
+                        yield {
+                            column: array[i : i + batch_size]  # noqa: E203
+                            for column, array in zip(columns, arrays)
+                        }
+            return
+
+        def _rows_to_batch(rows):
+            return {
+                column: _values_to_numpy([row[i] for row in rows], column_type)
+                for i, (column, column_type) in enumerate(
+                    zip(columns, column_types)
+                )
+            }
+
+        with self._odps_table.open_reader(
+            partition=self._partition, reopen=False
+        ) as reader:
+            rows = []
+            for record in reader.read(
+                start=start, count=end - start, columns=columns
+            ):
+                rows.append([record[column] for column in columns])
+                if len(rows) == batch_size:
+                    yield _rows_to_batch(rows)
+                    rows = []
+            if rows:
+                yield _rows_to_batch(rows)
+
     def get_table_size(self, max_retries=3):
         retry_count = 0
         while retry_count < max_retries:
@@ -13,6 +13,8 @@
 
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 from elasticdl.python.common.dtypes import MAXCOMPUTE_DTYPE_TO_TF_DTYPE
 
 
@@ -23,7 +25,8 @@ class Metadata(object):
         column_names: A list with column names
         column_dtypes: A dict where the key is a column name
             and the value is a dtype. The dtypes are MaxCompute dtypes for a
-            MaxCompute table or numpy dtypes for a CSV file.
+            MaxCompute table, numpy dtypes for a CSV file or TensorFlow
+            dtypes for Parquet files.
     """
 
     def __init__(self, column_names, column_dtypes=None):
@@ -78,6 +81,40 @@ class AbstractDataReader(ABC):
         """
         pass
 
+    def read_batches(self, task, batch_size):
+        """This method is used in `TaskDataService` to read the records of
+        a task in batches of at most `batch_size` records, which saves the
+        per-record overhead of Python and `tf.data`. A batch is a numpy
+        array of the records, or a dictionary from a key to a numpy array
+        of the values of the key if the records are dictionaries, e.g.
+        the columns of a table. By default, the records from
+        `read_records()` are grouped into batches, skipping the empty
+        records. A reader that reads columns natively can override this
+        method to build the batches without per-record conversions.
+
+        Arguments:
+            task: The current `Task` object that provides information on where
+                to read the data for this task.
+            batch_size: The maximum number of records in a batch.
+        """
+        records = []
+        for record in self.read_records(task):
+            if not record:
+                continue
+            records.append(record)
+            if len(records) == batch_size:
+                yield records_to_batch(records)
+                records = []
+        if records:
+            yield records_to_batch(records)
+
+    def close(self):
+        """This method releases the resources held by the reader, e.g.
+        the processes reading the data source, when the reader is no
+        longer used. By default, nothing is released.
+        """
+        pass
+
     @abstractmethod
     def create_shards(self):
         """This method creates the dictionary of shards where the keys
@@ -105,6 +142,27 @@ class AbstractDataReader(ABC):
         return Metadata(column_names=None)
 
 
+def _values_to_array(values):
+    """Stack a list of values into a numpy array. Strings and bytes are
+    stacked into an object array, since a fixed-width numpy string array
+    strips the trailing null characters of the values."""
+    first = values[0]
+    items = first if isinstance(first, (list, tuple)) else [first]
+    if any(isinstance(item, (bytes, str)) for item in items):
+        return np.array(values, dtype=object)
+    return np.asarray(values)
+
+
+def records_to_batch(records):
+    """Stack a list of records into a batch for `read_batches`."""
+    if isinstance(records[0], dict):
+        return {
+            key: _values_to_array([record[key] for record in records])
+            for key in records[0]
+        }
+    return _values_to_array(records)
+
+
 def check_required_kwargs(required_args, kwargs):
     missing_args = [k for k in required_args if k not in kwargs]
     if missing_args:
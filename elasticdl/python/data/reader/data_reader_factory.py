@@ -16,6 +16,7 @@ import os
 from elasticdl.python.common.constants import MaxComputeConfig, ReaderType
 from elasticdl.python.data.odps_io import is_odps_configured
 from elasticdl.python.data.reader.odps_reader import ODPSDataReader
+from elasticdl.python.data.reader.parquet_reader import ParquetDataReader
 from elasticdl.python.data.reader.recordio_reader import RecordIODataReader
 from elasticdl.python.data.reader.text_reader import TextDataReader
 
@@ -27,7 +28,13 @@ def create_data_reader(data_origin, records_per_task=None, **kwargs):
             table name in the database, etc.
         records_per_task: The number of records to create a task
         kwargs: data reader params, the supported keys are
-            "columns", "partition", "reader_type"
+            "columns", "partition", "reader_type". A Parquet reader is
+            created for a path ending with ".parquet", or a directory of
+            Parquet files with "reader_type" being "Parquet". The ODPS
+            reader reads typed values instead of strings with
+            "typed_columns" being true, and reads a task in
+            "num_processes" processes if it is greater than 1, keeping
+            the processes of up to "num_read_ahead_tasks" idle readers.
     """
     reader_type = kwargs.get("reader_type", None)
     if reader_type is None:
@@ -50,8 +57,10 @@ def create_data_reader(data_origin, records_per_task=None, **kwargs):
                 records_per_task=records_per_task,
                 **kwargs,
             )
+        elif data_origin and data_origin.endswith(".parquet"):
+            return ParquetDataReader(data_dir=data_origin, **kwargs)
         else:
-            return RecordIODataReader(data_dir=data_origin)
+            return RecordIODataReader(data_dir=data_origin, **kwargs)
     elif reader_type == ReaderType.CSV_READER:
         return TextDataReader(
             filename=data_origin, records_per_task=records_per_task, **kwargs
@@ -72,7 +81,9 @@ def create_data_reader(data_origin, records_per_task=None, **kwargs):
             **kwargs,
         )
     elif reader_type == ReaderType.RECORDIO_READER:
-        return RecordIODataReader(data_dir=data_origin)
+        return RecordIODataReader(data_dir=data_origin, **kwargs)
+    elif reader_type == ReaderType.PARQUET_READER:
+        return ParquetDataReader(data_dir=data_origin, **kwargs)
     else:
         raise ValueError(
             "The reader type {} is not supported".format(reader_type)
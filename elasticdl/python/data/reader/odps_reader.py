@@ -11,28 +11,67 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
+
 import tensorflow as tf
 from odps import ODPS
+from tensorflow.core.framework import types_pb2
 
 from elasticdl.python.common.constants import Mode
-from elasticdl.python.data.odps_io import ODPSReader
+from elasticdl.python.common.dtypes import MAXCOMPUTE_DTYPE_TO_TF_DTYPE
+from elasticdl.python.data.odps_io import DEFAULT_START_METHOD, ODPSReader
 from elasticdl.python.data.reader.data_reader import (
     AbstractDataReader,
     Metadata,
     check_required_kwargs,
 )
 
+# The number of rows converted at a time to read the typed records.
+_TYPED_RECORDS_BATCH_SIZE = 1024
+# The maximum number of rows in a sub-range of a task read by a process.
+_DEFAULT_RECORDS_PER_SUB_RANGE = 1024
+
 
 class ODPSDataReader(AbstractDataReader):
+    """This reader reads the records of a MaxCompute table. By default,
+    a record is a list of the values of the columns converted to strings.
+    If the "typed_columns" kwarg is true, a record is a dictionary from
+    a column name to the typed value of the column, e.g. an int64 value
+    for a BIGINT column, and `read_batches` reads the typed columns of
+    the rows without per-value conversions.
+
+    If the "num_processes" kwarg is greater than 1, a task is split into
+    sub-ranges of at most "records_per_sub_range" rows, which are read by
+    the worker processes of an `ODPSReader` reused by the later tasks.
+    The processes are started with the "start_method" kwarg, "spawn" by
+    default. Up to "num_read_ahead_tasks" idle readers are kept for the
+    later tasks, and the others are stopped. `close` stops the idle
+    readers.
+    The records are returned in the order of the rows, or in the order
+    the sub-ranges are read if the "shuffle_sub_ranges" kwarg is true,
+    where the sub-ranges are read in a random order.
+    """
+
     def __init__(self, **kwargs):
         AbstractDataReader.__init__(self, **kwargs)
         self._kwargs = kwargs
         self._metadata = Metadata(column_names=None)
         self._table = self._kwargs["table"]
         self._columns = self._kwargs.get("columns")
+        self._typed_columns = self._kwargs.get("typed_columns", False)
+        self._num_processes = self._kwargs.get("num_processes", 1)
         self._init_metadata()
         # Initialize an ODPS IO reader for each table with task type
         self._table_readers = dict()
+        # The idle ODPS IO readers with worker processes for each table
+        # with task type. A reader is used by a task at a time, since the
+        # tasks may be read ahead in multiple threads.
+        self._idle_parallel_readers = dict()
+        self._max_idle_parallel_readers = max(
+            self._kwargs.get("num_read_ahead_tasks", 0), 1
+        )
+        self._closed = False
+        self._lock = threading.Lock()
 
     def _init_metadata(self):
         table_schema = self._get_table_schema()
@@ -49,16 +88,101 @@ class ODPSDataReader(AbstractDataReader):
             self.metadata.column_dtypes = column_dtypes
 
     def read_records(self, task):
+        if self._typed_columns:
+            for batch in self._read(task, _TYPED_RECORDS_BATCH_SIZE):
+                num_rows = len(next(iter(batch.values())))
+                for i in range(num_rows):
+                    yield {name: values[i] for name, values in batch.items()}
+            return
+
+        for record in self._read(task):
+            yield record
+
+    def read_batches(self, task, batch_size):
+        if not self._typed_columns:
+            return AbstractDataReader.read_batches(self, task, batch_size)
+        return self._read(task, batch_size)
+
+    def _read(self, task, batch_size=None):
+        """Read the records of the task, or the typed column batches of
+        at most `batch_size` rows if `batch_size` is positive."""
+        if self._num_processes > 1:
+            return self._parallel_read(task, batch_size)
+
         task_table_name = self._get_odps_table_name(task.shard.name)
         self._init_reader(task_table_name, task.type)
 
         reader = self._table_readers[task_table_name][task.type]
-        for record in reader.record_generator_with_retry(
+        if batch_size:
+            return reader.column_batch_generator_with_retry(
+                start=task.shard.start,
+                end=task.shard.end,
+                columns=self._metadata.column_names,
+                batch_size=batch_size,
+            )
+        return reader.record_generator_with_retry(
             start=task.shard.start,
             end=task.shard.end,
             columns=self._metadata.column_names,
-        ):
-            yield record
+        )
+
+    def _parallel_read(self, task, batch_size=None):
+        key = (self._get_odps_table_name(task.shard.name), task.type)
+        with self._lock:
+            idle_readers = self._idle_parallel_readers.setdefault(key, [])
+            reader = idle_readers.pop() if idle_readers else None
+        if reader is None:
+            check_required_kwargs(
+                ["project", "access_id", "access_key"], self._kwargs
+            )
+            reader = self.get_odps_reader(
+                key[0], columns=self._metadata.column_names
+            )
+
+        try:
+            num_rows = task.shard.end - task.shard.start
+            records_per_sub_range = self._kwargs.get(
+                "records_per_sub_range",
+                min(
+                    _DEFAULT_RECORDS_PER_SUB_RANGE,
+                    -(-num_rows // self._num_processes),
+                ),
+            )
+            reader.reset(
+                (task.shard.start, num_rows),
+                max(records_per_sub_range, 1),
+                shuffle=self._kwargs.get("shuffle_sub_ranges", False),
+                batch_size=batch_size,
+            )
+            for _ in range(reader.get_shards_count()):
+                for data in reader.get_records():
+                    yield data
+        finally:
+            # The results of the sub-ranges not returned yet are dropped
+            # by the next `reset` of the reader.
+            with self._lock:
+                idle_readers = self._idle_parallel_readers.setdefault(key, [])
+                keep_reader = (
+                    not self._closed
+                    and len(idle_readers) < self._max_idle_parallel_readers
+                )
+                if keep_reader:
+                    idle_readers.append(reader)
+            if not keep_reader:
+                reader.stop()
+
+    def close(self):
+        """Stop the worker processes of the idle ODPS IO readers."""
+        with self._lock:
+            self._closed = True
+            readers = [
+                reader
+                for idle_readers in self._idle_parallel_readers.values()
+                for reader in idle_readers
+            ]
+            self._idle_parallel_readers.clear()
+        for reader in readers:
+            reader.stop()
 
     def create_shards(self):
         check_required_kwargs(["table", "records_per_task"], self._kwargs)
@@ -79,6 +203,17 @@ class ODPSDataReader(AbstractDataReader):
 
     @property
     def records_output_types(self):
+        if self._typed_columns:
+            # The values of the columns without a TensorFlow dtype
+            # are read as strings.
+            return {
+                name: tf.as_dtype(
+                    MAXCOMPUTE_DTYPE_TO_TF_DTYPE.get(
+                        dtype, types_pb2.DT_STRING
+                    )
+                )
+                for name, dtype in self._metadata.column_dtypes.items()
+            }
         return tf.string
 
     @property
@@ -103,7 +238,7 @@ class ODPSDataReader(AbstractDataReader):
         # and different type use the same reader.
         self._table_readers[table_name][task_type] = reader
 
-    def get_odps_reader(self, table_name):
+    def get_odps_reader(self, table_name, columns=None):
         return ODPSReader(
             project=self._kwargs["project"],
             access_id=self._kwargs["access_id"],
@@ -112,11 +247,15 @@ class ODPSDataReader(AbstractDataReader):
             endpoint=self._kwargs.get("endpoint"),
             partition=self._kwargs.get("partition", None),
             num_processes=self._kwargs.get("num_processes", 1),
+            start_method=self._kwargs.get(
+                "start_method", DEFAULT_START_METHOD
+            ),
             options={
                 "odps.options.tunnel.endpoint": self._kwargs.get(
                     "tunnel_endpoint", None
                 )
             },
+            columns=columns,
         )
 
     def _get_table_schema(self):
@@ -137,9 +276,25 @@ class ODPSDataReader(AbstractDataReader):
         check_required_kwargs(["label_col"], self._kwargs)
 
         def feed(dataset, mode, metadata):
+            output_types = self.records_output_types
+
+            def _to_float(name, value):
+                # The values of the STRING columns are parsed as numbers.
+                if output_types[name] == tf.string:
+                    return tf.strings.to_number(value, tf.float32)
+                return tf.cast(value, tf.float32)
+
             def _parse_data(record):
                 label_col_name = self._kwargs["label_col"]
-                record = tf.strings.to_number(record, tf.float32)
+                if isinstance(record, dict):
+                    record = tf.stack(
+                        [
+                            _to_float(name, record[name])
+                            for name in metadata.column_names
+                        ]
+                    )
+                else:
+                    record = tf.strings.to_number(record, tf.float32)
 
                 def _get_features_without_labels(
                     record, label_col_idx, features_shape
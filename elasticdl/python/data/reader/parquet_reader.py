@@ -0,0 +1,180 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import os
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+from elasticdl.python.data.reader.data_reader import (
+    AbstractDataReader,
+    Metadata,
+    check_required_kwargs,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# The number of rows decoded at a time when reading the records.
+_READ_BATCH_SIZE = 1024
+
+
+def _arrow_type_to_tf_dtype(arrow_type):
+    if any(
+        is_type(arrow_type)
+        for is_type in [
+            pa.types.is_string,
+            pa.types.is_large_string,
+            pa.types.is_binary,
+            pa.types.is_large_binary,
+        ]
+    ):
+        return tf.string
+    if pa.types.is_boolean(arrow_type):
+        return tf.bool
+    return tf.as_dtype(np.dtype(arrow_type.to_pandas_dtype()))
+
+
+class ParquetDataReader(AbstractDataReader):
+    """This reader reads the Parquet files in `data_dir`, which is a
+    Parquet file or a directory of Parquet files. A shard is created for
+    each row group, so a task only reads the pages of a row group. Only the
+    columns in the optional "columns" kwarg are read, and a record is a
+    dictionary from a column name to the value of the column in a row.
+    The rows are decoded in batches up to the end of the task, and the
+    batches from `read_batches` are sliced from the decoded columns without
+    per-row conversions.
+    """
+
+    def __init__(self, **kwargs):
+        if pq is None:
+            raise RuntimeError("pyarrow is not installed for Parquet files")
+        AbstractDataReader.__init__(self, **kwargs)
+        self._kwargs = kwargs
+        check_required_kwargs(["data_dir"], self._kwargs)
+        self._lock = threading.Lock()
+        # Dictionary from a file path to the metadata of the file and the
+        # index of the first row of each row group.
+        self._files = {}
+        self._init_metadata()
+
+    def _list_files(self):
+        data_dir = self._kwargs["data_dir"]
+        if not os.path.isdir(data_dir):
+            return [data_dir]
+        return [
+            os.path.join(data_dir, f)
+            for f in sorted(os.listdir(data_dir))
+            if f.endswith(".parquet")
+        ]
+
+    def _init_metadata(self):
+        files = self._list_files()
+        if not files:
+            raise ValueError(
+                "No Parquet files found in %s" % self._kwargs["data_dir"]
+            )
+        schema = pq.read_schema(files[0])
+        column_names = self._kwargs.get("columns") or schema.names
+        self._metadata = Metadata(
+            column_names=list(column_names),
+            column_dtypes={
+                name: _arrow_type_to_tf_dtype(schema.field(name).type)
+                for name in column_names
+            },
+        )
+
+    def _get_file_metadata(self, path):
+        """Return the `pq.FileMetaData` of the file and the index of the
+        first row of each row group, followed by the number of rows."""
+        with self._lock:
+            if path not in self._files:
+                metadata = pq.read_metadata(path)
+                row_group_starts = np.cumsum(
+                    [0]
+                    + [
+                        metadata.row_group(i).num_rows
+                        for i in range(metadata.num_row_groups)
+                    ]
+                ).tolist()
+                self._files[path] = (metadata, row_group_starts)
+            return self._files[path]
+
+    def read_column_batches(self, task, batch_size=_READ_BATCH_SIZE):
+        """Read the requested columns of the rows in the task, and yield
+        a dictionary from a column name to a numpy array of the column for
+        each batch of at most `batch_size` rows."""
+        metadata, row_group_starts = self._get_file_metadata(task.shard.name)
+        num_rows = row_group_starts[-1]
+        start = min(task.shard.start, num_rows)
+        end = min(task.shard.end, num_rows)
+        if start >= end:
+            return
+        # Open the file for each task, since a `pq.ParquetFile` is not
+        # safe to read in multiple threads, but reuse the parsed footer.
+        parquet_file = pq.ParquetFile(task.shard.name, metadata=metadata)
+        first_row_group = bisect.bisect_right(row_group_starts, start) - 1
+        end_row_group = bisect.bisect_left(row_group_starts, end)
+        batch_start = row_group_starts[first_row_group]
+        # Stop decoding the row groups at the end of the task, and skip
+        # the rows before the start of the task in the first row group.
+        for batch in parquet_file.iter_batches(
+            batch_size=batch_size,
+            row_groups=range(first_row_group, end_row_group),
+            columns=self._metadata.column_names,
+        ):
+            batch_end = batch_start + batch.num_rows
+            if batch_end > start:
+                offset = max(start, batch_start)
+                batch = batch.slice(
+                    offset - batch_start, min(end, batch_end) - offset
+                )
+                yield {
+                    name: batch.column(name).to_numpy(zero_copy_only=False)
+                    for name in self._metadata.column_names
+                }
+            if batch_end >= end:
+                break
+            batch_start = batch_end
+
+    def read_records(self, task):
+        for columns in self.read_column_batches(task):
+            num_rows = len(next(iter(columns.values()), []))
+            for i in range(num_rows):
+                yield {name: values[i] for name, values in columns.items()}
+
+    def read_batches(self, task, batch_size):
+        return self.read_column_batches(task, batch_size)
+
+    def create_shards(self):
+        shards = []
+        for path in self._list_files():
+            _, row_group_starts = self._get_file_metadata(path)
+            for start, end in zip(row_group_starts, row_group_starts[1:]):
+                if end > start:
+                    shards.append((path, start, end - start))
+        return shards
+
+    @property
+    def records_output_types(self):
+        return self._metadata.column_dtypes
+
+    @property
+    def metadata(self):
+        return self._metadata
@@ -11,49 +11,212 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
 
 import recordio
 import tensorflow as tf
 
+from elasticdl.python.common.log_utils import default_logger as logger
 from elasticdl.python.data.reader.data_reader import (
     AbstractDataReader,
     Metadata,
     check_required_kwargs,
 )
 
+_MANIFEST_VERSION = 1
+_DEFAULT_NUM_DISCOVERY_THREADS = 16
+_DEFAULT_MAX_OPEN_SCANNERS = 8
+
+
+def _get_num_records(path):
+    with closing(recordio.Index(path)) as rio:
+        return rio.num_records()
+
+
+def _load_manifest(manifest_path):
+    """Return the dictionary from a filename to the (mtime, size,
+    num_records) list in the manifest, or an empty one if the manifest
+    does not exist or is invalid."""
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == _MANIFEST_VERSION:
+            return manifest["files"]
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Failed to load manifest %s: %s" % (manifest_path, e))
+    return {}
+
+
+def _is_manifest_file(path, manifest_path):
+    """Return if `path` is the manifest or a temporary file of it, in case
+    the manifest is in `data_dir`."""
+    path = os.path.abspath(path)
+    manifest_path = os.path.abspath(manifest_path)
+    return path == manifest_path or path.startswith(manifest_path + ".")
+
+
+def _save_manifest(manifest_path, files):
+    tmp_path = "%s.%d.tmp" % (manifest_path, os.getpid())
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"version": _MANIFEST_VERSION, "files": files}, f)
+        os.replace(tmp_path, manifest_path)
+    except OSError as e:
+        logger.warning("Failed to save manifest %s: %s" % (manifest_path, e))
+
+
+class _ScannerPool(object):
+    """A pool of the idle scanners keyed by the file and the index of
+    the next record to read, so that a task starting where the previous
+    task of the file ended continues reading with the same scanner
+    instead of opening the file and parsing its index again.
+    """
+
+    def __init__(self, max_size):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._scanners = OrderedDict()
+        self._closed = False
+
+    def acquire(self, path, start):
+        with self._lock:
+            scanner = self._scanners.pop((path, start), None)
+        if scanner is None:
+            # Read to the end of the file, so that the scanner can be
+            # reused for the following records.
+            scanner = recordio.Scanner(path, start)
+        return scanner
+
+    def release(self, path, position, scanner):
+        evicted_scanners = []
+        with self._lock:
+            if self._closed:
+                evicted_scanners.append(scanner)
+            else:
+                previous = self._scanners.pop((path, position), None)
+                if previous is not None:
+                    evicted_scanners.append(previous)
+                self._scanners[(path, position)] = scanner
+            while len(self._scanners) > self._max_size:
+                evicted_scanners.append(self._scanners.popitem(last=False)[1])
+        for evicted_scanner in evicted_scanners:
+            evicted_scanner.close()
+
+    def close(self):
+        """Closes the idle scanners. The scanners released afterwards are
+        closed instead of kept."""
+        with self._lock:
+            self._closed = True
+            scanners = list(self._scanners.values())
+            self._scanners.clear()
+        for scanner in scanners:
+            scanner.close()
+
 
 class RecordIODataReader(AbstractDataReader):
+    """This reader reads the RecordIO files in `data_dir`. The optional
+    kwargs are "manifest_path", the path of the manifest caching the
+    number of records of the files, e.g. on a local disk outside of
+    `data_dir`, which is not used if not given, "num_discovery_threads",
+    the number of threads to read the indices of the files not in the
+    manifest, and "max_open_scanners", the maximum number of idle scanners
+    kept open to continue reading the next tasks of the files.
+    """
+
     def __init__(self, **kwargs):
         AbstractDataReader.__init__(self, **kwargs)
         self._kwargs = kwargs
         check_required_kwargs(["data_dir"], self._kwargs)
+        self._scanner_pool = _ScannerPool(
+            self._kwargs.get("max_open_scanners", _DEFAULT_MAX_OPEN_SCANNERS)
+        )
 
     def read_records(self, task):
-        with closing(
-            recordio.Scanner(
-                task.shard.name,
-                task.shard.start,
-                task.shard.end - task.shard.start,
-            )
-        ) as reader:
-            while True:
-                record = reader.record()
-                if record:
-                    yield record
-                else:
+        path = task.shard.name
+        position = task.shard.start
+        scanner = self._scanner_pool.acquire(path, position)
+        reusable = False
+        try:
+            while position < task.shard.end:
+                record = scanner.record()
+                if not record:
                     break
+                position += 1
+                yield record
+            reusable = position == task.shard.end
+        finally:
+            # The scanner is closed if the task is not completely read,
+            # e.g. if the generator is closed early.
+            if reusable:
+                self._scanner_pool.release(path, position, scanner)
+            else:
+                scanner.close()
 
     def create_shards(self):
+        """Create a shard for each file in `data_dir`. The number of
+        records of a file is read from the manifest if "manifest_path" is
+        given, and the modification time and the size of the file are
+        unchanged. Otherwise, it is read from the RecordIO index in a
+        thread pool, and the manifest is updated if any.
+        """
         data_dir = self._kwargs["data_dir"]
-        start_ind = 0
-        f_records = []
-        for f in os.listdir(data_dir):
-            p = os.path.join(data_dir, f)
-            with closing(recordio.Index(p)) as rio:
-                f_records.append((p, start_ind, rio.num_records()))
-        return f_records
+        manifest_path = self._kwargs.get("manifest_path")
+        cached_files = _load_manifest(manifest_path) if manifest_path else {}
+
+        files = {}
+        paths_to_index = []
+        with os.scandir(data_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or (
+                    manifest_path
+                    and _is_manifest_file(entry.path, manifest_path)
+                ):
+                    continue
+                stat = entry.stat()
+                cached = cached_files.get(entry.name)
+                if cached and cached[:2] == [stat.st_mtime_ns, stat.st_size]:
+                    files[entry.name] = cached
+                else:
+                    files[entry.name] = [stat.st_mtime_ns, stat.st_size, 0]
+                    paths_to_index.append(entry.path)
+
+        if paths_to_index:
+            num_threads = min(
+                self._kwargs.get(
+                    "num_discovery_threads", _DEFAULT_NUM_DISCOVERY_THREADS
+                ),
+                len(paths_to_index),
+            )
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                for path, num_records in zip(
+                    paths_to_index,
+                    executor.map(_get_num_records, paths_to_index),
+                ):
+                    files[os.path.basename(path)][2] = num_records
+            logger.info(
+                "Read the indices of %d of %d RecordIO files"
+                % (len(paths_to_index), len(files))
+            )
+        if manifest_path and (
+            paths_to_index or len(files) != len(cached_files)
+        ):
+            _save_manifest(manifest_path, files)
+
+        return [
+            (os.path.join(data_dir, name), 0, files[name][2])
+            for name in sorted(files)
+        ]
+
+    def close(self):
+        """Close the idle scanners of the files."""
+        self._scanner_pool.close()
 
     @property
     def records_output_types(self):
@@ -11,20 +11,86 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import csv
-import linecache
+import os
+import threading
 
+import numpy as np
 import tensorflow as tf
 
+from elasticdl.python.common.log_utils import default_logger as logger
 from elasticdl.python.data.reader.data_reader import (
     AbstractDataReader,
     Metadata,
 )
 
+# The suffix of the line index file saved next to a text file.
+_LINE_INDEX_SUFFIX = ".line_index.npy"
+# The size of the chunks to read when building a line index.
+_INDEX_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def _build_line_offsets(filename):
+    """Return the byte offsets of the starts of the lines in the file,
+    followed by the size of the file."""
+    offsets = [np.zeros(1, dtype=np.int64)]
+    file_size = 0
+    with open(filename, "rb") as f:
+        while True:
+            chunk = f.read(_INDEX_CHUNK_SIZE)
+            if not chunk:
+                break
+            newlines = np.flatnonzero(
+                np.frombuffer(chunk, dtype=np.uint8) == ord("\n")
+            )
+            offsets.append(newlines.astype(np.int64) + file_size + 1)
+            file_size += len(chunk)
+    offsets = np.concatenate(offsets)
+    if offsets[-1] != file_size:
+        # The last line does not end with a newline.
+        offsets = np.append(offsets, file_size)
+    return offsets
+
+
+def load_line_offsets(filename):
+    """Load the line index of the text file saved next to it, or build
+    and save the index if it does not exist or is older than the file.
+    The index is kept in memory only if it cannot be saved, e.g. if the
+    directory is read-only.
+    """
+    index_filename = filename + _LINE_INDEX_SUFFIX
+    file_stat = os.stat(filename)
+    if (
+        os.path.exists(index_filename)
+        and os.path.getmtime(index_filename) >= file_stat.st_mtime
+    ):
+        try:
+            offsets = np.load(index_filename, mmap_mode="r")
+            if len(offsets) and offsets[-1] == file_stat.st_size:
+                return offsets
+        except (OSError, ValueError) as e:
+            logger.warning(
+                "Failed to load the line index %s: %s" % (index_filename, e)
+            )
+
+    offsets = _build_line_offsets(filename)
+    tmp_filename = "%s.%d.tmp" % (index_filename, os.getpid())
+    try:
+        with open(tmp_filename, "wb") as f:
+            np.save(f, offsets)
+        os.replace(tmp_filename, index_filename)
+    except OSError as e:
+        logger.warning(
+            "Failed to save the line index %s: %s" % (index_filename, e)
+        )
+    return offsets
+
 
 class TextDataReader(AbstractDataReader):
     """This reader is used to create shards for a file and
-    read records from the shard.
+    read records from the shard. The records are the lines of the file.
+    A line index with the byte offsets of the lines is saved next to the
+    file, so the lines of a task are read by seeking to the offset of the
+    first line.
     """
 
     def __init__(self, filename, records_per_task, **kwargs):
@@ -36,12 +102,31 @@ class TextDataReader(AbstractDataReader):
         self._kwargs = kwargs
         self._filename = filename
         self._records_per_task = records_per_task
+        self._lock = threading.Lock()
+        # Dictionary from a filename to its line offsets.
+        self._line_offsets = {}
+
+    def _get_line_offsets(self, filename):
+        with self._lock:
+            if filename not in self._line_offsets:
+                self._line_offsets[filename] = load_line_offsets(filename)
+            return self._line_offsets[filename]
 
     def read_records(self, task):
-        records = linecache.getlines(task.shard.name)[
-            task.shard.start : task.shard.end
-        ]
-        return records
+        offsets = self._get_line_offsets(task.shard.name)
+        num_lines = len(offsets) - 1
+        start = min(task.shard.start, num_lines)
+        end = min(task.shard.end, num_lines)
+        if start >= end:
+            return
+        with open(task.shard.name, "rb") as f:
+            f.seek(int(offsets[start]))
+            for _ in range(end - start):
+                line = f.readline().decode("utf-8")
+                # Translate the line ending as the universal newlines mode
+                if line.endswith("\r\n"):
+                    line = line[:-2] + "\n"
+                yield line
 
     def create_shards(self):
         size = self.get_size()
@@ -58,10 +143,7 @@ class TextDataReader(AbstractDataReader):
         return shards
 
     def get_size(self):
-        with open(self._filename) as file:
-            reader = csv.reader(file)
-            line_num = len(list(reader))
-            return line_num
+        return len(self._get_line_offsets(self._filename)) - 1
 
     @property
     def records_output_types(self):
@@ -13,7 +13,10 @@
 
 import os
 
-from elasticdl.python.common.args import wrap_go_args_with_string
+from elasticdl.python.common.args import (
+    get_non_default_ps_params,
+    wrap_go_args_with_string,
+)
 from elasticdl.python.common.constants import JobType
 from elasticdl.python.common.log_utils import get_logger
 from elasticdl.python.common.model_utils import (
@@ -89,7 +92,13 @@ class ElasticdlJobService(object):
             None
             if args.eval_metrics_fn not in model_module
             else self._create_evaluation_service(
-                model_module[args.eval_metrics_fn], args.evaluation_steps
+                model_module[args.eval_metrics_fn],
+                args.evaluation_steps,
+                args.max_concurrent_evaluation_jobs,
+                args.collapse_pending_evaluations,
+                args.evaluation_sample_fraction,
+                args.full_evaluation_steps,
+                args.evaluation_early_stop_tolerance,
             )
         )
 
@@ -97,7 +106,16 @@ class ElasticdlJobService(object):
         self.logger.info("ElasticDL job service starts")
         # Start the worker manager if requested
 
-    def _create_evaluation_service(self, eval_func, evaluation_steps):
+    def _create_evaluation_service(
+        self,
+        eval_func,
+        evaluation_steps,
+        max_concurrent_jobs=1,
+        collapse_pending_versions=False,
+        sample_fraction=1.0,
+        full_evaluation_steps=0,
+        early_stop_tolerance=0.0,
+    ):
         evaluation_service = None
         if (
             self.job_type == JobType.TRAINING_WITH_EVALUATION
@@ -112,6 +130,11 @@ class ElasticdlJobService(object):
                 evaluation_steps,
                 self.job_type == JobType.EVALUATION_ONLY,
                 eval_func,
+                max_concurrent_jobs,
+                collapse_pending_versions,
+                sample_fraction,
+                full_evaluation_steps,
+                early_stop_tolerance,
             )
             self.task_manager.set_evaluation_service(evaluation_service)
 
@@ -139,36 +162,67 @@ class ElasticdlJobService(object):
         return worker_args
 
     def get_ps_args(self, args):
-        if args.distribution_strategy == DistributionStrategy.PARAMETER_SERVER:
-            opt_type, opt_args = get_optimizer_info(self._optimizer)
-            ps_command = "elasticdl_ps"
-            ps_command_args = [
-                "-job_name=" + args.job_name,
-                "-namespace=" + args.namespace,
-                "-master_addr=" + self.master_addr,
-                "-port=2222",
-                "-use_async=" + ("true" if args.use_async else "false"),
-                "-grads_to_wait=" + str(args.grads_to_wait),
-                "-lr_staleness_modulation="
-                + ("true" if args.lr_staleness_modulation else "false"),
-                "-sync_version_tolerance=" + str(args.sync_version_tolerance),
-                "-evaluation_steps=" + str(args.evaluation_steps),
-                "-num_ps_pods=" + str(args.num_ps_pods),
-                "-num_workers=" + str(args.num_workers),
-                "-checkpoint_dir=" + str(args.checkpoint_dir),
-                "-checkpoint_steps=" + str(args.checkpoint_steps),
-                "-keep_checkpoint_max=" + str(args.keep_checkpoint_max),
-                "-checkpoint_dir_for_init="
-                + str(args.checkpoint_dir_for_init),
-                "-opt_type=" + opt_type,
-                "-opt_args=" + opt_args,
-            ]
-            ps_command_args = wrap_go_args_with_string(ps_command_args)
-            # Execute source /root/.bashrc to add the file path
-            # of `elasticdl_ps` into the PATH environment variable.
-            ps_args = ["source", "/root/.bashrc_elasticdl", "&&", ps_command]
-            ps_args.extend(ps_command_args)
-            ps_args = ["-c", " ".join(ps_args)]
-            return ps_args
-        else:
+        if args.distribution_strategy != DistributionStrategy.PARAMETER_SERVER:
             return []
+        python_ps_params = get_non_default_ps_params(args)
+        if python_ps_params:
+            # The Go PS does not support these features.
+            self.logger.info(
+                "Launching the Python PS for the arguments %s",
+                ", ".join(python_ps_params),
+            )
+            return self._get_python_ps_args(args)
+        return self._get_go_ps_args(args)
+
+    def _get_python_ps_args(self, args):
+        ps_command = (
+            BashCommandTemplate.SET_PIPEFAIL
+            + " python -m elasticdl.python.ps.main"
+        )
+        ps_command_args = ["--master_addr", self.master_addr, "--port", "2222"]
+        # The master only arguments are not passed to the PS.
+        ps_command_args.extend(
+            build_arguments_from_parsed_result(
+                args,
+                filter_args=[
+                    "envs",
+                    "port",
+                    "worker_image",
+                    "prediction_data",
+                ],
+            )
+        )
+        ps_command_args = wrap_python_args_with_string(ps_command_args)
+        ps_command_args.insert(0, ps_command)
+        return ["-c", " ".join(ps_command_args)]
+
+    def _get_go_ps_args(self, args):
+        opt_type, opt_args = get_optimizer_info(self._optimizer)
+        ps_command = "elasticdl_ps"
+        ps_command_args = [
+            "-job_name=" + args.job_name,
+            "-namespace=" + args.namespace,
+            "-master_addr=" + self.master_addr,
+            "-port=2222",
+            "-use_async=" + ("true" if args.use_async else "false"),
+            "-grads_to_wait=" + str(args.grads_to_wait),
+            "-lr_staleness_modulation="
+            + ("true" if args.lr_staleness_modulation else "false"),
+            "-sync_version_tolerance=" + str(args.sync_version_tolerance),
+            "-evaluation_steps=" + str(args.evaluation_steps),
+            "-num_ps_pods=" + str(args.num_ps_pods),
+            "-num_workers=" + str(args.num_workers),
+            "-checkpoint_dir=" + str(args.checkpoint_dir),
+            "-checkpoint_steps=" + str(args.checkpoint_steps),
+            "-keep_checkpoint_max=" + str(args.keep_checkpoint_max),
+            "-checkpoint_dir_for_init=" + str(args.checkpoint_dir_for_init),
+            "-opt_type=" + opt_type,
+            "-opt_args=" + opt_args,
+        ]
+        ps_command_args = wrap_go_args_with_string(ps_command_args)
+        # Execute source /root/.bashrc to add the file path
+        # of `elasticdl_ps` into the PATH environment variable.
+        ps_args = ["source", "/root/.bashrc_elasticdl", "&&", ps_command]
+        ps_args.extend(ps_command_args)
+        ps_args = ["-c", " ".join(ps_args)]
+        return ps_args
@@ -12,16 +12,31 @@
 # limitations under the License.
 
 import threading
+from collections import OrderedDict
+
+import numpy as np
 
 from elasticdl.python.common.evaluation_utils import EvaluationMetrics
 from elasticdl.python.common.log_utils import default_logger as logger
 from elasticdl.python.common.tensor_utils import pb_to_ndarray
 
+# The z-score of the 95% confidence interval.
+_CONFIDENCE_Z_SCORE = 1.96
+# The minimum number of completed tasks before an evaluation job stops early.
+_MIN_TASKS_TO_STOP_EARLY = 5
+
 
 class EvaluationJob(object):
     """Representation of an evaluation job"""
 
-    def __init__(self, metrics_dict, model_version, total_tasks=-1):
+    def __init__(
+        self,
+        metrics_dict,
+        model_version,
+        total_tasks=-1,
+        early_stop_tolerance=0.0,
+        task_metrics_dict=None,
+    ):
         """
         Args:
             metrics_dict: A python dictionary. If model has only one output,
@@ -36,18 +51,73 @@ class EvaluationJob(object):
                 only uses one output.
             model_version: The version of the model to be evaluated.
             total_tasks: The number of evaluation tasks.
+            early_stop_tolerance: If positive, the job finishes before all
+                tasks complete once the half-width of the 95% confidence
+                interval of every metric over the tasks is within it.
+            task_metrics_dict: A dictionary of new metrics with the same
+                structure as `metrics_dict` to compute the metrics of every
+                task. Required if `early_stop_tolerance` is positive.
         """
 
         self.model_version = model_version
         self._total_tasks = total_tasks
         self._completed_tasks = 0
         self.evaluation_metrics = EvaluationMetrics(metrics_dict)
+        self._early_stop_tolerance = early_stop_tolerance
+        self._stopped_early = False
+        if early_stop_tolerance > 0:
+            self._task_metrics = EvaluationMetrics(task_metrics_dict)
+            # A dictionary from the metric name to the values of the tasks.
+            self._task_metric_values = {}
 
     def complete_task(self):
         self._completed_tasks += 1
+        if (
+            self._early_stop_tolerance > 0
+            and not self.finished()
+            and self._confidence_intervals_within_tolerance()
+        ):
+            logger.info(
+                "Evaluation job of version %d stops early after %d of %d "
+                "tasks"
+                % (
+                    self.model_version,
+                    self._completed_tasks,
+                    self._total_tasks,
+                )
+            )
+            self._stopped_early = True
 
     def finished(self):
-        return self._completed_tasks >= self._total_tasks
+        return (
+            self._stopped_early or self._completed_tasks >= self._total_tasks
+        )
+
+    def _confidence_intervals_within_tolerance(self):
+        if self._completed_tasks < _MIN_TASKS_TO_STOP_EARLY:
+            return False
+        for values in self._task_metric_values.values():
+            if len(values) < _MIN_TASKS_TO_STOP_EARLY:
+                return False
+            half_width = (
+                _CONFIDENCE_Z_SCORE
+                * np.std(values, ddof=1)
+                / np.sqrt(len(values))
+            )
+            if not half_width <= self._early_stop_tolerance:
+                return False
+        # Never stop early if no scalar metric is tracked
+        return bool(self._task_metric_values)
+
+    def _record_task_metric_values(self):
+        summary = self._task_metrics.get_evaluation_summary()
+        for name, value in summary.items():
+            values = value if isinstance(value, dict) else {"": value}
+            for metric_name, metric_value in values.items():
+                if np.ndim(metric_value) == 0:
+                    self._task_metric_values.setdefault(
+                        (name, metric_name), []
+                    ).append(float(metric_value))
 
     def report_evaluation_metrics(self, model_outputs_pb, labels):
         labels = pb_to_ndarray(labels)
@@ -57,6 +127,39 @@ class EvaluationJob(object):
         self.evaluation_metrics.update_evaluation_metrics(
             model_outputs, labels
         )
+        if self._early_stop_tolerance > 0:
+            self._task_metrics.reset_metric_states()
+            self._task_metrics.update_evaluation_metrics(model_outputs, labels)
+            self._record_task_metric_values()
+
+    def report_metric_states(
+        self, metric_states_pb, model_outputs_pb=None, labels=None
+    ):
+        """Merges the metric states of the additive metrics computed by a
+        worker. The other metrics are updated with the model outputs and
+        labels if they are reported together.
+        """
+        metric_states = {}
+        for state_pb in metric_states_pb:
+            metric_states.setdefault(state_pb.output_name, {})[
+                state_pb.metric_name
+            ] = [pb_to_ndarray(pb) for pb in state_pb.variables]
+        model_outputs = {}
+        if model_outputs_pb:
+            labels = pb_to_ndarray(labels)
+            for name, tensor_pb in model_outputs_pb.items():
+                model_outputs[name] = pb_to_ndarray(tensor_pb)
+        self.evaluation_metrics.merge_metric_states(metric_states)
+        self.evaluation_metrics.update_evaluation_metrics(
+            model_outputs, labels, additive=False
+        )
+        if self._early_stop_tolerance > 0:
+            self._task_metrics.reset_metric_states()
+            self._task_metrics.merge_metric_states(metric_states)
+            self._task_metrics.update_evaluation_metrics(
+                model_outputs, labels, additive=False
+            )
+            self._record_task_metric_values()
 
 
 class EvaluationService(object):
@@ -68,21 +171,59 @@ class EvaluationService(object):
         eval_steps,
         eval_only,
         eval_metrics_fn,
+        max_concurrent_jobs=1,
+        collapse_pending_versions=False,
+        sample_fraction=1.0,
+        full_evaluation_steps=0,
+        early_stop_tolerance=0.0,
     ):
+        """
+        Args:
+            create_evaluation_tasks_fn: A function to create the evaluation
+                tasks for a model version and return the number of tasks.
+            eval_steps: Evaluate the model every this many steps.
+            eval_only: Whether the job only evaluates a model.
+            eval_metrics_fn: A function returning the metrics dictionary.
+            max_concurrent_jobs: The maximum number of evaluation jobs of
+                different model versions running at the same time. The
+                other versions are pending until a job finishes.
+            collapse_pending_versions: If True, a new model version to
+                evaluate replaces the pending versions, so only the latest
+                version waits for evaluation.
+            sample_fraction: The fraction of evaluation tasks to sample for
+                an evaluation job which is not a full evaluation.
+            full_evaluation_steps: Evaluate the model with all evaluation
+                tasks and without early stopping every this many steps.
+                If 0, only the jobs are full evaluation if neither
+                `sample_fraction` nor `early_stop_tolerance` is set.
+            early_stop_tolerance: If positive, an evaluation job which is
+                not a full evaluation stops once the half-width of the 95%
+                confidence interval of every metric is within it.
+        """
         self._create_evaluation_tasks_fn = create_evaluation_tasks_fn
         self._lock = threading.Lock()
-        self._eval_job = None
+        # The running evaluation jobs ordered by their start, i.e. a
+        # dictionary from the model version to `EvaluationJob`.
+        self._eval_jobs = OrderedDict()
         self._eval_steps = eval_steps
         self._eval_checkpoint_versions = []
         self._last_eval_checkpoint_version = -1
         self._eval_only = eval_only
         self._eval_metrics_fn = eval_metrics_fn
+        self._max_concurrent_jobs = max_concurrent_jobs
+        self._collapse_pending_versions = collapse_pending_versions
+        self._sample_fraction = sample_fraction
+        self._full_evaluation_steps = full_evaluation_steps
+        self._last_full_evaluation_version = 0
+        self._early_stop_tolerance = early_stop_tolerance
 
     def set_model_version_fn(self, get_model_version_fn):
         self._get_model_version_fn = get_model_version_fn
 
     def init_eval_only_job(self, num_task):
-        self._eval_job = EvaluationJob(self._eval_metrics_fn(), -1, num_task)
+        self._eval_jobs[-1] = EvaluationJob(
+            self._eval_metrics_fn(), -1, num_task
+        )
 
     def add_evaluation_task(self, model_version=None):
         """
@@ -95,30 +236,72 @@ class EvaluationService(object):
 
         checkpoint_version = model_version
         with self._lock:
+            if (
+                self._collapse_pending_versions
+                and self._eval_checkpoint_versions
+            ):
+                logger.info(
+                    "Skip evaluating model versions %s in favor of %d"
+                    % (self._eval_checkpoint_versions, checkpoint_version)
+                )
+                self._eval_checkpoint_versions = []
             self._eval_checkpoint_versions.append(checkpoint_version)
         self._last_eval_checkpoint_version = checkpoint_version
         self.try_to_create_new_job()
 
     def try_to_create_new_job(self):
         """
-        Add eval task into task dispatcher if current eval_job is done
-        and there are pending eval tasks
+        Add eval tasks into task dispatcher for the pending versions while
+        the number of running jobs is less than `max_concurrent_jobs`
         """
+        created = False
         with self._lock:
-            if self._eval_job is None and self._eval_checkpoint_versions:
+            while (
+                len(self._eval_jobs) < self._max_concurrent_jobs
+                and self._eval_checkpoint_versions
+            ):
                 checkpoint_version = self._eval_checkpoint_versions.pop(0)
-                task_count = self._create_evaluation_tasks_fn(
-                    checkpoint_version
-                )
-                if self._eval_job is None:
-                    self._eval_job = EvaluationJob(
+                if self._is_full_evaluation(checkpoint_version):
+                    task_count = self._create_evaluation_tasks_fn(
+                        checkpoint_version
+                    )
+                    job = EvaluationJob(
                         self._eval_metrics_fn(), checkpoint_version, task_count
                     )
                 else:
-                    self._eval_job.model_version = checkpoint_version
-                    self._eval_job._total_tasks = task_count
-                    self._eval_job.reset_metric_states()
-                return True
+                    task_count = self._create_evaluation_tasks_fn(
+                        checkpoint_version, self._sample_fraction
+                    )
+                    task_metrics_dict = None
+                    if self._early_stop_tolerance > 0:
+                        task_metrics_dict = self._eval_metrics_fn()
+                    job = EvaluationJob(
+                        self._eval_metrics_fn(),
+                        checkpoint_version,
+                        task_count,
+                        self._early_stop_tolerance,
+                        task_metrics_dict,
+                    )
+                self._eval_jobs[checkpoint_version] = job
+                created = True
+        return created
+
+    def _is_full_evaluation(self, model_version):
+        """Whether the job of the model version is a full evaluation. With
+        `full_evaluation_steps`, it is a full evaluation once the version is
+        at least that many steps after the last full evaluation, so a full
+        evaluation is not missed if the versions to evaluate skip the
+        multiples of `full_evaluation_steps`.
+        """
+        if self._sample_fraction >= 1.0 and self._early_stop_tolerance <= 0:
+            return True
+        if (
+            self._full_evaluation_steps
+            and model_version - self._last_full_evaluation_version
+            >= self._full_evaluation_steps
+        ):
+            self._last_full_evaluation_version = model_version
+            return True
         return False
 
     def add_evaluation_task_if_needed(self, model_version):
@@ -134,34 +317,66 @@ class EvaluationService(object):
         ):
             self.add_evaluation_task(model_version=model_version,)
 
-    def report_evaluation_metrics(self, model_outputs, labels):
-        if self._eval_job is None:
-            return False
+    def get_evaluation_versions(self):
+        """Returns the model versions scheduled or being evaluated"""
         with self._lock:
-            return self._eval_job.report_evaluation_metrics(
-                model_outputs, labels
+            versions = list(self._eval_checkpoint_versions)
+            versions.extend(
+                version for version in self._eval_jobs if version > 0
             )
+        return versions
 
-    def complete_task(self):
-        if self._eval_job is None:
-            return
-        self._eval_job.complete_task()
-        if self._eval_job.finished():
-            evaluation_metrics = (
-                self._eval_job.evaluation_metrics.get_evaluation_summary()
+    def _get_eval_job(self, model_version):
+        job = self._eval_jobs.get(model_version)
+        if job is None and not model_version and self._eval_jobs:
+            # The worker does not report the model version of the task,
+            # so the oldest job is assumed.
+            job = next(iter(self._eval_jobs.values()))
+        return job
+
+    def report_evaluation_metrics(
+        self, model_outputs, labels, model_version=0
+    ):
+        with self._lock:
+            job = self._get_eval_job(model_version)
+            if job is None:
+                return False
+            return job.report_evaluation_metrics(model_outputs, labels)
+
+    def report_metric_states(
+        self, metric_states, model_version=0, model_outputs=None, labels=None
+    ):
+        with self._lock:
+            job = self._get_eval_job(model_version)
+            if job is None:
+                return False
+            return job.report_metric_states(
+                metric_states, model_outputs, labels
             )
-            logger.info(
-                "Evaluation metrics[step=%d]: %s"
-                % (
-                    self._eval_job.model_version
-                    if self._eval_job.model_version >= 0
-                    else self._get_model_version_fn(),
-                    str(evaluation_metrics),
-                )
+
+    def complete_task(self, model_version=0):
+        with self._lock:
+            job = self._get_eval_job(model_version)
+            if job is None:
+                return
+            job.complete_task()
+            if not job.finished():
+                return
+            evaluation_metrics = (
+                job.evaluation_metrics.get_evaluation_summary()
             )
             if not self._eval_only:
-                # delete checkpoint file
-                self._eval_job = None
-                # create new eval job if possible
-                self.try_to_create_new_job()
-            return evaluation_metrics
+                del self._eval_jobs[job.model_version]
+        logger.info(
+            "Evaluation metrics[step=%d]: %s"
+            % (
+                job.model_version
+                if job.model_version >= 0
+                else self._get_model_version_fn(),
+                str(evaluation_metrics),
+            )
+        )
+        if not self._eval_only:
+            # create new eval job if possible
+            self.try_to_create_new_job()
+        return evaluation_metrics
@@ -91,17 +91,7 @@ class MasterServicer(elasticdl_pb2_grpc.MasterServicer):
             task_id, task = self._task_manager.get(request.worker_id)
 
         if task:
-            res.task_id = task_id
-            res.type = task.type
-            res.shard.name = task.shard.name
-            res.shard.start = task.shard.start
-            res.shard.end = task.shard.end
-            for k, v in task.extended_config.items():
-                res.extended_config[k] = v
-
-            # For evaluation task, it will use the fixed version model
-            if task.type == elasticdl_pb2.EVALUATION:
-                res.model_version = task.model_version
+            self._set_task_pb(res, task_id, task)
         elif (not self._task_manager.finished()) or (
             self._task_manager.invoke_deferred_callback()
         ):
@@ -121,6 +111,50 @@ class MasterServicer(elasticdl_pb2_grpc.MasterServicer):
             self._task_manager.reset_worker_start_task_time(request.worker_id)
         return res
 
+    def _set_task_pb(self, res, task_id, task):
+        res.task_id = task_id
+        res.type = task.type
+        res.shard.name = task.shard.name
+        res.shard.start = task.shard.start
+        res.shard.end = task.shard.end
+        for k, v in task.extended_config.items():
+            res.extended_config[k] = v
+
+        # For evaluation task, it will use the fixed version model
+        if task.type == elasticdl_pb2.EVALUATION:
+            res.model_version = task.model_version
+
+    def get_tasks(self, request, _):
+        res = elasticdl_pb2.GetTasksResponse()
+        tasks = []
+        if request.task_type != elasticdl_pb2.EVALUATION:
+            tasks = self._task_manager.get_tasks(
+                request.worker_id, max(request.num_tasks, 1)
+            )
+        if not tasks:
+            # Return a single task, e.g. an evaluation task or a WAIT task
+            # if no training task is left.
+            get_task_request = elasticdl_pb2.GetTaskRequest(
+                worker_id=request.worker_id, task_type=request.task_type
+            )
+            res.tasks.append(self.get_task(get_task_request, _))
+            return res
+
+        for task_id, task in tasks:
+            task_pb = res.tasks.add()
+            task_pb.model_version = self._version
+            self._set_task_pb(task_pb, task_id, task)
+        with self._lock:
+            self._task_manager.reset_worker_start_task_time(request.worker_id)
+        return res
+
+    def report_task_results(self, request, _):
+        for result in request.results:
+            self.report_task_result(result, _)
+        if request.started_task_id:
+            self._task_manager.start_task(request.started_task_id)
+        return empty_pb2.Empty()
+
     def report_task_result(self, request, _):
         if self._task_manager.support_fault_tolerance:
             if request.err_message:
@@ -147,18 +181,30 @@ class MasterServicer(elasticdl_pb2_grpc.MasterServicer):
     def report_evaluation_metrics(self, request, _):
         with self._lock:
             self._task_manager.reset_worker_start_task_time(request.worker_id)
-        self._evaluation_service.report_evaluation_metrics(
-            request.model_outputs, request.labels
-        )
+        if request.metric_states:
+            self._evaluation_service.report_metric_states(
+                request.metric_states,
+                request.model_version,
+                request.model_outputs,
+                request.labels,
+            )
+        else:
+            self._evaluation_service.report_evaluation_metrics(
+                request.model_outputs, request.labels, request.model_version
+            )
         return empty_pb2.Empty()
 
     def report_version(self, request, _):
         self._version = request.model_version
+        res = elasticdl_pb2.ReportVersionResponse()
         if self._evaluation_service:
             self._evaluation_service.add_evaluation_task_if_needed(
                 model_version=request.model_version
             )
-        return empty_pb2.Empty()
+            res.evaluation_versions.extend(
+                self._evaluation_service.get_evaluation_versions()
+            )
+        return res
 
     def get_comm_rank(self, request, _):
         worker_id = request.worker_id
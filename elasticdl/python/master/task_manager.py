@@ -13,10 +13,12 @@
 
 """TaskQueue Implementation"""
 
+import itertools
 import random
 import statistics
 import threading
 import time
+from collections import OrderedDict
 
 from elasticdl.proto import elasticdl_pb2
 from elasticdl.python.common.constants import TaskExecCounterKey
@@ -30,6 +32,8 @@ from elasticdl.python.common.save_utils import CheckpointSaver
 from elasticdl.python.data.reader.data_reader_factory import create_data_reader
 
 _MAX_TASK_RETRIES = 3
+# The maximum number of todo tasks to scan for a task cached by a worker.
+_MAX_CACHED_TASK_SCAN = 1024
 
 
 class _Shard(object):
@@ -60,6 +64,49 @@ class _Task(object):
         )
 
 
+def _task_key(task):
+    return (task.shard.name, task.shard.start, task.shard.end)
+
+
+class _TodoTasks(object):
+    """The todo tasks, dispatched from the end by default. The tasks are
+    kept in an ordered dict so that a preferred task in the middle can be
+    removed in O(1) as well.
+    """
+
+    def __init__(self):
+        self._tasks = OrderedDict()
+
+    def append(self, task):
+        self._tasks[task] = None
+
+    def extend(self, tasks):
+        for task in tasks:
+            self._tasks[task] = None
+
+    def pop(self):
+        """Remove and return the last task."""
+        return self._tasks.popitem()[0]
+
+    def remove(self, task):
+        del self._tasks[task]
+
+    def clear(self):
+        self._tasks.clear()
+
+    def __contains__(self, task):
+        return task in self._tasks
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks)
+
+    def __reversed__(self):
+        return reversed(self._tasks)
+
+
 class JobCounter(object):
     """Counters for job"""
 
@@ -107,6 +154,13 @@ class TaskManager(object):
             model_zoo: The folder name of model zoo
             model_def: The absolute path of the model definition file.
             custom_data_reader: The function name of custom data reader.
+            record_cache_dir: If not empty, workers cache the records of
+                the tasks they read, and a training task is preferably
+                dispatched to the worker which completed it in an
+                earlier epoch.
+            prefer_sequential_tasks: If true, a training task is
+                preferably dispatched to the worker which got the previous
+                task in the same shard.
         """
         self._lock = threading.Lock()
 
@@ -123,12 +177,24 @@ class TaskManager(object):
 
         self._should_stop = False
 
-        self._todo = []
+        self._todo = _TodoTasks()
         # dictionary from task id to Task.
         self._doing = {}
         self._task_id = 0
         self._eval_todo = []
         self._evaluation_service = None
+        self._prefer_cached_tasks = bool(args.record_cache_dir)
+        # Dictionary from the shard name and the record range of a
+        # training task to the id of the worker which completed it.
+        self._task_readers = {}
+        self._prefer_sequential_tasks = args.prefer_sequential_tasks
+        # Dictionary from the shard name and the start index of a todo
+        # training task to the task. The entries of dispatched tasks are
+        # removed lazily.
+        self._todo_by_start = {}
+        # Dictionary from a worker id to the shard name and the end index
+        # of the last training task dispatched to the worker.
+        self._worker_positions = {}
 
         # Callback list to invoke after all tasks complete.
         self._tasks_done_deferred_callbacks = []
@@ -213,7 +279,7 @@ class TaskManager(object):
         """Return record number in specific task_type"""
         self._job_counters[task_type] = JobCounter()
 
-    def create_tasks(self, task_type, model_version=-1):
+    def create_tasks(self, task_type, model_version=-1, sample_fraction=1.0):
         logger.info(
             "Creating a new set of %s tasks for model version %d",
             elasticdl_pb2._TASKTYPE.values_by_number[task_type].name.lower(),
@@ -263,7 +329,19 @@ class TaskManager(object):
         if task_type == elasticdl_pb2.TRAINING:
             random.shuffle(tasks)
             self._todo.extend(tasks)
+            if self._prefer_sequential_tasks:
+                self._todo_by_start.update(
+                    ((task.shard.name, task.shard.start), task)
+                    for task in tasks
+                )
         elif task_type == elasticdl_pb2.EVALUATION:
+            if sample_fraction < 1.0:
+                # Sample the tasks in a random order, so that the metrics
+                # of the completed tasks are unbiased if the evaluation
+                # job stops early.
+                tasks = random.sample(
+                    tasks, max(1, int(round(len(tasks) * sample_fraction)))
+                )
             self._eval_todo.extend(tasks)
         else:
             self._todo.extend(tasks)
@@ -275,13 +353,31 @@ class TaskManager(object):
                 - num_records_before_create,
             )
         )
+        return len(tasks)
 
-    def create_evaluation_tasks(self, model_version):
+    def create_evaluation_tasks(self, model_version, sample_fraction=1.0):
         """ Create evaluation tasks and return the number of
-        evaluation tasks.
+        evaluation tasks. If `sample_fraction` < 1, only the fraction of
+        the tasks are sampled.
         """
-        self.create_tasks(elasticdl_pb2.EVALUATION, model_version)
-        return len(self._eval_todo)
+        return self.create_tasks(
+            elasticdl_pb2.EVALUATION, model_version, sample_fraction
+        )
+
+    def _remove_evaluation_tasks(self, model_version):
+        """Remove the todo evaluation tasks of the model version, e.g.
+        after the evaluation job stops early."""
+        num_tasks = len(self._eval_todo)
+        self._eval_todo = [
+            task
+            for task in self._eval_todo
+            if task.model_version != model_version
+        ]
+        if len(self._eval_todo) < num_tasks:
+            logger.info(
+                "Removed %d evaluation tasks of model version %d"
+                % (num_tasks - len(self._eval_todo), model_version)
+            )
 
     def get_eval_task(self, worker_id):
         """Return next evaluation (task_id, Task) tuple"""
@@ -289,7 +385,9 @@ class TaskManager(object):
             if not self._eval_todo:
                 return -1, None
             self._task_id += 1
-            task = self._eval_todo.pop()
+            # Dispatch the tasks of the earlier evaluation jobs first, so
+            # that the concurrent jobs finish in the order of versions.
+            task = self._eval_todo.pop(0)
             if self.support_fault_tolerance:
                 self._doing[self._task_id] = (worker_id, task, time.time())
             return self._task_id, task
@@ -351,26 +449,90 @@ class TaskManager(object):
         """Return next (task_id, Task) tuple"""
 
         with self._lock:
-            if (
-                not self._todo
-                and not self._should_stop
-                and self._epoch < self._num_epochs - 1
-            ):
-                # Start a new epoch
-                self._epoch += 1
-                self.create_tasks(elasticdl_pb2.TRAINING)
-                logger.info("Starting epoch %d", self._epoch)
+            return self._get(worker_id)
 
-            if not self._todo:
-                # No more tasks
-                return -1, None
+    def get_tasks(self, worker_id, num_tasks):
+        """Return a list of at most `num_tasks` next (task_id, Task)
+        tuples. Each task is recorded as a doing task of the worker
+        separately, as `get` does.
+        """
+        tasks = []
+        with self._lock:
+            for _ in range(num_tasks):
+                task_id, task = self._get(worker_id)
+                if not task:
+                    break
+                tasks.append((task_id, task))
+        return tasks
+
+    def _get(self, worker_id):
+        if (
+            not self._todo
+            and not self._should_stop
+            and self._epoch < self._num_epochs - 1
+        ):
+            # Start a new epoch
+            self._epoch += 1
+            self.create_tasks(elasticdl_pb2.TRAINING)
+            logger.info("Starting epoch %d", self._epoch)
 
-            self._task_id += 1
-            task = self._todo.pop()
-            if self.support_fault_tolerance:
-                self._doing[self._task_id] = (worker_id, task, time.time())
+        if not self._todo:
+            # No more tasks
+            return -1, None
 
-            return self._task_id, task
+        self._task_id += 1
+        task = self._find_cached_task(worker_id)
+        if task is None:
+            task = self._find_sequential_task(worker_id)
+        if task is None:
+            task = self._todo.pop()
+        else:
+            self._todo.remove(task)
+        if self.support_fault_tolerance:
+            self._doing[self._task_id] = (worker_id, task, time.time())
+        if (
+            self._prefer_sequential_tasks
+            and task.type == elasticdl_pb2.TRAINING
+        ):
+            shard = task.shard
+            self._todo_by_start.pop((shard.name, shard.start), None)
+            self._worker_positions[worker_id] = (shard.name, shard.end)
+
+        return self._task_id, task
+
+    def _find_sequential_task(self, worker_id):
+        """Return the todo training task following the last training task
+        dispatched to the worker in the same shard, or None to dispatch
+        the last todo task.
+        """
+        if not self._prefer_sequential_tasks:
+            return None
+        position = self._worker_positions.get(worker_id)
+        task = self._todo_by_start.get(position)
+        if task is None:
+            return None
+        if task not in self._todo:
+            # The task has been dispatched.
+            del self._todo_by_start[position]
+            return None
+        return task
+
+    def _find_cached_task(self, worker_id):
+        """Return a todo training task completed by the worker before,
+        whose records are likely in its record cache, or None to dispatch
+        the last todo task.
+        """
+        if not self._prefer_cached_tasks or not self._task_readers:
+            return None
+        for task in itertools.islice(
+            reversed(self._todo), _MAX_CACHED_TASK_SCAN
+        ):
+            if (
+                task.type == elasticdl_pb2.TRAINING
+                and self._task_readers.get(_task_key(task)) == worker_id
+            ):
+                return task
+        return None
 
     def report(self, request, success):
         """Report if the task is successful or not"""
@@ -405,6 +567,11 @@ class TaskManager(object):
             ):
                 evaluation_task_completed = True
             else:
+                if (
+                    self._prefer_cached_tasks
+                    and task.type == elasticdl_pb2.TRAINING
+                ):
+                    self._task_readers[_task_key(task)] = worker_id
                 self._check_exceed_max_step(task)
                 logger.info(
                     "Task:%d completed, %d remaining tasks",
@@ -412,7 +579,11 @@ class TaskManager(object):
                     len(self._todo) + len(self._doing),
                 )
             if evaluation_task_completed:
-                self._evaluation_service.complete_task()
+                evaluation_metrics = self._evaluation_service.complete_task(
+                    task.model_version
+                )
+                if evaluation_metrics is not None:
+                    self._remove_evaluation_tasks(task.model_version)
 
             if success:
                 if task in self._task_retry_count:
@@ -457,6 +628,11 @@ class TaskManager(object):
                 for id, (wid, _, _) in self._doing.items()
                 if wid == worker_id
             ]
+            self._task_readers = {
+                key: wid
+                for key, wid in self._task_readers.items()
+                if wid != worker_id
+            }
         request = elasticdl_pb2.ReportTaskResultRequest()
         for id in ids:
             request.task_id = id
@@ -480,6 +656,19 @@ class TaskManager(object):
     def reset_worker_start_task_time(self, worker_id):
         self._worker_start_task_time[worker_id] = time.time()
 
+    def start_task(self, task_id):
+        """Records that the worker starts a leased task now. The task is
+        recorded as a doing task when it is leased, so its start time is
+        reset to measure the execution time from now.
+        """
+        with self._lock:
+            if task_id not in self._doing:
+                return
+            worker_id, task, _ = self._doing[task_id]
+            start_time = time.time()
+            self._doing[task_id] = (worker_id, task, start_time)
+            self._worker_start_task_time[worker_id] = start_time
+
     def record_task_completed_time(self, task_type, completed_time):
         self._task_completed_times[task_type].append(completed_time)
 
@@ -0,0 +1,112 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+import numpy as np
+
+
+class _PullBatch(object):
+    def __init__(self):
+        self.ids_list = []
+        self.results = None
+        self.error = None
+        # Set when the batch is closed to new pulls
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class EmbeddingPullCoalescer(object):
+    """
+    EmbeddingPullCoalescer coalesces the concurrent pulls of an embedding
+    table into one lookup.
+
+    The first pull of a table opens a batch and waits for `window_secs`.
+    The pulls of the same table arriving within the window join the batch
+    and wait for it. The first pull stops waiting as soon as the batch has
+    `max_batch_size` pulls, so it does not wait at all if it is the only
+    possible pull. Then the first pull looks up the union of the ids of
+    the batch once, and every pull gets the rows of its own ids. So hot ids
+    pulled by many workers at the same moment are only looked up once.
+    The rows of the union are still gathered from the dictionary of the
+    `EmbeddingTable` one id at a time, so the saving comes from the
+    deduplication of the ids within the window.
+    """
+
+    def __init__(
+        self, lookup_embedding_func, window_secs, max_batch_size=None
+    ):
+        """
+        Args:
+            lookup_embedding_func: A function `(name, ids)` which returns
+                the embedding vectors of the ids as a 2-D numpy.ndarray.
+            window_secs: The seconds to wait for concurrent pulls.
+            max_batch_size: The maximum number of pulls in a batch, e.g.
+                the number of workers since a worker pulls a table once
+                in a step. If None, a batch is only closed by the window.
+        """
+        self._lookup_embedding_func = lookup_embedding_func
+        self._window_secs = window_secs
+        self._max_batch_size = max_batch_size
+        self._open_batches = {}
+        self._lock = threading.Lock()
+
+    def pull(self, name, ids):
+        """Returns the embedding vectors of `ids` in the table `name`."""
+        with self._lock:
+            batch = self._open_batches.get(name)
+            is_leader = batch is None
+            if is_leader:
+                batch = _PullBatch()
+                self._open_batches[name] = batch
+            index = len(batch.ids_list)
+            batch.ids_list.append(ids)
+            if (
+                self._max_batch_size is not None
+                and len(batch.ids_list) >= self._max_batch_size
+            ):
+                del self._open_batches[name]
+                batch.full.set()
+
+        if is_leader:
+            if not batch.full.wait(self._window_secs):
+                with self._lock:
+                    if self._open_batches.get(name) is batch:
+                        del self._open_batches[name]
+            self._lookup(name, batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _lookup(self, name, batch):
+        try:
+            if len(batch.ids_list) == 1:
+                ids = batch.ids_list[0]
+                batch.results = [self._lookup_embedding_func(name, ids)]
+                return
+            all_ids = np.concatenate(
+                [np.asarray(ids, dtype=np.int64) for ids in batch.ids_list]
+            )
+            unique_ids, inverse = np.unique(all_ids, return_inverse=True)
+            values = self._lookup_embedding_func(name, unique_ids.tolist())
+            offsets = np.cumsum([len(ids) for ids in batch.ids_list])
+            batch.results = [
+                values[rows] for rows in np.split(inverse, offsets[:-1])
+            ]
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
@@ -12,6 +12,7 @@
 # limitations under the License.
 
 import threading
+import weakref
 
 import numpy as np
 import tensorflow as tf
@@ -19,6 +20,19 @@ import tensorflow as tf
 from elasticdl.proto.elasticdl_pb2 import EmbeddingTableInfo
 from elasticdl.python.common.dtypes import dtype_numpy_to_tensor
 
+# The initializers whose values do not depend on the shape, so the vectors
+# of many ids can be initialized in one call. The others, e.g. glorot and he
+# initializers, scale the values by the fans of the shape, and every vector
+# is initialized with the shape `(dim,)` on its own.
+_SHAPE_INDEPENDENT_INITIALIZERS = (
+    tf.keras.initializers.Constant,
+    tf.keras.initializers.Zeros,
+    tf.keras.initializers.Ones,
+    tf.keras.initializers.RandomUniform,
+    tf.keras.initializers.RandomNormal,
+    tf.keras.initializers.TruncatedNormal,
+)
+
 
 class EmbeddingTable(object):
     """
@@ -59,40 +73,117 @@ class EmbeddingTable(object):
             )
         self.is_slot = is_slot
         self.embedding_vectors = {}
+        # The ids of the embedding vectors initialized or updated since the
+        # last `pop_dirty_ids`. It is None if the ids are not tracked.
+        self._dirty_ids = None
+        # The live `EmbeddingTableSnapshot`s which keep the embedding
+        # vectors replaced by `set`.
+        self._cow_snapshots = weakref.WeakSet()
         self._lock = threading.Lock()
 
     def get(self, indices):
         if len(indices) == 0:
             return None
-        values = []
-        for i in indices:
-            value = self.embedding_vectors.get(i, None)
-            if value is None:
-                with self._lock:
-                    value = self.initializer(shape=(self.dim,)).numpy()
-                    self.embedding_vectors[i] = value
-            values.append(value)
-        return np.stack(values)
+        # The set difference and `map` look up the ids without a Python
+        # loop, and the missing vectors are initialized together.
+        missing_ids = set(indices).difference(self.embedding_vectors)
+        if missing_ids:
+            self._initialize(missing_ids)
+        return np.stack(list(map(self.embedding_vectors.__getitem__, indices)))
+
+    def _initialize(self, ids):
+        with self._lock:
+            ids = [i for i in ids if i not in self.embedding_vectors]
+            if not ids:
+                return
+            if isinstance(self.initializer, _SHAPE_INDEPENDENT_INITIALIZERS):
+                values = self.initializer(shape=(len(ids), self.dim)).numpy()
+            else:
+                values = [
+                    self.initializer(shape=(self.dim,)).numpy() for _ in ids
+                ]
+            # The ids were not in the table when the live snapshots are
+            # taken, so they are saved as None in the snapshots before
+            # being added, or a later `set` would leak into the snapshots.
+            for snapshot in self._cow_snapshots:
+                snapshot.save(ids, self.embedding_vectors)
+            self.embedding_vectors.update(zip(ids, values))
+            if self._dirty_ids is not None:
+                self._dirty_ids.update(ids)
 
     def set(self, indices, values):
         # TODO(qijun) need to add a RWLock in Sync-SGD
+        if self._cow_snapshots:
+            with self._lock:
+                for snapshot in self._cow_snapshots:
+                    snapshot.save(indices, self.embedding_vectors)
         for index, i in enumerate(indices):
             embedding_vector = values[index]
             self.embedding_vectors[i] = embedding_vector
+        if self._dirty_ids is not None:
+            # Update the dirty ids with the lock held, or the ids may be
+            # added to the set swapped out by `pop_dirty_ids` and lost.
+            with self._lock:
+                if self._dirty_ids is not None:
+                    self._dirty_ids.update(indices)
+
+    def track_dirty_ids(self):
+        """Starts tracking the ids of the embedding vectors which are
+        initialized or updated, so that a delta checkpoint only saves
+        these embedding vectors.
+        """
+        with self._lock:
+            if self._dirty_ids is None:
+                self._dirty_ids = set()
+
+    def pop_dirty_ids(self):
+        """Returns the ids of the embedding vectors initialized or updated
+        since the last call, and starts tracking from scratch.
+        """
+        with self._lock:
+            dirty_ids = self._dirty_ids
+            if dirty_ids is None:
+                return []
+            self._dirty_ids = set()
+        return list(dirty_ids)
 
     def clear(self):
         self.embedding_vectors.clear()
 
-    def to_indexed_slices(self):
-        indices = []
-        embedding_vectors = []
+    def snapshot(self, ids=None):
+        """Returns a dict from id to embedding vector as a snapshot of the
+        embedding table. It is a copy-on-write snapshot since `set` replaces
+        the embedding vectors instead of modifying them in place, so the
+        vectors are shared with the table until they are updated.
+
+        Args:
+            ids: The ids of the embedding vectors in the snapshot. If None,
+                all embedding vectors are in the snapshot.
+        """
+        with self._lock:
+            if ids is None:
+                return dict(self.embedding_vectors)
+            return {id: self.embedding_vectors[id] for id in ids}
+
+    def cow_snapshot(self):
+        """Returns an `EmbeddingTableSnapshot` of the table. Taking it does
+        not copy the embedding vectors. Instead, `set` saves the vectors
+        into the snapshot before replacing them, as long as the snapshot
+        is referenced.
+        """
+        snapshot = EmbeddingTableSnapshot(self)
         with self._lock:
-            for id, embedding_vector in self.embedding_vectors.items():
-                indices.append(id)
-                embedding_vectors.append(embedding_vector)
-        return tf.IndexedSlices(
-            values=np.array(embedding_vectors), indices=np.array(indices)
-        )
+            self._cow_snapshots.add(snapshot)
+        return snapshot
+
+    def to_indexed_slices(self, ids=None):
+        """Converts the embedding vectors to `tf.IndexedSlices`.
+
+        Args:
+            ids: The ids of the embedding vectors to convert. If None, all
+                embedding vectors are converted.
+        """
+        return embedding_vectors_to_indexed_slices(self.snapshot(ids))
 
     def to_embedding_table_info_pb(self):
         """Convert the embedding table information to a protobuf"""
@@ -123,6 +214,53 @@ class EmbeddingTable(object):
         )
 
 
+class EmbeddingTableSnapshot(object):
+    """
+    EmbeddingTableSnapshot is a copy-on-write snapshot of an
+    `EmbeddingTable` taken by `EmbeddingTable.cow_snapshot`. It only holds
+    the embedding vectors replaced since it is taken, so its memory grows
+    with the number of updated ids rather than the table size. An update
+    racing with taking the snapshot may be visible in it, as with Hogwild
+    updates.
+    """
+
+    def __init__(self, table):
+        self._table = table
+        # A dict from id to the embedding vector when the snapshot is
+        # taken, or None if the id was not in the table then.
+        self._saved_vectors = {}
+
+    def save(self, indices, embedding_vectors):
+        """Saves the vectors of `indices` in `embedding_vectors` which are
+        about to be replaced, unless they are saved already.
+        """
+        for i in indices:
+            if i not in self._saved_vectors:
+                self._saved_vectors[i] = embedding_vectors.get(i)
+
+    def get(self, indices):
+        """Returns a list of the embedding vectors of `indices` in the
+        snapshot. An item is None if the id was not in the table when the
+        snapshot is taken.
+        """
+        # Read the table before the saved vectors, since `set` saves a
+        # vector before replacing it.
+        vectors = list(map(self._table.embedding_vectors.get, indices))
+        saved_vectors = self._saved_vectors
+        return [
+            saved_vectors[i] if i in saved_vectors else v
+            for i, v in zip(indices, vectors)
+        ]
+
+
+def embedding_vectors_to_indexed_slices(embedding_vectors):
+    """Converts a dict from id to embedding vector to `tf.IndexedSlices`"""
+    return tf.IndexedSlices(
+        values=np.array(list(embedding_vectors.values())),
+        indices=np.array(list(embedding_vectors.keys())),
+    )
+
+
 # TODO(bug): create_embedding_table does not create EmbeddingTable correctly
 #     if it is a slot table.
 def create_embedding_table(embedding_table_info_pb):
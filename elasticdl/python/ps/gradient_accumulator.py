@@ -0,0 +1,160 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+from elasticdl.python.common.tensor_utils import Tensor
+
+
+class SparseGradientBuffer(object):
+    """
+    SparseGradientBuffer sums up the sparse gradients of an embedding table
+    by id. It keeps one row for each unique id, so the memory is bounded by
+    the number of unique ids instead of the total number of rows pushed.
+    The rows are stored in a preallocated array whose capacity doubles when
+    it is full and is kept after `reset`. The rows of the ids are looked up
+    with `np.searchsorted` in the sorted ids, so a batch of ids is mapped
+    to the rows without a Python loop.
+    """
+
+    def __init__(self, dim, dtype, capacity=1024):
+        self._dim = dim
+        self._values = np.zeros((capacity, dim), dtype=dtype)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._size = 0
+        # The ids in ascending order and the rows of them.
+        self._sorted_ids = np.zeros(0, dtype=np.int64)
+        self._sorted_rows = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, values, indices):
+        unique_ids, inverse = np.unique(
+            np.asarray(indices, dtype=np.int64), return_inverse=True
+        )
+        if len(unique_ids) == len(indices):
+            summed_values = values[np.argsort(inverse)]
+        else:
+            summed_values = np.zeros(
+                (len(unique_ids), self._dim), dtype=self._values.dtype
+            )
+            np.add.at(summed_values, inverse, values)
+
+        positions = np.searchsorted(self._sorted_ids, unique_ids)
+        found = positions < self._size
+        found[found] = self._sorted_ids[positions[found]] == unique_ids[found]
+        rows = np.empty(len(unique_ids), dtype=np.int64)
+        rows[found] = self._sorted_rows[positions[found]]
+
+        new = ~found
+        num_new_ids = int(np.count_nonzero(new))
+        if num_new_ids:
+            new_ids = unique_ids[new]
+            size = self._size + num_new_ids
+            new_rows = np.arange(self._size, size, dtype=np.int64)
+            rows[new] = new_rows
+            self._reserve(size)
+            self._ids[self._size : size] = new_ids  # noqa: E203
+            self._sorted_ids = np.insert(
+                self._sorted_ids, positions[new], new_ids
+            )
+            self._sorted_rows = np.insert(
+                self._sorted_rows, positions[new], new_rows
+            )
+            self._size = size
+        self._values[rows] += summed_values
+
+    def _reserve(self, size):
+        capacity = len(self._ids)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        values = np.zeros((capacity, self._dim), dtype=self._values.dtype)
+        values[: len(self._ids)] = self._values
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[: len(self._ids)] = self._ids
+        self._values = values
+        self._ids = ids
+
+    def to_tensor(self):
+        return Tensor(
+            None, self._values[: self._size], self._ids[: self._size]
+        )
+
+    def reset(self):
+        self._values[: self._size] = 0
+        self._size = 0
+        self._sorted_ids = self._sorted_ids[:0]
+        self._sorted_rows = self._sorted_rows[:0]
+
+
+class GradientAccumulator(object):
+    """
+    GradientAccumulator accumulates the gradients pushed by workers in
+    synchronous SGD until the model is updated.
+
+    Dense gradients are summed in place into buffers which are allocated
+    with the first gradient of a parameter and reused across model
+    versions. Sparse gradients are summed by id with
+    `SparseGradientBuffer`.
+    """
+
+    def __init__(self):
+        self._dense_buffers = {}
+        self._sparse_buffers = {}
+        # Names of the buffers holding gradients since the last reset,
+        # in the order of their first gradient.
+        self._names = {}
+
+    def add_dense(self, name, grad):
+        buffer = self._dense_buffers.get(name)
+        if buffer is None or buffer.shape != grad.shape:
+            buffer = np.zeros(grad.shape, dtype=grad.dtype)
+            self._dense_buffers[name] = buffer
+        if name in self._names:
+            np.add(buffer, grad, out=buffer)
+        else:
+            np.copyto(buffer, grad)
+            self._names[name] = True
+
+    def add_sparse(self, name, grad):
+        buffer = self._sparse_buffers.get(name)
+        if buffer is None:
+            buffer = SparseGradientBuffer(
+                grad.values.shape[1], grad.values.dtype
+            )
+            self._sparse_buffers[name] = buffer
+        buffer.add(grad.values, grad.indices)
+        self._names[name] = True
+
+    def items(self):
+        """Yields `(name, gradient)` pairs accumulated since the last reset.
+        A dense gradient is a `numpy.ndarray` and a sparse gradient is a
+        `Tensor` with unique indices.
+
+        Note that the gradients share memory with the buffers, so they are
+        only valid before `reset` is called.
+        """
+        for name in self._names:
+            if name in self._sparse_buffers:
+                yield name, self._sparse_buffers[name].to_tensor()
+            else:
+                yield name, self._dense_buffers[name]
+
+    def reset(self):
+        for name in self._names:
+            if name in self._sparse_buffers:
+                self._sparse_buffers[name].reset()
+        self._names.clear()
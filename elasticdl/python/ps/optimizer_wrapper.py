@@ -15,6 +15,7 @@
 
 import threading
 
+import numpy as np
 import tensorflow as tf
 from tensorflow.keras import backend as K
 from tensorflow.keras.optimizers import (
@@ -31,6 +32,9 @@ from tensorflow.keras.optimizers import (
 from elasticdl.python.common.log_utils import default_logger as logger
 from elasticdl.python.ps.embedding_table import get_slot_table_name
 
+# The number of striped locks of the embedding rows in Hogwild mode.
+_NUM_ROW_LOCK_STRIPES = 1024
+
 
 def _get_embedding_layer_name_from_var(var):
     """Get name for ElasticDL embedding layer from variable."""
@@ -75,6 +79,13 @@ class OptimizerWrapper(object):
     Otherwise, `OptimizerWrapper` looks up embedding vectors and slot values
     from external kv store before updating variables, and updates embedding
     vectors and slot values in kv store after updating variables.
+
+    By default, updates involving embedding tables are serialized by a
+    global lock. In Hogwild mode (`use_hogwild=True`, asynchronous SGD
+    only), an update only holds the striped locks of the embedding ids it
+    touches during the lookup, apply and write-back of their rows and
+    slots, so the updates of disjoint rows run concurrently while the
+    updates of the same row are still serialized.
     """
 
     def __init__(
@@ -83,6 +94,7 @@ class OptimizerWrapper(object):
         use_async=False,
         lookup_embedding_func=None,
         update_embedding_func=None,
+        use_hogwild=False,
     ):
         """
         Arguments:
@@ -100,6 +112,9 @@ class OptimizerWrapper(object):
                 argument of this function is a list of keys.
             update_embedding_func: The function to update embeddings. The
                 arguments of this function is a key list and a value list.
+            use_hogwild: A python bool. True if updating embedding tables
+                with striped row locks instead of the global lock. It only
+                takes effect when `use_async=True`.
         """
         self._opt = opt
         self._use_async = use_async
@@ -107,7 +122,16 @@ class OptimizerWrapper(object):
         self._update_embedding_func = update_embedding_func
         self._slot_initial_value = {}
 
+        self._use_hogwild = use_async and use_hogwild
         self._update_gradient_lock = threading.Lock()
+        # A lock of the embedding rows and slots of the ids with the same
+        # remainder modulo the number of stripes, in Hogwild mode.
+        self._row_locks = [
+            threading.Lock() for _ in range(_NUM_ROW_LOCK_STRIPES)
+        ]
+        # Guards the slot bookkeeping shared in `self._opt`, which is still
+        # mutated by all threads in Hogwild mode.
+        self._opt_slots_lock = threading.Lock()
         self._tls = threading.local()
         self._init_thread_local()
         self._has_embedding = False
@@ -165,12 +189,36 @@ class OptimizerWrapper(object):
         if not hasattr(self._tls, "_embed_variables"):
             self._init_thread_local()
 
-        if self._has_embedding:
+        if self._use_hogwild:
+            # Acquire the striped locks in ascending order to avoid
+            # deadlocks between concurrent updates.
+            row_locks = [
+                self._row_locks[stripe]
+                for stripe in self._get_row_lock_stripes(grads_and_vars)
+            ]
+            for lock in row_locks:
+                lock.acquire()
+            try:
+                self._update_parameters_by_gradients(grads_and_vars)
+            finally:
+                for lock in reversed(row_locks):
+                    lock.release()
+        elif self._has_embedding:
             with self._update_gradient_lock:
                 self._update_parameters_by_gradients(grads_and_vars)
         else:
             self._update_parameters_by_gradients(grads_and_vars)
 
+    def _get_row_lock_stripes(self, grads_and_vars):
+        """Return the sorted stripes of the locks of the embedding ids
+        in `grads_and_vars`."""
+        stripes = set()
+        for grad, var in grads_and_vars:
+            if isinstance(var, str):
+                ids = np.asarray(grad.indices)
+                stripes.update(np.unique(ids % _NUM_ROW_LOCK_STRIPES).tolist())
+        return sorted(stripes)
+
     def _update_parameters_by_gradients(self, grads_and_vars):
         """Update parameters by gradients received by GRPC"""
         grads_and_vars_new = []
@@ -293,18 +341,19 @@ class OptimizerWrapper(object):
     def _update_slot_variable_to_optimizer(
         self, slot_name, embed_var, slot_var
     ):
-        if slot_name not in self._opt._slot_names:
-            self._opt._slot_names.append(slot_name)
         var_key = _var_key(embed_var)
-        slot_dict = self._opt._slots.setdefault(var_key, {})
-        if slot_name not in slot_dict:
-            slot_dict[slot_name] = slot_var
-            self._opt._weights.append(slot_var)
-        else:
-            raise RuntimeError(
-                "Variable with var_key %s and slot_name %s is not expected to "
-                "be in self._opt." % (var_key, slot_name)
-            )
+        with self._opt_slots_lock:
+            if slot_name not in self._opt._slot_names:
+                self._opt._slot_names.append(slot_name)
+            slot_dict = self._opt._slots.setdefault(var_key, {})
+            if slot_name not in slot_dict:
+                slot_dict[slot_name] = slot_var
+                self._opt._weights.append(slot_var)
+            else:
+                raise RuntimeError(
+                    "Variable with var_key %s and slot_name %s is not "
+                    "expected to be in self._opt." % (var_key, slot_name)
+                )
 
     def _update_embedding_param(self):
         """Report updated embedding vectors and slots to kv store."""
@@ -324,16 +373,17 @@ class OptimizerWrapper(object):
         for layer_name, slots in self._tls._slot_variables.items():
             embed_var = self._get_embedding_variable(layer_name)
             embed_var_key = _var_key(embed_var)
-            if embed_var_key in self._opt._slots:
-                del self._opt._slots[embed_var_key]
-            for _, var in slots.items():
-                opt_weight_iter = 0
-                while opt_weight_iter < len(self._opt._weights):
-                    if var is self._opt._weights[opt_weight_iter]:
-                        self._opt._weights.pop(opt_weight_iter)
-                        break
-                    else:
-                        opt_weight_iter += 1
+            with self._opt_slots_lock:
+                if embed_var_key in self._opt._slots:
+                    del self._opt._slots[embed_var_key]
+                for _, var in slots.items():
+                    opt_weight_iter = 0
+                    while opt_weight_iter < len(self._opt._weights):
+                        if var is self._opt._weights[opt_weight_iter]:
+                            self._opt._weights.pop(opt_weight_iter)
+                            break
+                        else:
+                            opt_weight_iter += 1
 
         # Delete variables in unique_ids_all_layers.
         for key in list(self._tls._unique_ids_all_layers.keys()):
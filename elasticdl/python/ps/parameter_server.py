@@ -37,7 +37,15 @@ class ParameterServer(object):
         self.grads_to_wait = args.grads_to_wait
         self.lr_staleness_modulation = args.lr_staleness_modulation
         self.sync_version_tolerance = args.sync_version_tolerance
+        self.num_backup_workers = args.num_backup_workers
+        self.sync_deadline_secs = args.sync_deadline_secs
+        self.ssp_staleness = args.ssp_staleness
+        self.ssp_worker_timeout_secs = args.ssp_worker_timeout_secs
+        self.embedding_pull_window_ms = args.embedding_pull_window_ms
+        self.max_inflight_checkpoints = args.max_inflight_checkpoints
+        self.max_evaluation_snapshots = args.max_evaluation_snapshots
         self.use_async = args.use_async
+        self.use_hogwild = args.use_hogwild
         self.port = args.port
         model_module = load_module(
             get_module_file_path(args.model_zoo, args.model_def)
@@ -85,6 +93,8 @@ class ParameterServer(object):
                 args.checkpoint_steps,
                 args.keep_checkpoint_max,
                 include_evaluation=False,
+                full_checkpoint_steps=args.full_checkpoint_steps,
+                checkpoint_format=args.checkpoint_format,
             )
         else:
             self.checkpoint_saver = None
@@ -111,10 +121,19 @@ class ParameterServer(object):
             self.optimizer,
             lr_staleness_modulation=self.lr_staleness_modulation,
             sync_version_tolerance=self.sync_version_tolerance,
+            num_backup_workers=self.num_backup_workers,
+            sync_deadline_secs=self.sync_deadline_secs,
+            ssp_staleness=self.ssp_staleness,
+            ssp_worker_timeout_secs=self.ssp_worker_timeout_secs,
+            embedding_pull_window_ms=self.embedding_pull_window_ms,
+            num_workers=self.num_workers,
             use_async=self.use_async,
+            use_hogwild=self.use_hogwild,
             evaluation_steps=self.evaluation_steps,
+            max_evaluation_snapshots=self.max_evaluation_snapshots,
             master_channel=self.master_channel,
             checkpoint_saver=self.checkpoint_saver,
+            max_inflight_checkpoints=self.max_inflight_checkpoints,
             ps_id=self.ps_id,
             num_ps_pods=self.num_ps_pods,
         )
@@ -124,6 +143,7 @@ class ParameterServer(object):
         server.add_insecure_port("[::]:{}".format(self.port))
         server.start()
         self.server = server
+        self.servicer = pserver_servicer
         self.logger.info("RPC Server started at port: %d", self.port)
 
     def run(self):
@@ -158,3 +178,4 @@ class ParameterServer(object):
 
         self.server.stop(0)
         self.logger.info("RPC server stopped")
+        self.servicer.flush_checkpoints()
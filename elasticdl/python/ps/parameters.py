@@ -11,6 +11,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
 import tensorflow as tf
 
 from elasticdl.proto import elasticdl_pb2
@@ -23,6 +24,7 @@ from elasticdl.python.common.tensor_utils import (
 from elasticdl.python.ps.embedding_table import (
     EmbeddingTable,
     create_embedding_table,
+    embedding_vectors_to_indexed_slices,
     get_slot_table_name,
 )
 
@@ -45,6 +47,7 @@ class Parameters(object):
         self.initialized = False
         self.non_embedding_params = {}
         self.embedding_params = {}
+        self._track_dirty_rows = False
 
     def reset(self):
         self.version = 0
@@ -161,7 +164,30 @@ class Parameters(object):
     def init_embedding_params(self, embeddings_pb):
         for pb in embeddings_pb:
             if pb.name not in self.embedding_params:
-                self.embedding_params[pb.name] = create_embedding_table(pb)
+                table = create_embedding_table(pb)
+                if self._track_dirty_rows:
+                    table.track_dirty_ids()
+                self.embedding_params[pb.name] = table
+
+    def track_dirty_rows(self):
+        """Tracks the embedding vectors initialized or updated in the
+        embedding tables for delta checkpoints. Slot tables are not
+        tracked since they are not saved to checkpoints.
+        """
+        self._track_dirty_rows = True
+        for table in self.embedding_params.values():
+            if not table.is_slot:
+                table.track_dirty_ids()
+
+    def pop_dirty_rows(self):
+        """Returns a dict from the embedding table name to the ids of the
+        embedding vectors initialized or updated since the last call.
+        """
+        return {
+            name: table.pop_dirty_ids()
+            for name, table in self.embedding_params.items()
+            if not table.is_slot
+        }
 
     def has_embedding_params(self):
         return len(self.embedding_params) > 0
@@ -182,26 +208,63 @@ class Parameters(object):
                     True,
                 )
 
-    def to_model_pb(self):
+    def to_model_pb(self, embedding_ids=None):
         """ Convert all parameters including embedding and non-embedding
         parameters to `elasticdl_pb2.Model` which can be serialized.
+
+        Args:
+            embedding_ids: A dict from the embedding table name to the ids
+                of the embedding vectors to convert, e.g. the dirty rows
+                for a delta checkpoint. If None, all embedding vectors are
+                converted.
         """
-        model_pb = elasticdl_pb2.Model()
-        model_pb.version = self.version
-        for name, var in self.non_embedding_params.items():
-            serialize_ndarray(var.numpy(), model_pb.dense_parameters[name])
+        return self.snapshot(embedding_ids).to_model_pb()
 
+    def snapshot(self, embedding_ids=None):
+        """Takes a `ParametersSnapshot` which can be converted to
+        `elasticdl_pb2.Model` later while the parameters are being updated.
+
+        Args:
+            embedding_ids: A dict from the embedding table name to the ids
+                of the embedding vectors in the snapshot. If None, all
+                embedding vectors are in the snapshot.
+        """
+        dense_params = {
+            name: var.numpy()
+            for name, var in self.non_embedding_params.items()
+        }
+        embedding_tables = {}
+        embedding_table_infos = []
         for name, embedding_table in self.embedding_params.items():
             # Slot embedding table is not weights in the model, so we don't
             # save it to checkpoint.
             if not embedding_table.is_slot:
-                serialize_indexed_slices(
-                    embedding_table.to_indexed_slices(),
-                    model_pb.embedding_tables[name],
-                )
+                if embedding_ids is None:
+                    embedding_tables[name] = embedding_table.snapshot()
+                elif embedding_ids.get(name):
+                    embedding_tables[name] = embedding_table.snapshot(
+                        embedding_ids[name]
+                    )
                 embedding_info = embedding_table.to_embedding_table_info_pb()
-                model_pb.embedding_table_infos.append(embedding_info)
-        return model_pb
+                embedding_table_infos.append(embedding_info)
+        return ParametersSnapshot(
+            self.version, dense_params, embedding_tables, embedding_table_infos
+        )
+
+    def evaluation_snapshot(self):
+        """Takes an `EvaluationSnapshot` for evaluating the current model
+        version while the parameters are being updated.
+        """
+        dense_params = {
+            name: var.numpy()
+            for name, var in self.non_embedding_params.items()
+        }
+        embedding_tables = {
+            name: embedding_table.cow_snapshot()
+            for name, embedding_table in self.embedding_params.items()
+            if not embedding_table.is_slot
+        }
+        return EvaluationSnapshot(self.version, dense_params, embedding_tables)
 
     def debug_info(self):
         info = ""
@@ -222,3 +285,83 @@ class Parameters(object):
             total_size += size
         info += "Total parameters size: %d bytes" % total_size
         return info
+
+
+class ParametersSnapshot(object):
+    """
+    ParametersSnapshot is a consistent snapshot of `Parameters` for
+    checkpoints. The values of non-embedding parameters are copied, and the
+    embedding vectors are shared with the embedding tables in a
+    copy-on-write manner, so taking a snapshot is much cheaper than
+    converting the parameters to `elasticdl_pb2.Model`.
+    """
+
+    def __init__(
+        self, version, dense_params, embedding_tables, embedding_table_infos
+    ):
+        """
+        Args:
+            version: The model version.
+            dense_params: A dict from the parameter name to the value in a
+                numpy.ndarray.
+            embedding_tables: A dict from the embedding table name to a dict
+                from id to embedding vector.
+            embedding_table_infos: A list of `EmbeddingTableInfo`.
+        """
+        self.version = version
+        self.dense_params = dense_params
+        self.embedding_tables = embedding_tables
+        self.embedding_table_infos = embedding_table_infos
+
+    def to_model_pb(self):
+        model_pb = elasticdl_pb2.Model()
+        model_pb.version = self.version
+        for name, value in self.dense_params.items():
+            serialize_ndarray(value, model_pb.dense_parameters[name])
+        for name, embedding_vectors in self.embedding_tables.items():
+            serialize_indexed_slices(
+                embedding_vectors_to_indexed_slices(embedding_vectors),
+                model_pb.embedding_tables[name],
+            )
+        model_pb.embedding_table_infos.extend(self.embedding_table_infos)
+        return model_pb
+
+
+class EvaluationSnapshot(object):
+    """
+    EvaluationSnapshot is a snapshot of `Parameters` for evaluation. The
+    values of non-embedding parameters are copied, and the embedding tables
+    are `EmbeddingTableSnapshot`s which only keep the embedding vectors
+    replaced after the snapshot is taken. So taking it does not depend on
+    the size of the embedding tables.
+    """
+
+    def __init__(self, version, dense_params, embedding_tables):
+        """
+        Args:
+            version: The model version.
+            dense_params: A dict from the parameter name to the value in a
+                numpy.ndarray.
+            embedding_tables: A dict from the embedding table name to an
+                `EmbeddingTableSnapshot`.
+        """
+        self.version = version
+        self.dense_params = dense_params
+        self.embedding_tables = embedding_tables
+
+    def get_embedding_param(self, name, indices, parameters):
+        """Returns the embedding vectors of `indices` in the snapshot as a
+        2-D numpy.ndarray. The embedding vectors which are lazily
+        initialized after the snapshot is taken are looked up in the
+        `Parameters` instance `parameters`.
+        """
+        if len(indices) == 0:
+            return None
+        if name not in self.embedding_tables:
+            return parameters.get_embedding_param(name, indices)
+        vectors = self.embedding_tables[name].get(indices)
+        new_ids = [i for i, v in zip(indices, vectors) if v is None]
+        if new_ids:
+            new_vectors = iter(parameters.get_embedding_param(name, new_ids))
+            vectors = [next(new_vectors) if v is None else v for v in vectors]
+        return np.stack(vectors)
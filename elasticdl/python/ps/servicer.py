@@ -12,6 +12,8 @@
 # limitations under the License.
 
 import threading
+import time
+from collections import OrderedDict, deque, namedtuple
 
 import tensorflow as tf
 from google.protobuf import empty_pb2
@@ -20,14 +22,34 @@ from tensorflow.keras import backend as K
 
 from elasticdl.proto import elasticdl_pb2, elasticdl_pb2_grpc
 from elasticdl.python.common.log_utils import default_logger as logger
+from elasticdl.python.common.save_utils import AsyncCheckpointWriter
 from elasticdl.python.common.tensor_utils import (
     Tensor,
-    merge_indexed_slices,
     pb_to_indexed_slices,
     pb_to_ndarray,
     serialize_ndarray,
 )
+from elasticdl.python.ps.embedding_pull_coalescer import EmbeddingPullCoalescer
+from elasticdl.python.ps.gradient_accumulator import GradientAccumulator
 from elasticdl.python.ps.optimizer_wrapper import OptimizerWrapper
+from elasticdl.python.ps.worker_clocks import WorkerClocks
+
+# The number of recent model versions to keep statistics in sync SGD
+_MAX_SYNC_STATS_NUM = 100
+
+DEFAULT_SSP_WORKER_TIMEOUT_SECS = 60
+# The seconds after which a worker running too far ahead in SSP mode pushes
+# the gradients again.
+SSP_RETRY_AFTER_SECS = 0.1
+
+# Statistics of a model version updated by synchronous SGD. `wait_secs` is
+# the time from the first gradient of the version to the model update, and
+# `dropped_grads_num` is the number of stale gradients rejected since the
+# previous update.
+SyncVersionStats = namedtuple(
+    "SyncVersionStats",
+    ("version", "wait_secs", "grads_num", "dropped_grads_num"),
+)
 
 
 class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
@@ -40,10 +62,19 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
         optimizer,
         lr_staleness_modulation=False,
         sync_version_tolerance=0,
+        num_backup_workers=0,
+        sync_deadline_secs=0,
+        ssp_staleness=0,
+        ssp_worker_timeout_secs=DEFAULT_SSP_WORKER_TIMEOUT_SECS,
         use_async=False,
+        use_hogwild=False,
+        embedding_pull_window_ms=0,
+        num_workers=None,
         evaluation_steps=0,
+        max_evaluation_snapshots=0,
         master_channel=None,
         checkpoint_saver=None,
+        max_inflight_checkpoints=0,
         ps_id=None,
         num_ps_pods=None,
     ):
@@ -56,10 +87,44 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
         self._grads_to_wait = grads_to_wait
         self._optimizer = optimizer
         self._lr_staleness_modulation = lr_staleness_modulation
-        self._sync_version_tolerance = sync_version_tolerance
+        # The gradients reported later than the first `grads_to_wait`
+        # gradients of a version are stale in the backup-worker mode.
+        self._sync_version_tolerance = (
+            0 if num_backup_workers > 0 else sync_version_tolerance
+        )
+        self._sync_deadline_secs = sync_deadline_secs
         self._use_async = use_async
+        self._use_hogwild = use_hogwild
+        self._worker_clocks = (
+            WorkerClocks(ssp_staleness, ssp_worker_timeout_secs)
+            if use_async and ssp_staleness > 0
+            else None
+        )
+        self._embedding_pull_coalescer = (
+            EmbeddingPullCoalescer(
+                parameters.get_embedding_param,
+                embedding_pull_window_ms / 1000.0,
+                max_batch_size=num_workers,
+            )
+            if embedding_pull_window_ms > 0
+            else None
+        )
         self._eval_steps = evaluation_steps
+        self._max_eval_snapshots = (
+            max_evaluation_snapshots if evaluation_steps else 0
+        )
+        # The parameter snapshots of the model versions to evaluate, from
+        # the oldest to the latest version.
+        self._eval_snapshots = OrderedDict()
+        self._eval_snapshots_lock = threading.Lock()
         self._checkpoint_saver = checkpoint_saver
+        if checkpoint_saver and checkpoint_saver.is_delta_enabled():
+            self._parameters.track_dirty_rows()
+        self._checkpoint_writer = (
+            AsyncCheckpointWriter(checkpoint_saver, max_inflight_checkpoints)
+            if checkpoint_saver and max_inflight_checkpoints > 0
+            else None
+        )
         self._ps_id = ps_id
         self._num_ps_pods = num_ps_pods
         self._version_lock = threading.Lock()
@@ -67,7 +132,12 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
         self._use_wrap_opt = False
 
         self._grads_n = 0
-        self._grads_buffer = {}
+        self._grads_buffer = GradientAccumulator()
+        self._learning_rate = 0.0
+        self._wait_start_time = 0.0
+        self._deadline_timer = None
+        self._dropped_grads_n = 0
+        self._sync_stats = deque(maxlen=_MAX_SYNC_STATS_NUM)
 
     def pull_dense_parameters(self, request, _):
         """
@@ -78,6 +148,19 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
             res.initialized = False
             return res
 
+        if request.snapshot_version > 0:
+            snapshot = self._get_eval_snapshot(request.snapshot_version)
+            if snapshot is not None:
+                res.version = snapshot.version
+                for name, value in snapshot.dense_params.items():
+                    serialize_ndarray(value, res.dense_parameters[name])
+                res.initialized = True
+                return res
+            logger.warning(
+                "No parameter snapshot of version %d, pull the latest "
+                "parameters instead" % request.snapshot_version
+            )
+
         # Only sync-SGD needs lock
         # TODO: use a read-write lock to support multiple concurrent reads
         if not self._use_async:
@@ -96,9 +179,23 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
         result = tensor_pb2.TensorProto()
         if not request.ids:
             return result
-        embedding_vectors = self._parameters.get_embedding_param(
-            request.name, request.ids
+        snapshot = (
+            self._get_eval_snapshot(request.snapshot_version)
+            if request.snapshot_version > 0
+            else None
         )
+        if snapshot is not None:
+            embedding_vectors = snapshot.get_embedding_param(
+                request.name, request.ids, self._parameters
+            )
+        elif self._embedding_pull_coalescer:
+            embedding_vectors = self._embedding_pull_coalescer.pull(
+                request.name, request.ids
+            )
+        else:
+            embedding_vectors = self._parameters.get_embedding_param(
+                request.name, request.ids
+            )
         serialize_ndarray(embedding_vectors, result)
         return result
 
@@ -120,6 +217,17 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
     def push_gradients(self, request, _):
         res = elasticdl_pb2.PushGradientsResponse()
         if self._use_async:
+            # In SSP mode, a worker running too far ahead of the slowest
+            # worker pushes the gradients again later, so that it does not
+            # hold a gRPC thread needed by the slower workers.
+            if self._worker_clocks and not self._worker_clocks.tick(
+                request.worker_id
+            ):
+                res.accepted = False
+                res.version = self._parameters.version
+                res.retry_after_secs = SSP_RETRY_AFTER_SECS
+                return res
+
             grad_vars = []
 
             for name, pb in request.gradients.dense_parameters.items():
@@ -157,6 +265,7 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
             with self._version_lock:
                 self._parameters.version += 1
                 self._save_params_to_checkpoint_if_needed()
+                self._take_eval_snapshot_if_needed()
                 version = self._parameters.version
             self._report_version_if_needed(version)
 
@@ -164,69 +273,42 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
             res.version = self._parameters.version
             return res
         else:
-            if (
-                request.gradients.version
-                < self._parameters.version - self._sync_version_tolerance
-            ):
-                res.accepted = False
-                res.version = self._parameters.version
-                return res
-
             with self._lock:
+                # Check the version with the lock held, since the version
+                # may be updated by another gradient before the lock is
+                # acquired, and a stale gradient must not be added to the
+                # gradients of the next version.
+                if (
+                    request.gradients.version
+                    < self._parameters.version - self._sync_version_tolerance
+                ):
+                    self._dropped_grads_n += 1
+                    res.accepted = False
+                    res.version = self._parameters.version
+                    return res
+
                 for name, pb in request.gradients.dense_parameters.items():
                     grad = pb_to_ndarray(pb)
                     self._parameters.check_grad(Tensor(name, grad, None))
-                    if name in self._grads_buffer:
-                        self._grads_buffer[name] = (
-                            self._grads_buffer[name] + grad
-                        )
-                    else:
-                        self._grads_buffer[name] = grad
+                    self._grads_buffer.add_dense(name, grad)
 
                 for name, pb in request.gradients.embedding_tables.items():
                     grad = pb_to_indexed_slices(pb)
                     self._parameters.check_grad(
                         Tensor(name, grad.values, grad.indices)
                     )
-                    if name in self._grads_buffer:
-                        self._grads_buffer[name] = merge_indexed_slices(
-                            self._grads_buffer[name], grad
-                        )
-                    else:
-                        self._grads_buffer[name] = grad
+                    self._grads_buffer.add_sparse(name, grad)
 
+                if self._grads_n == 0:
+                    self._start_waiting_for_grads()
                 self._grads_n += 1
+                self._learning_rate = request.learning_rate
                 res.accepted = True
 
                 updated_version = False
                 version = self._parameters.version
                 if self._grads_n == self._grads_to_wait:
-                    grad_vars = []
-                    for name, grad in self._grads_buffer.items():
-                        # Dense gradients are averaged,
-                        # while sparse gradients are summed
-                        if not isinstance(grad, Tensor):
-                            grad = grad / self._grads_to_wait
-                            grad = tf.constant(grad)
-                        var = self._parameters.get_non_embedding_param(name)
-                        if var is None:
-                            grad_vars.append(
-                                (
-                                    tf.IndexedSlices(
-                                        grad.values, grad.indices
-                                    ),
-                                    name,
-                                )
-                            )
-                        else:
-                            grad_vars.append((grad, var))
-
-                    self._set_optimizer_learning_rate(request.learning_rate)
-                    self._optimizer.apply_gradients(grad_vars)
-                    self._grads_n = 0
-                    self._grads_buffer.clear()
-                    self._parameters.version += 1
-                    self._save_params_to_checkpoint_if_needed()
+                    self._update_model_by_buffered_grads()
                     version = self._parameters.version
                     updated_version = True
 
@@ -235,12 +317,105 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
             res.version = version
             return res
 
+    def _start_waiting_for_grads(self):
+        """Starts waiting for the gradients of the current model version.
+        If the deadline is enabled, a timer updates the model with the
+        gradients received so far once the deadline expires.
+        """
+        self._wait_start_time = time.time()
+        if self._sync_deadline_secs > 0:
+            self._deadline_timer = threading.Timer(
+                self._sync_deadline_secs,
+                self._update_model_on_deadline,
+                args=(self._parameters.version,),
+            )
+            self._deadline_timer.daemon = True
+            self._deadline_timer.start()
+
+    def _update_model_on_deadline(self, version):
+        with self._lock:
+            if self._parameters.version != version or self._grads_n == 0:
+                return
+            logger.info(
+                "Deadline expired with %d of %d gradients for version %d"
+                % (self._grads_n, self._grads_to_wait, version)
+            )
+            self._update_model_by_buffered_grads()
+            version = self._parameters.version
+        self._report_version_if_needed(version)
+
+    def _update_model_by_buffered_grads(self):
+        """Updates the model with the buffered gradients in synchronous SGD.
+        It must be called with `self._lock` held.
+        """
+        if self._deadline_timer:
+            self._deadline_timer.cancel()
+            self._deadline_timer = None
+
+        grad_vars = []
+        for name, grad in self._grads_buffer.items():
+            # Dense gradients are averaged,
+            # while sparse gradients are summed
+            if not isinstance(grad, Tensor):
+                grad /= self._grads_n
+                grad = tf.constant(grad)
+            var = self._parameters.get_non_embedding_param(name)
+            if var is None:
+                grad_vars.append(
+                    (tf.IndexedSlices(grad.values, grad.indices), name)
+                )
+            else:
+                grad_vars.append((grad, var))
+
+        self._set_optimizer_learning_rate(self._learning_rate)
+        self._optimizer.apply_gradients(grad_vars)
+        self._record_sync_stats()
+        self._grads_n = 0
+        self._grads_buffer.reset()
+        self._parameters.version += 1
+        self._save_params_to_checkpoint_if_needed()
+        self._take_eval_snapshot_if_needed()
+
+    def _record_sync_stats(self):
+        stats = SyncVersionStats(
+            version=self._parameters.version + 1,
+            wait_secs=time.time() - self._wait_start_time,
+            grads_num=self._grads_n,
+            dropped_grads_num=self._dropped_grads_n,
+        )
+        self._dropped_grads_n = 0
+        self._sync_stats.append(stats)
+        # Only log the versions affected by stragglers at INFO level
+        log = (
+            logger.info
+            if stats.dropped_grads_num or stats.grads_num < self._grads_to_wait
+            else logger.debug
+        )
+        log(
+            "Version %d waited %.3fs for %d gradients, "
+            "%d stale gradients dropped"
+            % (
+                stats.version,
+                stats.wait_secs,
+                stats.grads_num,
+                stats.dropped_grads_num,
+            )
+        )
+
+    def get_sync_stats(self):
+        """Returns the `SyncVersionStats` of the recent model versions
+        updated by synchronous SGD, from the oldest to the latest.
+        """
+        with self._lock:
+            return list(self._sync_stats)
+
     def wrap_optimizer(self):
         self._optimizer = OptimizerWrapper(
             self._optimizer,
             self._use_async,
             self._parameters.get_embedding_param,
             self._parameters.set_embedding_param,
+            use_hogwild=self._use_hogwild,
         )
 
     def _report_version_if_needed(self, version):
@@ -250,7 +425,47 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
     def _report_version(self, version):
         req = elasticdl_pb2.ReportVersionRequest()
         req.model_version = version
-        self._master_stub.report_version(req)
+        res = self._master_stub.report_version(req)
+        if self._max_eval_snapshots:
+            self._release_eval_snapshots(version, res.evaluation_versions)
+
+    def _take_eval_snapshot_if_needed(self):
+        """Take a snapshot of parameters if the master may evaluate the
+        current model version, i.e. the version is reported to the master.
+        It must be called once the version is updated.
+        """
+        version = self._parameters.version
+        if not self._max_eval_snapshots or version % self._eval_steps:
+            return
+        snapshot = self._parameters.evaluation_snapshot()
+        with self._eval_snapshots_lock:
+            self._eval_snapshots[version] = snapshot
+            while len(self._eval_snapshots) > self._max_eval_snapshots:
+                self._eval_snapshots.popitem(last=False)
+
+    def _release_eval_snapshots(self, reported_version, evaluation_versions):
+        """Release the snapshots of the versions up to the reported version
+        which the master is not going to evaluate.
+        """
+        evaluation_versions = set(evaluation_versions)
+        with self._eval_snapshots_lock:
+            for version in list(self._eval_snapshots.keys()):
+                if (
+                    version <= reported_version
+                    and version not in evaluation_versions
+                ):
+                    del self._eval_snapshots[version]
+
+    def _get_eval_snapshot(self, version):
+        with self._eval_snapshots_lock:
+            return self._eval_snapshots.get(version)
+
+    def get_eval_snapshot_versions(self):
+        """Returns the model versions of the parameter snapshots kept for
+        evaluation.
+        """
+        with self._eval_snapshots_lock:
+            return list(self._eval_snapshots.keys())
 
     def wrap_optimizer_and_set_slot(self):
         if not self._use_wrap_opt:
@@ -267,16 +482,39 @@ class PserverServicer(elasticdl_pb2_grpc.PserverServicer):
             self._checkpoint_saver
             and self._parameters.version % self._checkpoint_saver._steps == 0
         ):
-            model_pb = self._parameters.to_model_pb()
-
-            logger.info("Save checkpoint for version %s" % model_pb.version)
-            self._checkpoint_saver.save(
-                model_pb.version,
-                model_pb,
-                is_eval_checkpoint=False,
-                shard_index=self._ps_id,
-                shard_num=self._num_ps_pods,
+            is_delta = not self._checkpoint_saver.need_full_checkpoint(
+                self._parameters.version
             )
+            # Pop the dirty rows before the snapshot, so the rows updated
+            # meanwhile are saved again in the next checkpoint.
+            dirty_rows = self._parameters.pop_dirty_rows()
+            snapshot = self._parameters.snapshot(
+                dirty_rows if is_delta else None
+            )
+
+            logger.info(
+                "Save %s checkpoint for version %s"
+                % ("delta" if is_delta else "full", snapshot.version)
+            )
+            if self._checkpoint_writer:
+                self._checkpoint_writer.submit(
+                    snapshot,
+                    shard_index=self._ps_id,
+                    shard_num=self._num_ps_pods,
+                    is_delta=is_delta,
+                )
+            else:
+                self._checkpoint_saver.save_snapshot(
+                    snapshot,
+                    shard_index=self._ps_id,
+                    shard_num=self._num_ps_pods,
+                    is_delta=is_delta,
+                )
+
+    def flush_checkpoints(self):
+        """Wait until the checkpoints saving in background are saved."""
+        if self._checkpoint_writer:
+            self._checkpoint_writer.flush()
 
     def _set_optimizer_learning_rate(self, learning_rate):
         if learning_rate == 0.0:
@@ -0,0 +1,94 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+from elasticdl.python.common.log_utils import default_logger as logger
+
+
+class WorkerClocks(object):
+    """
+    WorkerClocks implements the stale synchronous parallel (SSP) barrier
+    for asynchronous SGD. Each worker has its own clock, which is the number
+    of gradients it has pushed. A worker ahead of the slowest live worker
+    by more than `staleness` steps cannot push more gradients until the
+    slowest one catches up or leaves. The barrier never blocks the caller,
+    so the PS asks the worker to push the gradients again later instead of
+    holding a gRPC thread.
+
+    Workers are tracked by the gradients they push:
+    - A worker joins with the clock of the slowest live worker, so it
+      neither blocks the others nor is blocked by them.
+    - A worker leaves if it has not pushed gradients for
+      `worker_timeout_secs` seconds. A worker retrying to push is live.
+    """
+
+    def __init__(self, staleness, worker_timeout_secs):
+        """
+        Args:
+            staleness: The maximum number of steps that the fastest worker
+                can run ahead of the slowest live worker.
+            worker_timeout_secs: A worker is considered to have left if it
+                has not pushed gradients for this many seconds.
+        """
+        self._staleness = staleness
+        self._worker_timeout_secs = worker_timeout_secs
+        self._clocks = {}
+        self._last_seen_time = {}
+        self._lock = threading.Lock()
+
+    def tick(self, worker_id):
+        """Advances the clock of the worker by one step unless the worker
+        is more than `staleness` steps ahead of the slowest live worker.
+
+        Returns:
+            True if the clock is advanced, i.e. the worker can push the
+            gradients, or False if the worker has to push them later.
+        """
+        with self._lock:
+            if worker_id not in self._clocks:
+                # The worker joins with the slowest clock
+                self._clocks[worker_id] = self._min_clock()
+                logger.info(
+                    "Worker %d joins SSP with clock %d"
+                    % (worker_id, self._clocks[worker_id])
+                )
+            self._last_seen_time[worker_id] = time.time()
+            self._remove_dead_workers()
+            if self._clocks[worker_id] - self._min_clock() > self._staleness:
+                return False
+            self._clocks[worker_id] += 1
+            return True
+
+    def get_clocks(self):
+        with self._lock:
+            return dict(self._clocks)
+
+    def _min_clock(self):
+        return min(self._clocks.values()) if self._clocks else 0
+
+    def _remove_dead_workers(self):
+        now = time.time()
+        dead_workers = [
+            worker_id
+            for worker_id, last_seen_time in self._last_seen_time.items()
+            if now - last_seen_time > self._worker_timeout_secs
+        ]
+        for worker_id in dead_workers:
+            logger.info(
+                "Worker %d leaves SSP with clock %d"
+                % (worker_id, self._clocks[worker_id])
+            )
+            del self._clocks[worker_id]
+            del self._last_seen_time[worker_id]
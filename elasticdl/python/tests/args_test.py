@@ -14,6 +14,8 @@
 import unittest
 
 from elasticdl.python.common.args import (
+    get_non_default_ps_params,
+    parse_master_args,
     parse_ps_args,
     wrap_go_args_with_string,
 )
@@ -52,6 +54,45 @@ class ArgsTest(unittest.TestCase):
         self.assertEqual(parsed_args.model_zoo, model_zoo)
         self.assertEqual(parsed_args.model_def, model_def)
 
+    def test_parse_master_args_with_negative_full_evaluation_steps(self):
+        self.assertRaises(
+            ValueError,
+            parse_master_args,
+            [
+                "--job_name",
+                "test_args",
+                "--model_zoo",
+                "dummy_zoo",
+                "--model_def",
+                "dummy_def",
+                "--training_data",
+                "dummy_data",
+                "--full_evaluation_steps",
+                "-10",
+            ],
+        )
+
+    def test_get_non_default_ps_params(self):
+        master_args = [
+            "--job_name",
+            "test_args",
+            "--model_zoo",
+            "dummy_zoo",
+            "--model_def",
+            "dummy_def",
+            "--training_data",
+            "dummy_data",
+        ]
+        args = parse_master_args(master_args)
+        self.assertEqual(get_non_default_ps_params(args), [])
+        args = parse_master_args(
+            master_args + ["--use_hogwild", "true", "--ssp_staleness", "3"]
+        )
+        self.assertEqual(
+            sorted(get_non_default_ps_params(args)),
+            ["ssp_staleness", "use_hogwild"],
+        )
+
     def test_wrap_go_args_with_string(self):
         args = [
             "-ps_id=0",
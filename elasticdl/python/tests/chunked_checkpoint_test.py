@@ -0,0 +1,103 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import tensorflow as tf
+
+from elasticdl.python.common.chunked_checkpoint import (
+    MANIFEST_FILE,
+    ChunkedCheckpointReader,
+    save_snapshot_to_chunked_dir,
+)
+from elasticdl.python.ps.embedding_table import EmbeddingTable
+from elasticdl.python.ps.parameters import Parameters
+
+
+class ChunkedCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.params = Parameters()
+        self.params.version = 10
+        self.params.non_embedding_params["dense/kernel:0"] = tf.Variable(
+            np.arange(6, dtype=np.float32).reshape(2, 3)
+        )
+        self.params.non_embedding_params["step"] = tf.Variable(np.int64(7))
+        self.ids = list(range(0, 50, 3))
+        self.values = np.random.rand(len(self.ids), 4).astype(np.float32)
+        table = EmbeddingTable("embedding", 4, "uniform")
+        table.set(self.ids, self.values)
+        self.params.embedding_params["embedding"] = table
+        self.params.embedding_params["empty"] = EmbeddingTable(
+            "empty", 2, "zeros"
+        )
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as shard_dir:
+            save_snapshot_to_chunked_dir(
+                self.params.snapshot(), shard_dir, chunk_rows=4
+            )
+            reader = ChunkedCheckpointReader(shard_dir)
+            self.assertEqual(reader.version, 10)
+
+            infos = reader.get_embedding_table_infos()
+            self.assertEqual(
+                [info.name for info in infos], ["embedding", "empty"]
+            )
+            self.assertEqual([info.dim for info in infos], [4, 2])
+
+            dense_params = reader.get_dense_parameters()
+            self.assertEqual(
+                sorted(dense_params.keys()), ["dense/kernel:0", "step"]
+            )
+            self.assertTrue(
+                np.array_equal(
+                    dense_params["dense/kernel:0"],
+                    np.arange(6, dtype=np.float32).reshape(2, 3),
+                )
+            )
+            self.assertEqual(dense_params["step"], 7)
+
+            chunks = list(reader.get_embedding_table_chunks())
+            # 17 embedding vectors in chunks of 4 rows
+            self.assertEqual([len(ids) for _, ids, _ in chunks], [4] * 4 + [1])
+            ids = np.concatenate([ids for _, ids, _ in chunks])
+            values = np.concatenate([values for _, _, values in chunks])
+            self.assertEqual(ids.tolist(), self.ids)
+            self.assertTrue(np.array_equal(values, self.values))
+
+    def test_checksum_mismatch(self):
+        with tempfile.TemporaryDirectory() as shard_dir:
+            save_snapshot_to_chunked_dir(
+                self.params.snapshot(), shard_dir, chunk_rows=4
+            )
+            with open(
+                os.path.join(shard_dir, "embedding-0.values"), "r+b"
+            ) as f:
+                f.seek(20)
+                f.write(b"\xff\xff\xff\xff")
+            reader = ChunkedCheckpointReader(shard_dir)
+            with self.assertRaisesRegex(ValueError, "Checksum mismatch"):
+                list(reader.get_embedding_table_chunks())
+
+    def test_incomplete_shard(self):
+        with tempfile.TemporaryDirectory() as shard_dir:
+            save_snapshot_to_chunked_dir(self.params.snapshot(), shard_dir)
+            os.remove(os.path.join(shard_dir, MANIFEST_FILE))
+            self.assertRaises(ValueError, ChunkedCheckpointReader, shard_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -16,28 +16,44 @@ import random
 import tempfile
 import time
 import unittest
+from unittest import mock
 
 import numpy as np
 import odps
+import recordio
 import tensorflow as tf
 from odps import ODPS
 
 from elasticdl.proto import elasticdl_pb2
-from elasticdl.python.common.constants import MaxComputeConfig
+from elasticdl.python.common.constants import (
+    MaxComputeConfig,
+    Mode,
+    ReaderType,
+)
 from elasticdl.python.common.model_utils import load_module
-from elasticdl.python.data.odps_io import is_odps_configured
-from elasticdl.python.data.reader.data_reader import Metadata
+from elasticdl.python.data.odps_io import ODPSReader, is_odps_configured
+from elasticdl.python.data.reader.data_reader import (
+    AbstractDataReader,
+    Metadata,
+    records_to_batch,
+)
 from elasticdl.python.data.reader.data_reader_factory import create_data_reader
 from elasticdl.python.data.reader.odps_reader import ODPSDataReader
+from elasticdl.python.data.reader.parquet_reader import pa, pq
 from elasticdl.python.data.reader.recordio_reader import RecordIODataReader
-from elasticdl.python.data.reader.text_reader import TextDataReader
+from elasticdl.python.data.reader.text_reader import (
+    TextDataReader,
+    load_line_offsets,
+)
 from elasticdl.python.master.task_manager import _Task
 from elasticdl.python.tests.test_utils import (
     IRIS_TABLE_COLUMN_NAMES,
     DatasetName,
+    FakeODPSTable,
     create_iris_csv_file,
     create_iris_odps_table,
     create_recordio_file,
+    fake_odps_table,
 )
 
 
@@ -72,6 +88,87 @@ class RecordIODataReaderTest(unittest.TestCase):
                 for k, v in parsed_record.items():
                     self.assertEqual(len(v.numpy()), 1)
 
+    def test_recordio_data_reader_scanner_reuse(self):
+        num_records = 30
+        with tempfile.TemporaryDirectory() as temp_dir_name:
+            shard_name = create_recordio_file(
+                num_records, DatasetName.TEST_MODULE, 1, temp_dir=temp_dir_name
+            )
+            reader = RecordIODataReader(data_dir=temp_dir_name)
+            all_records = list(
+                reader.read_records(
+                    _Task(shard_name, 0, num_records, elasticdl_pb2.TRAINING)
+                )
+            )
+            with mock.patch.object(
+                recordio, "Scanner", wraps=recordio.Scanner
+            ) as scanner_class:
+                records = []
+                for start in [0, 10, 20]:
+                    task = _Task(
+                        shard_name, start, start + 10, elasticdl_pb2.TRAINING
+                    )
+                    records.extend(reader.read_records(task))
+                self.assertEqual(records, all_records)
+                # The consecutive tasks are read with the same scanner.
+                self.assertEqual(scanner_class.call_count, 1)
+
+                # A task not following the previous one opens a scanner.
+                task = _Task(shard_name, 5, 8, elasticdl_pb2.TRAINING)
+                self.assertEqual(
+                    list(reader.read_records(task)), all_records[5:8]
+                )
+                self.assertEqual(scanner_class.call_count, 2)
+
+            # The idle scanners are closed with the reader.
+            scanner = mock.Mock()
+            reader._scanner_pool.release(shard_name, 30, scanner)
+            reader.close()
+            scanner.close.assert_called_once_with()
+            self.assertEqual(len(reader._scanner_pool._scanners), 0)
+
+    def test_recordio_data_reader_manifest(self):
+        with tempfile.TemporaryDirectory() as temp_dir_name:
+            data_dir = os.path.join(temp_dir_name, "data")
+            os.mkdir(data_dir)
+            for i in range(1, 4):
+                with open(os.path.join(data_dir, "f%d" % i), "w") as f:
+                    f.write("x" * i)
+            manifest_path = os.path.join(temp_dir_name, "manifest.json")
+            reader = RecordIODataReader(
+                data_dir=data_dir,
+                manifest_path=manifest_path,
+                num_discovery_threads=2,
+            )
+            expected_shards = [
+                (os.path.join(data_dir, "f%d" % i), 0, i) for i in range(1, 4)
+            ]
+            # Use the file sizes as the numbers of records.
+            with mock.patch(
+                "elasticdl.python.data.reader.recordio_reader."
+                "_get_num_records",
+                side_effect=os.path.getsize,
+            ) as get_num_records:
+                self.assertEqual(reader.create_shards(), expected_shards)
+                self.assertEqual(get_num_records.call_count, 3)
+                self.assertTrue(os.path.exists(manifest_path))
+
+                # Only the modified file is indexed again.
+                with open(os.path.join(data_dir, "f2"), "w") as f:
+                    f.write("x" * 5)
+                expected_shards[1] = (expected_shards[1][0], 0, 5)
+                self.assertEqual(reader.create_shards(), expected_shards)
+                self.assertEqual(get_num_records.call_count, 4)
+                get_num_records.assert_called_with(expected_shards[1][0])
+
+                # Without a manifest, nothing is written to `data_dir`.
+                reader = RecordIODataReader(data_dir=data_dir)
+                self.assertEqual(reader.create_shards(), expected_shards)
+                self.assertEqual(get_num_records.call_count, 7)
+                self.assertEqual(
+                    sorted(os.listdir(data_dir)), ["f1", "f2", "f3"]
+                )
+
 
 class TextDataReaderTest(unittest.TestCase):
     def test_csv_data_reader(self):
@@ -99,6 +196,358 @@ class TextDataReaderTest(unittest.TestCase):
             self.assertEqual(csv_data_reader.get_size(), num_records)
             self.assertEqual(record_count, 20)
 
+    def test_csv_data_reader_line_index(self):
+        with tempfile.TemporaryDirectory() as temp_dir_name:
+            csv_file_name = os.path.join(temp_dir_name, "data.csv")
+            lines = ["%d,%d\n" % (i, i * 2) for i in range(50)]
+            with open(csv_file_name, "w") as f:
+                # The last line does not end with a newline.
+                f.write("".join(lines).rstrip("\n"))
+            csv_data_reader = TextDataReader(
+                filename=csv_file_name, records_per_task=20
+            )
+            self.assertEqual(csv_data_reader.get_size(), 50)
+            self.assertTrue(os.path.exists(csv_file_name + ".line_index.npy"))
+            records = list(
+                csv_data_reader.read_records(
+                    _Task(csv_file_name, 45, 60, elasticdl_pb2.TRAINING)
+                )
+            )
+            self.assertEqual(records, lines[45:49] + ["49,98"])
+
+            # The saved index is reused by another reader, and rebuilt
+            # after the file is modified.
+            self.assertEqual(
+                load_line_offsets(csv_file_name)[-1],
+                os.path.getsize(csv_file_name),
+            )
+            time.sleep(0.01)
+            with open(csv_file_name, "a") as f:
+                f.write("\n50,100\n")
+            csv_data_reader = TextDataReader(
+                filename=csv_file_name, records_per_task=20
+            )
+            self.assertEqual(csv_data_reader.get_size(), 51)
+            records = list(
+                csv_data_reader.read_records(
+                    _Task(csv_file_name, 20, 22, elasticdl_pb2.TRAINING)
+                )
+            )
+            self.assertEqual(records, lines[20:22])
+
+
+class RecordsToBatchTest(unittest.TestCase):
+    def test_records_to_batch_keeps_trailing_null_characters(self):
+        records = [b"ab\x00", b"c\x00\x00", b"d"]
+        batch = records_to_batch(records)
+        self.assertEqual(list(batch), records)
+        dataset = tf.data.Dataset.from_generator(
+            lambda: iter([batch]), tf.string
+        ).unbatch()
+        self.assertEqual([record.numpy() for record in dataset], records)
+
+        batch = records_to_batch(
+            [{"id": 1, "name": "a\x00"}, {"id": 2, "name": "b"}]
+        )
+        self.assertEqual(batch["id"].tolist(), [1, 2])
+        self.assertEqual(batch["name"].tolist(), ["a\x00", "b"])
+
+        batch = records_to_batch([[1.5, "x\x00"], [2.5, "y"]])
+        self.assertEqual(batch.tolist(), [[1.5, "x\x00"], [2.5, "y"]])
+
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+class ParquetDataReaderTest(unittest.TestCase):
+    def test_parquet_data_reader(self):
+        with tempfile.TemporaryDirectory() as temp_dir_name:
+            table = pa.table(
+                {
+                    "x": np.arange(25, dtype=np.float32),
+                    "y": np.arange(25, dtype=np.int64) * 2,
+                    "name": ["n%d" % i for i in range(25)],
+                }
+            )
+            file_name = os.path.join(temp_dir_name, "data.parquet")
+            pq.write_table(table, file_name, row_group_size=10)
+
+            reader = create_data_reader(
+                data_origin=temp_dir_name,
+                reader_type=ReaderType.PARQUET_READER,
+                columns=["y", "x"],
+            )
+            # A shard for each row group.
+            self.assertEqual(
+                reader.create_shards(),
+                [(file_name, 0, 10), (file_name, 10, 10), (file_name, 20, 5)],
+            )
+            self.assertEqual(reader.metadata.column_names, ["y", "x"])
+            self.assertEqual(
+                reader.records_output_types, {"y": tf.int64, "x": tf.float32}
+            )
+
+            records = list(
+                reader.read_records(
+                    _Task(file_name, 3, 6, elasticdl_pb2.TRAINING)
+                )
+            )
+            self.assertEqual(
+                records, [{"y": 2 * i, "x": float(i)} for i in range(3, 6)]
+            )
+
+            dataset = tf.data.Dataset.from_generator(
+                lambda: reader.read_records(
+                    _Task(file_name, 20, 25, elasticdl_pb2.TRAINING)
+                ),
+                reader.records_output_types,
+            )
+            self.assertEqual(
+                [record["y"].numpy() for record in dataset],
+                list(range(40, 50, 2)),
+            )
+
+            # The batches are sliced from the rows decoded in batches.
+            task = _Task(file_name, 5, 25, elasticdl_pb2.TRAINING)
+            batches = list(reader.read_batches(task, 4))
+            self.assertEqual(
+                [len(batch["y"]) for batch in batches], [3, 4, 4, 4, 4, 1]
+            )
+            # Only the rows up to the end of the task are yielded.
+            batches_in_row_group = list(
+                reader.read_batches(
+                    _Task(file_name, 11, 14, elasticdl_pb2.TRAINING), 2
+                )
+            )
+            self.assertEqual(
+                [batch["y"].tolist() for batch in batches_in_row_group],
+                [[22], [24, 26]],
+            )
+            # The batches grouped from the records by default.
+            default_batches = list(
+                AbstractDataReader.read_batches(reader, task, 4)
+            )
+            self.assertEqual(
+                [len(batch["y"]) for batch in default_batches], [4] * 5
+            )
+            for name in ["x", "y"]:
+                np.testing.assert_array_equal(
+                    np.concatenate([batch[name] for batch in batches]),
+                    np.concatenate([batch[name] for batch in default_batches]),
+                )
+
+
+class ODPSDataReaderFakeTableTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            [6.4, 2.8, 5.6, 2.2, 2, "virginica"],
+            [5.0, 2.3, 3.3, 1.0, 1, "versicolor"],
+            [4.9, 2.5, 4.5, 1.7, 2, "virginica"],
+            [4.9, 3.1, 1.5, None, 0, None],
+            [5.7, 3.8, 1.7, 0.3, 0, "setosa"],
+            [4.4, 3.2, 1.3, 0.2, 0, "setosa"],
+            [5.4, 3.4, 1.5, 0.4, 0, "setosa"],
+            [6.9, 3.1, 5.1, 2.3, 2, "virginica"],
+            [6.7, 3.1, 4.4, 1.4, 1, "versicolor"],
+            [5.1, 3.7, 1.5, 0.4, 0, "setosa"],
+        ]
+        self.table = FakeODPSTable(
+            IRIS_TABLE_COLUMN_NAMES + ["name"],
+            ["double"] * 4 + ["bigint", "string"],
+            self.rows,
+        )
+        self.task = _Task("test_table", 1, 9, elasticdl_pb2.TRAINING)
+
+    def _create_reader(self, **kwargs):
+        # The fake table is only patched in this process, so the worker
+        # processes are forked.
+        return ODPSDataReader(
+            project="test_project",
+            access_id="test_id",
+            access_key="test_key",
+            table="test_table",
+            records_per_task=4,
+            start_method="fork",
+            **kwargs
+        )
+
+    def test_odps_data_reader_typed_columns(self):
+        column_names = IRIS_TABLE_COLUMN_NAMES + ["name"]
+        expected_columns = {
+            name: [
+                ("" if i == 5 else 0) if row[i] is None else row[i]
+                for row in self.rows[1:9]
+            ]
+            for i, name in enumerate(column_names)
+        }
+        for arrow in [False] if pa is None else [False, True]:
+            with fake_odps_table(self.table, arrow):
+                reader = self._create_reader(typed_columns=True)
+                self.assertEqual(
+                    reader.create_shards(),
+                    [
+                        ("test_table", 0, 4),
+                        ("test_table", 4, 4),
+                        ("test_table", 8, 2),
+                    ],
+                )
+                output_types = reader.records_output_types
+                records = list(reader.read_records(self.task))
+                batches = list(reader.read_batches(self.task, 3))
+            self.assertEqual(
+                output_types,
+                dict(
+                    {name: tf.float64 for name in column_names[:4]},
+                    **{"class": tf.int64, "name": tf.string}
+                ),
+            )
+            self.assertEqual(len(records), 8)
+            self.assertTrue(all(len(batch["class"]) <= 3 for batch in batches))
+            for name in column_names:
+                values = np.concatenate([batch[name] for batch in batches])
+                if output_types[name] != tf.string:
+                    self.assertEqual(
+                        values.dtype, output_types[name].as_numpy_dtype
+                    )
+                self.assertEqual(values.tolist(), expected_columns[name])
+                self.assertEqual(
+                    [record[name] for record in records],
+                    expected_columns[name],
+                )
+
+    def test_odps_data_reader_typed_columns_feed(self):
+        task = _Task("test_table", 0, 3, elasticdl_pb2.TRAINING)
+        outputs = []
+        for typed_columns in [False, True]:
+            with fake_odps_table(self.table):
+                reader = self._create_reader(
+                    columns=IRIS_TABLE_COLUMN_NAMES,
+                    label_col="class",
+                    typed_columns=typed_columns,
+                )
+                records = list(reader.read_records(task))
+            dataset = tf.data.Dataset.from_generator(
+                lambda: iter(records), reader.records_output_types
+            )
+            dataset = reader.default_feed()(
+                dataset, Mode.EVALUATION, reader.metadata
+            )
+            outputs.append(
+                [
+                    (features.numpy().tolist(), labels.numpy().tolist())
+                    for features, labels in dataset
+                ]
+            )
+        # The strings and the typed values are fed as the same tensors.
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[1][0][1], [2.0])
+
+    def test_odps_data_reader_typed_columns_feed_with_string_columns(self):
+        task = _Task("test_table", 0, 3, elasticdl_pb2.TRAINING)
+        string_table = FakeODPSTable(
+            IRIS_TABLE_COLUMN_NAMES,
+            ["string"] * 4 + ["bigint"],
+            [[str(v) for v in row[:4]] + row[4:5] for row in self.rows],
+        )
+        outputs = []
+        for table in [self.table, string_table]:
+            with fake_odps_table(table):
+                reader = self._create_reader(
+                    columns=IRIS_TABLE_COLUMN_NAMES,
+                    label_col="class",
+                    typed_columns=True,
+                )
+                records = list(reader.read_records(task))
+            dataset = tf.data.Dataset.from_generator(
+                lambda: iter(records), reader.records_output_types
+            )
+            dataset = reader.default_feed()(
+                dataset, Mode.EVALUATION, reader.metadata
+            )
+            outputs.append(
+                [
+                    (features.numpy().tolist(), labels.numpy().tolist())
+                    for features, labels in dataset
+                ]
+            )
+        # The numbers in the STRING columns are parsed.
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_odps_data_reader_parallel_read(self):
+        for typed_columns in [False, True]:
+            with fake_odps_table(self.table):
+                reader = self._create_reader(typed_columns=typed_columns)
+                expected_records = list(reader.read_records(self.task))
+                parallel_reader = self._create_reader(
+                    typed_columns=typed_columns,
+                    num_processes=3,
+                    records_per_sub_range=2,
+                )
+                # The results of a partially read task are dropped.
+                next(parallel_reader.read_records(self.task))
+                records = list(parallel_reader.read_records(self.task))
+                batches = list(parallel_reader.read_batches(self.task, 3))
+                shuffle_reader = self._create_reader(
+                    typed_columns=typed_columns,
+                    num_processes=3,
+                    records_per_sub_range=2,
+                    shuffle_sub_ranges=True,
+                )
+                shuffled_records = list(shuffle_reader.read_records(self.task))
+            # The ODPS reader with the worker processes is reused.
+            idle_readers = list(
+                parallel_reader._idle_parallel_readers.values()
+            ) + list(shuffle_reader._idle_parallel_readers.values())
+            self.assertEqual(
+                [len(readers) for readers in idle_readers], [1, 1]
+            )
+            parallel_reader.close()
+            shuffle_reader.close()
+            self.assertFalse(parallel_reader._idle_parallel_readers)
+            self.assertFalse(shuffle_reader._idle_parallel_readers)
+
+            self.assertEqual(records, expected_records)
+            self.assertEqual(
+                sorted(map(str, shuffled_records)),
+                sorted(map(str, expected_records)),
+            )
+            if typed_columns:
+                self.assertTrue(
+                    all(len(batch["class"]) <= 2 for batch in batches)
+                )
+                self.assertEqual(
+                    np.concatenate(
+                        [batch["class"] for batch in batches]
+                    ).tolist(),
+                    [record["class"] for record in expected_records],
+                )
+            else:
+                self.assertEqual(
+                    np.concatenate(batches).tolist(), expected_records
+                )
+
+    def test_odps_data_reader_idle_parallel_readers(self):
+        for num_read_ahead_tasks, num_idle_readers in [(0, 1), (2, 2)]:
+            with fake_odps_table(self.table), mock.patch.object(
+                ODPSReader, "stop", autospec=True, side_effect=ODPSReader.stop
+            ) as stop:
+                reader = self._create_reader(
+                    num_processes=2,
+                    records_per_sub_range=2,
+                    num_read_ahead_tasks=num_read_ahead_tasks,
+                )
+                # Read three tasks concurrently.
+                generators = [reader.read_records(self.task) for _ in range(3)]
+                for generator in generators:
+                    next(generator)
+                for generator in generators:
+                    list(generator)
+                # The readers more than the idle ones kept are stopped.
+                self.assertEqual(stop.call_count, 3 - num_idle_readers)
+                (idle_readers,) = reader._idle_parallel_readers.values()
+                self.assertEqual(len(idle_readers), num_idle_readers)
+                reader.close()
+                self.assertEqual(stop.call_count, 3)
+                self.assertFalse(reader._idle_parallel_readers)
+
 
 @unittest.skipIf(
     not is_odps_configured(), "ODPS environment is not configured",
@@ -49,3 +49,38 @@ class DataShardServiceTest(unittest.TestCase):
         reported = data_shard_service.report_batch_done()
         self.assertTrue(reported)
         self.assertEqual(len(data_shard_service._pending_tasks), 0)
+
+    def test_lease_tasks(self):
+        tasks = [
+            _Task("test_file", i, i + 1, elasticdl_pb2.TRAINING)
+            for i in range(3)
+        ]
+        for i, task in enumerate(tasks):
+            task.task_id = i
+        self._master_client.get_tasks = MagicMock(return_value=tasks)
+        self._master_client.report_task_results = MagicMock()
+        data_shard_service = DataShardService(1, self._master_client, 3)
+        task = data_shard_service.get_task()
+        self.assertEqual(task.task_id, 0)
+        self._master_client.get_tasks.assert_called_once_with(3)
+        self._master_client.get_task.assert_not_called()
+
+        # The completed task is reported when the next task starts
+        data_shard_service.report_batch_done()
+        task = data_shard_service.get_task()
+        self.assertEqual(task.task_id, 1)
+        self._master_client.report_task_results.assert_called_once_with(
+            [(0, "", None)], 1
+        )
+
+        task = data_shard_service.get_task()
+        self.assertEqual(task.task_id, 2)
+        self._master_client.report_task_results.assert_called_with([], 2)
+
+        data_shard_service.report_batch_done(2)
+        # The results are reported in a batch since no leased task is left
+        self._master_client.report_task_results.assert_called_with(
+            [(1, "", None), (2, "", None)], 0
+        )
+        self.assertEqual(self._master_client.report_task_results.call_count, 3)
+        self._master_client.report_task_result.assert_not_called()
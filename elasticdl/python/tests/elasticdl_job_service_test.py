@@ -12,11 +12,12 @@
 # limitations under the License.
 
 import os
+import shlex
 import tempfile
 import unittest
 
 from elasticdl.proto import elasticdl_pb2
-from elasticdl.python.common.args import parse_master_args
+from elasticdl.python.common.args import parse_master_args, parse_ps_args
 from elasticdl.python.master.elasticdl_job_service import ElasticdlJobService
 from elasticdl.python.tests.test_utils import (
     DatasetName,
@@ -87,6 +88,39 @@ class ElasticdlJobServiceTest(unittest.TestCase):
             master = ElasticdlJobService(args, TaskManager(args))
             self.assertIsNone(master.evaluation_service)
 
+    def test_get_ps_args(self):
+        self.arguments[
+            "distribution_strategy"
+        ] = DistributionStrategy.PARAMETER_SERVER
+        self.arguments["model_def"] = "mnist.mnist_functional_api.custom_model"
+        with tempfile.TemporaryDirectory() as temp_dir_name:
+            create_recordio_file(
+                self._num_records,
+                DatasetName.TEST_MODULE,
+                1,
+                temp_dir=temp_dir_name,
+            )
+            self.arguments["training_data"] = temp_dir_name
+            args = parse_master_args(self._get_args())
+            master = ElasticdlJobService(args, TaskManager(args))
+            # The Go PS is launched by default.
+            self.assertIn("elasticdl_ps", master.get_ps_args(args)[1])
+
+            self.arguments["use_async"] = "true"
+            self.arguments["ssp_staleness"] = "2"
+            args = parse_master_args(self._get_args())
+            ps_args = master.get_ps_args(args)
+            # The Python PS is launched for the features only it supports.
+            command = ps_args[1] + " --ps_id 1"
+            self.assertIn("python -m elasticdl.python.ps.main", command)
+            ps_args = parse_ps_args(
+                shlex.split(command.split("elasticdl.python.ps.main", 1)[1])
+            )
+            self.assertEqual(ps_args.ps_id, 1)
+            self.assertEqual(ps_args.port, 2222)
+            self.assertEqual(ps_args.ssp_staleness, 2)
+            self.assertEqual(ps_args.job_name, "test")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,95 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from elasticdl.python.ps.embedding_pull_coalescer import EmbeddingPullCoalescer
+
+
+class EmbeddingPullCoalescerTest(unittest.TestCase):
+    def setUp(self):
+        self._lookup_ids = []
+        self._lock = threading.Lock()
+
+    def _lookup(self, name, ids):
+        if name != "embedding":
+            raise ValueError("Unknown embedding table %s" % name)
+        with self._lock:
+            self._lookup_ids.append(list(ids))
+        return np.array([[i, i * 10] for i in ids], dtype=np.float32)
+
+    def _pull_concurrently(self, coalescer, ids_list):
+        results = [None] * len(ids_list)
+        barrier = threading.Barrier(len(ids_list))
+
+        def _pull(index):
+            barrier.wait()
+            results[index] = coalescer.pull("embedding", ids_list[index])
+
+        threads = [
+            threading.Thread(target=_pull, args=(i,))
+            for i in range(len(ids_list))
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_pull(self):
+        coalescer = EmbeddingPullCoalescer(self._lookup, window_secs=0.2)
+        ids_list = [[3, 1, 3], [1, 2], [5], [2, 3, 1, 6]]
+        results = self._pull_concurrently(coalescer, ids_list)
+
+        for ids, result in zip(ids_list, results):
+            expected = np.array([[i, i * 10] for i in ids], dtype=np.float32)
+            self.assertTrue(np.array_equal(result, expected))
+        # Every id is looked up only once
+        all_ids = sum(self._lookup_ids, [])
+        self.assertEqual(sorted(all_ids), [1, 2, 3, 5, 6])
+        self.assertLess(len(self._lookup_ids), len(ids_list))
+
+    def test_pull_with_max_batch_size(self):
+        coalescer = EmbeddingPullCoalescer(
+            self._lookup, window_secs=60, max_batch_size=3
+        )
+        # The batch is looked up once it has `max_batch_size` pulls
+        # instead of waiting for the window.
+        start = time.time()
+        ids_list = [[3, 1], [1, 2], [5]]
+        results = self._pull_concurrently(coalescer, ids_list)
+        for ids, result in zip(ids_list, results):
+            expected = np.array([[i, i * 10] for i in ids], dtype=np.float32)
+            self.assertTrue(np.array_equal(result, expected))
+        self.assertEqual(self._lookup_ids, [[1, 2, 3, 5]])
+
+        coalescer = EmbeddingPullCoalescer(
+            self._lookup, window_secs=60, max_batch_size=1
+        )
+        result = coalescer.pull("embedding", [2])
+        self.assertTrue(np.array_equal(result, [[2, 20]]))
+        self.assertLess(time.time() - start, 30)
+
+    def test_pull_error(self):
+        coalescer = EmbeddingPullCoalescer(self._lookup, window_secs=0.01)
+        self.assertRaises(ValueError, coalescer.pull, "unknown", [1, 2])
+        result = coalescer.pull("embedding", [2])
+        self.assertTrue(np.array_equal(result, [[2, 20]]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import sys
+import threading
 import unittest
 
 import numpy as np
@@ -52,6 +54,15 @@ class EmbeddingTableTest(unittest.TestCase):
         self.table.get([0, 3, 8])
         self.assertEqual(len(self.table.embedding_vectors), 4)
 
+    def test_embedding_table_get_with_fan_based_initializer(self):
+        # The limit of glorot uniform is computed from the shape `(dim,)`
+        # no matter how many ids are initialized together.
+        table = EmbeddingTable(self.name, self.dim, "glorot_uniform")
+        values = table.get(list(range(1000)))
+        limit = np.sqrt(6.0 / (self.dim + self.dim))
+        self.assertLessEqual(np.abs(values).max(), limit)
+        self.assertGreater(np.abs(values).max(), limit / 2)
+
     def test_embedding_table_set(self):
         self.table.clear()
         indices = [0, 1, 4]
@@ -67,6 +78,58 @@ class EmbeddingTableTest(unittest.TestCase):
         rows = np.concatenate(rows)
         np.testing.assert_array_equal(rows, values)
 
+    def test_pop_dirty_ids_with_concurrent_set(self):
+        self.table.clear()
+        self.table.track_dirty_ids()
+        popped_ids = set()
+        stop_event = threading.Event()
+
+        def _pop_dirty_ids():
+            while not stop_event.is_set():
+                popped_ids.update(self.table.pop_dirty_ids())
+
+        # Switch the threads frequently to interleave them.
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            thread = threading.Thread(target=_pop_dirty_ids)
+            thread.start()
+            values = np.zeros((10, self.dim), dtype=np.float32)
+            for start in range(0, 50000, 10):
+                self.table.set(range(start, start + 10), values)
+            stop_event.set()
+            thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        popped_ids.update(self.table.pop_dirty_ids())
+        # Every updated id is popped once the updates are done.
+        self.assertEqual(popped_ids, set(range(50000)))
+
+    def test_cow_snapshot(self):
+        self.table.clear()
+        old_values = self.table.get([0, 1])
+        snapshot = self.table.cow_snapshot()
+        new_values = np.ones((3, self.dim), dtype=np.float32)
+        self.table.set([1, 2, 1], new_values)
+        vectors = snapshot.get([0, 1, 2])
+        self.assertTrue(np.array_equal(vectors[0], old_values[0]))
+        self.assertTrue(np.array_equal(vectors[1], old_values[1]))
+        # The id is not in the table when the snapshot is taken
+        self.assertIsNone(vectors[2])
+        self.assertTrue(np.array_equal(self.table.get([1]), new_values[2:]))
+
+    def test_cow_snapshot_with_initialized_ids(self):
+        self.table.clear()
+        snapshot = self.table.cow_snapshot()
+        # The id is initialized by `get` after the snapshot is taken
+        self.table.get([3])
+        self.table.set([3], np.ones((1, self.dim), dtype=np.float32))
+        self.assertIsNone(snapshot.get([3])[0])
+
+        # The vectors are not saved once the snapshot is released
+        del snapshot
+        self.assertEqual(len(self.table._cow_snapshots), 0)
+
     def test_create_embedding_table(self):
         embedding_pb = EmbeddingTableInfo()
         embedding_pb.name = self.name
@@ -17,6 +17,7 @@ from unittest.mock import Mock
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras.metrics import Accuracy, MeanSquaredError
+from tensorflow.python.keras import metrics as metrics_module
 
 from elasticdl.proto import elasticdl_pb2
 from elasticdl.python.common.constants import MetricsDictKey
@@ -40,6 +41,25 @@ def _eval_metrics_fn():
     }
 
 
+class _MaxOutput(metrics_module.Metric):
+    """A metric whose state is not merged by summation"""
+
+    def __init__(self, name="max_output"):
+        super(_MaxOutput, self).__init__(name=name)
+        self.max = self.add_weight("max", initializer="zeros")
+
+    def update_state(self, labels, outputs, sample_weight=None):
+        outputs = tf.cast(outputs, self.max.dtype)
+        self.max.assign(tf.maximum(self.max, tf.reduce_max(outputs)))
+
+    def result(self):
+        return self.max
+
+
+def _first_job(evaluation_service):
+    return next(iter(evaluation_service._eval_jobs.values()), None)
+
+
 class EvaluationServiceTest(unittest.TestCase):
     @staticmethod
     def ok_to_new_job(job, latest_chkp_version):
@@ -117,12 +137,12 @@ class EvaluationServiceTest(unittest.TestCase):
         self.assertEqual(8, len(task_d._todo))
         evaluation_service.add_evaluation_task(False)
         self.assertEqual(8, len(task_d._eval_todo))
-        self.assertFalse(evaluation_service._eval_job.finished())
+        self.assertFalse(_first_job(evaluation_service).finished())
 
         for i in range(8):
-            self.assertFalse(evaluation_service._eval_job.finished())
+            self.assertFalse(_first_job(evaluation_service).finished())
             evaluation_service.complete_task()
-        self.assertTrue(evaluation_service._eval_job is None)
+        self.assertTrue(_first_job(evaluation_service) is None)
         self.assertFalse(evaluation_service.try_to_create_new_job())
 
     def testEvaluationOnly(self):
@@ -144,9 +164,9 @@ class EvaluationServiceTest(unittest.TestCase):
 
         self.assertEqual(8, len(task_d._eval_todo))
         for i in range(8):
-            self.assertFalse(evaluation_service._eval_job.finished())
+            self.assertFalse(_first_job(evaluation_service).finished())
             evaluation_service.complete_task()
-        self.assertTrue(evaluation_service._eval_job.finished())
+        self.assertTrue(_first_job(evaluation_service).finished())
 
     def testNeedEvaluation(self):
         task_d = create_task_manager(
@@ -159,7 +179,7 @@ class EvaluationServiceTest(unittest.TestCase):
 
         # Should add evaluation task and create eval job
         evaluation_service.add_evaluation_task_if_needed(model_version=10)
-        self.assertTrue(evaluation_service._eval_job is not None)
+        self.assertTrue(_first_job(evaluation_service) is not None)
         self.assertEqual(evaluation_service._eval_checkpoint_versions, [])
 
         # Should ignore because version 10 is in the eval list
@@ -179,6 +199,158 @@ class EvaluationServiceTest(unittest.TestCase):
         self.assertEqual(
             evaluation_service._eval_checkpoint_versions, [20, 30]
         )
+        self.assertEqual(
+            evaluation_service.get_evaluation_versions(), [20, 30, 10]
+        )
+
+    def test_concurrent_evaluation_jobs(self):
+        task_d = create_task_manager(
+            [("f1", 0, 10), ("f2", 0, 10)], [("f1", 0, 10), ("f2", 0, 10)]
+        )
+        evaluation_service = EvaluationService(
+            task_d.create_evaluation_tasks,
+            10,
+            False,
+            _eval_metrics_fn,
+            max_concurrent_jobs=2,
+        )
+        task_d.set_evaluation_service(evaluation_service)
+        for version in [10, 20, 30]:
+            evaluation_service.add_evaluation_task_if_needed(version)
+        self.assertEqual(list(evaluation_service._eval_jobs), [10, 20])
+        self.assertEqual(evaluation_service._eval_checkpoint_versions, [30])
+        self.assertEqual(len(task_d._eval_todo), 16)
+
+        # The tasks of version 10 are dispatched first
+        request = elasticdl_pb2.ReportTaskResultRequest()
+        for _ in range(8):
+            request.task_id, task = task_d.get_eval_task(0)
+            self.assertEqual(task.model_version, 10)
+            evaluation_service.report_evaluation_metrics(
+                {MetricsDictKey.MODEL_OUTPUT: ndarray_to_pb(np.ones(2))},
+                ndarray_to_pb(np.ones(2)),
+                task.model_version,
+            )
+            task_d.report(request, True)
+        self.assertEqual(list(evaluation_service._eval_jobs), [20, 30])
+        self.assertEqual(evaluation_service._eval_checkpoint_versions, [])
+        self.assertEqual(
+            evaluation_service._eval_jobs[20]
+            .evaluation_metrics.get_evaluation_summary()
+            .get("acc"),
+            0.0,
+        )
+
+    def test_collapse_pending_versions(self):
+        task_d = create_task_manager(
+            [("f1", 0, 10), ("f2", 0, 10)], [("f1", 0, 10), ("f2", 0, 10)]
+        )
+        evaluation_service = EvaluationService(
+            task_d.create_evaluation_tasks,
+            10,
+            False,
+            _eval_metrics_fn,
+            collapse_pending_versions=True,
+        )
+        for version in [10, 20, 30, 40]:
+            evaluation_service.add_evaluation_task_if_needed(version)
+        self.assertEqual(list(evaluation_service._eval_jobs), [10])
+        self.assertEqual(evaluation_service._eval_checkpoint_versions, [40])
+        self.assertEqual(
+            evaluation_service.get_evaluation_versions(), [40, 10]
+        )
+
+    def test_sampled_evaluation(self):
+        task_d = create_task_manager([("f1", 0, 10)], [("f1", 0, 120)])
+        evaluation_service = EvaluationService(
+            task_d.create_evaluation_tasks,
+            10,
+            False,
+            _eval_metrics_fn,
+            max_concurrent_jobs=2,
+            sample_fraction=0.25,
+            full_evaluation_steps=20,
+        )
+        task_d.set_evaluation_service(evaluation_service)
+        evaluation_service.add_evaluation_task_if_needed(10)
+        evaluation_service.add_evaluation_task_if_needed(20)
+        # 40 evaluation tasks are sampled to 10 for version 10, and
+        # version 20 is a full evaluation.
+        self.assertEqual(evaluation_service._eval_jobs[10]._total_tasks, 10)
+        self.assertEqual(evaluation_service._eval_jobs[20]._total_tasks, 40)
+        self.assertEqual(len(task_d._eval_todo), 50)
+
+    def test_full_evaluation_after_skipped_versions(self):
+        task_d = create_task_manager([("f1", 0, 10)], [("f1", 0, 120)])
+        evaluation_service = EvaluationService(
+            task_d.create_evaluation_tasks,
+            5,
+            False,
+            _eval_metrics_fn,
+            max_concurrent_jobs=4,
+            sample_fraction=0.25,
+            full_evaluation_steps=20,
+        )
+        task_d.set_evaluation_service(evaluation_service)
+        # None of the versions is a multiple of full_evaluation_steps
+        for version in [15, 25, 35, 55]:
+            evaluation_service.add_evaluation_task_if_needed(version)
+        total_tasks = {
+            version: job._total_tasks
+            for version, job in evaluation_service._eval_jobs.items()
+        }
+        self.assertEqual(total_tasks, {15: 10, 25: 40, 35: 10, 55: 40})
+
+    def test_early_stop_evaluation(self):
+        task_d = create_task_manager([("f1", 0, 10)], [("f1", 0, 120)])
+        evaluation_service = EvaluationService(
+            task_d.create_evaluation_tasks,
+            10,
+            False,
+            lambda: {
+                "acc": metrics_module.Accuracy(),
+                "mse": metrics_module.MeanSquaredError(),
+            },
+            early_stop_tolerance=0.01,
+        )
+        task_d.set_evaluation_service(evaluation_service)
+        evaluation_service.add_evaluation_task_if_needed(10)
+        self.assertEqual(len(task_d._eval_todo), 40)
+
+        request = elasticdl_pb2.ReportTaskResultRequest()
+        outputs = ndarray_to_pb(np.array([[1], [2], [3], [4]], np.float32))
+        labels = ndarray_to_pb(np.array([[1], [2], [0], [0]], np.float32))
+        for i in range(5):
+            request.task_id, task = task_d.get_eval_task(0)
+            evaluation_service.report_evaluation_metrics(
+                {MetricsDictKey.MODEL_OUTPUT: outputs}, labels, 10
+            )
+            task_d.report(request, True)
+        # The metrics of all tasks are the same, so the job stops after
+        # the minimum number of tasks and the rest tasks are removed.
+        self.assertEqual(evaluation_service._eval_jobs, {})
+        self.assertEqual(task_d._eval_todo, [])
+
+    def test_no_early_stop_without_scalar_metrics(self):
+        def _metrics_fn():
+            # The metric is a vector of the precisions of the thresholds
+            return {"precision": metrics_module.Precision([0.3, 0.7])}
+
+        job = EvaluationJob(
+            _metrics_fn(),
+            10,
+            total_tasks=20,
+            early_stop_tolerance=0.01,
+            task_metrics_dict=_metrics_fn(),
+        )
+        outputs = ndarray_to_pb(np.array([0.1, 0.5, 0.9], np.float32))
+        labels = ndarray_to_pb(np.array([0, 1, 1], np.float32))
+        for _ in range(10):
+            job.report_evaluation_metrics(
+                {MetricsDictKey.MODEL_OUTPUT: outputs}, labels
+            )
+            job.complete_task()
+        self.assertFalse(job.finished())
 
     def test_update_metric_by_small_chunks(self):
         labels = np.random.randint(0, 2, 1234)
@@ -192,6 +364,57 @@ class EvaluationServiceTest(unittest.TestCase):
         auc_value_1 = auc.result()
         self.assertEquals(auc_value_0, auc_value_1)
 
+    def test_merge_metric_states(self):
+        def _metrics_fn():
+            return {
+                "auc": metrics_module.AUC(),
+                "acc_fn": lambda labels, outputs: tf.equal(
+                    tf.cast(outputs > 0.5, tf.int32), tf.cast(labels, tf.int32)
+                ),
+                "max": _MaxOutput(),
+            }
+
+        labels = np.random.randint(0, 2, 100)
+        outputs = {MetricsDictKey.MODEL_OUTPUT: np.random.random(100)}
+        expected_metrics = EvaluationMetrics(_metrics_fn())
+        expected_metrics.update_evaluation_metrics(outputs, labels)
+
+        # Two workers compute the metric states of a half of the outputs
+        job = EvaluationJob(_metrics_fn(), 1, 2)
+        for begin, end in [(0, 40), (40, 100)]:
+            worker_metrics = EvaluationMetrics(_metrics_fn())
+            worker_outputs = {k: v[begin:end] for k, v in outputs.items()}
+            worker_metrics.update_evaluation_metrics(
+                worker_outputs, labels[begin:end], additive=True
+            )
+            # The non-additive metric is computed with the model outputs
+            self.assertTrue(worker_metrics.has_non_additive_metrics())
+            req = elasticdl_pb2.ReportEvaluationMetricsRequest()
+            for name, output in worker_outputs.items():
+                req.model_outputs[name].CopyFrom(ndarray_to_pb(output))
+            req.labels.CopyFrom(ndarray_to_pb(labels[begin:end]))
+            metric_states = worker_metrics.get_metric_states()
+            self.assertEqual(
+                sorted(metric_states[MetricsDictKey.MODEL_OUTPUT]),
+                ["acc_fn", "auc"],
+            )
+            for output_name, states in metric_states.items():
+                for metric_name, values in states.items():
+                    state_pb = req.metric_states.add()
+                    state_pb.output_name = output_name
+                    state_pb.metric_name = metric_name
+                    for value in values:
+                        state_pb.variables.append(ndarray_to_pb(value))
+            job.report_metric_states(
+                req.metric_states, req.model_outputs, req.labels
+            )
+
+        expected_summary = expected_metrics.get_evaluation_summary()
+        summary = job.evaluation_metrics.get_evaluation_summary()
+        self.assertEqual(sorted(summary.keys()), sorted(expected_summary))
+        for name, value in summary.items():
+            self.assertAlmostEqual(value, expected_summary[name], places=5)
+
 
 if __name__ == "__main__":
     unittest.main()
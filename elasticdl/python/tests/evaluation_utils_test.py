@@ -0,0 +1,183 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy as np
+
+from elasticdl.python.common.evaluation_utils import (
+    EvaluationMetrics,
+    StreamingAUC,
+    StreamingCalibration,
+    StreamingGroupAUC,
+    StreamingLogLoss,
+)
+
+
+def _exact_auc(labels, predictions):
+    positives = predictions[labels == 1]
+    negatives = predictions[labels == 0]
+    greater = np.sum(positives[:, None] > negatives[None, :])
+    equal = np.sum(positives[:, None] == negatives[None, :])
+    return (greater + equal / 2.0) / (len(positives) * len(negatives))
+
+
+class StreamingMetricsTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        size = 1000
+        # Predictions at the bucket centers, so bucketing is exact.
+        self.predictions = (np.random.randint(0, 100, size) + 0.5) / 100
+        self.labels = (np.random.rand(size) < self.predictions * 0.8).astype(
+            np.int64
+        )
+        self.groups = np.random.randint(0, 10, size)
+
+    def _update_in_two_parts(self, metric_fn, **kwargs):
+        """Updates two metrics with the two halves of the data and merges
+        the states of the second one into the first one."""
+        metrics = [metric_fn(), metric_fn()]
+        half = len(self.labels) // 2
+        for metric, part in zip(metrics, [slice(0, half), slice(half, None)]):
+            part_kwargs = {k: v[part] for k, v in kwargs.items()}
+            metric.update_state(
+                self.labels[part], self.predictions[part], **part_kwargs
+            )
+        metrics[0].merge_state_values(metrics[1].get_state_values())
+        return metrics[0].result().numpy()
+
+    def test_auc(self):
+        auc = self._update_in_two_parts(lambda: StreamingAUC(num_buckets=100))
+        self.assertAlmostEqual(
+            auc, _exact_auc(self.labels, self.predictions), places=6
+        )
+
+    def test_pr_auc(self):
+        pr_auc = self._update_in_two_parts(
+            lambda: StreamingAUC(num_buckets=100, curve="PR")
+        )
+        expected = 0.0
+        for threshold in np.unique(self.predictions):
+            selected = self.predictions >= threshold
+            precision = np.sum(self.labels[selected]) / np.sum(selected)
+            recall_gain = np.sum(
+                self.labels[self.predictions == threshold]
+            ) / np.sum(self.labels)
+            expected += precision * recall_gain
+        self.assertAlmostEqual(pr_auc, expected, places=6)
+
+    def test_log_loss_and_calibration(self):
+        log_loss = self._update_in_two_parts(StreamingLogLoss)
+        expected = -np.mean(
+            self.labels * np.log(self.predictions)
+            + (1 - self.labels) * np.log(1 - self.predictions)
+        )
+        self.assertAlmostEqual(log_loss, expected, places=6)
+
+        calibration = self._update_in_two_parts(StreamingCalibration)
+        self.assertAlmostEqual(
+            calibration,
+            np.sum(self.predictions) / np.sum(self.labels),
+            places=6,
+        )
+
+    def test_group_auc(self):
+        group_auc = self._update_in_two_parts(
+            lambda: StreamingGroupAUC("user_id", num_buckets=100),
+            groups=self.groups,
+        )
+        total_auc = 0.0
+        total_weight = 0
+        for group in np.unique(self.groups):
+            mask = self.groups == group
+            total_auc += (
+                _exact_auc(self.labels[mask], self.predictions[mask])
+                * mask.sum()
+            )
+            total_weight += mask.sum()
+        self.assertAlmostEqual(group_auc, total_auc / total_weight, places=6)
+
+    def test_group_auc_with_large_group_ids(self):
+        # The groups are not merged even if the ids are equal modulo a
+        # power of 2.
+        groups = np.where(self.groups % 2 == 0, 7, (1 << 40) + 7)
+        group_auc = self._update_in_two_parts(
+            lambda: StreamingGroupAUC("user_id", num_buckets=100),
+            groups=groups,
+        )
+        total_auc = 0.0
+        for group in [7, (1 << 40) + 7]:
+            mask = groups == group
+            total_auc += (
+                _exact_auc(self.labels[mask], self.predictions[mask])
+                * mask.sum()
+            )
+        self.assertAlmostEqual(group_auc, total_auc / len(groups), places=6)
+
+    def test_group_auc_with_many_updates(self):
+        # The histograms grow as new groups come in small batches
+        groups = np.arange(len(self.labels)) % 37
+        metric = StreamingGroupAUC("user_id", num_buckets=100)
+        for start in range(0, len(self.labels), 10):
+            part = slice(start, start + 10)
+            metric.update_state(
+                self.labels[part], self.predictions[part], groups[part]
+            )
+        total_auc = 0.0
+        total_weight = 0
+        for group in range(37):
+            mask = groups == group
+            labels = self.labels[mask]
+            if labels.min() == labels.max():
+                continue
+            total_auc += (
+                _exact_auc(labels, self.predictions[mask]) * mask.sum()
+            )
+            total_weight += mask.sum()
+        self.assertAlmostEqual(
+            metric.result().numpy(), total_auc / total_weight, places=6
+        )
+
+        metric.reset_states()
+        self.assertEqual(metric.result().numpy(), 0.0)
+
+    def test_evaluation_metrics(self):
+        evaluation_metrics = EvaluationMetrics(
+            {
+                "probs": {
+                    "auc": StreamingAUC(num_buckets=100),
+                    "gauc": StreamingGroupAUC("user_id", num_buckets=100),
+                }
+            }
+        )
+        evaluation_metrics.update_evaluation_metrics(
+            {"probs": self.predictions, "user_id": self.groups}, self.labels
+        )
+        summary = evaluation_metrics.get_evaluation_summary()
+        self.assertAlmostEqual(
+            summary["probs"]["auc"],
+            _exact_auc(self.labels, self.predictions),
+            places=6,
+        )
+        self.assertTrue(0 < summary["probs"]["gauc"] < 1)
+
+        states = evaluation_metrics.get_metric_states()
+        self.assertEqual(states["probs"]["auc"][0].shape, (100,))
+        self.assertEqual(states["probs"]["gauc"][0].shape[1], 2)
+        evaluation_metrics.reset_metric_states()
+        evaluation_metrics.merge_metric_states(states)
+        self.assertEqual(evaluation_metrics.get_evaluation_summary(), summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
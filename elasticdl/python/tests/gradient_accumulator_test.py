@@ -0,0 +1,122 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy as np
+
+from elasticdl.python.common.tensor_utils import Tensor, merge_indexed_slices
+from elasticdl.python.ps.gradient_accumulator import (
+    GradientAccumulator,
+    SparseGradientBuffer,
+)
+
+
+def _to_dict(tensor):
+    return {
+        i: tensor.values[row] for row, i in enumerate(tensor.indices.tolist())
+    }
+
+
+class SparseGradientBufferTest(unittest.TestCase):
+    def test_add(self):
+        dim = 4
+        buffer = SparseGradientBuffer(dim, np.float32, capacity=2)
+        indices_list = [np.array([3, 1, 3]), np.array([2, 2, 5, 1])]
+        values_list = [
+            np.random.rand(len(indices), dim).astype(np.float32)
+            for indices in indices_list
+        ]
+        expected = {}
+        for values, indices in zip(values_list, indices_list):
+            buffer.add(values, indices)
+            for value, i in zip(values, indices.tolist()):
+                expected[i] = expected.get(i, 0) + value
+
+        self.assertEqual(len(buffer), 4)
+        result = _to_dict(buffer.to_tensor())
+        self.assertEqual(sorted(result.keys()), [1, 2, 3, 5])
+        for i, value in expected.items():
+            self.assertTrue(np.allclose(result[i], value))
+
+    def test_add_matches_concatenated_gradients(self):
+        dim = 3
+        buffer = SparseGradientBuffer(dim, np.float64, capacity=4)
+        rng = np.random.RandomState(0)
+        grads = []
+        for _ in range(20):
+            indices = rng.randint(-50, 200, size=rng.randint(1, 40))
+            values = rng.rand(len(indices), dim)
+            buffer.add(values, indices)
+            grads.append(Tensor(None, values, indices))
+
+        # Sum the concatenated gradients by id, as the gradients were
+        # accumulated before.
+        merged = merge_indexed_slices(*grads)
+        unique_ids, inverse = np.unique(merged.indices, return_inverse=True)
+        expected = np.zeros((len(unique_ids), dim))
+        np.add.at(expected, inverse, merged.values)
+
+        result = buffer.to_tensor()
+        self.assertEqual(len(buffer), len(unique_ids))
+        order = np.argsort(result.indices)
+        np.testing.assert_array_equal(result.indices[order], unique_ids)
+        np.testing.assert_allclose(result.values[order], expected)
+
+    def test_reset(self):
+        buffer = SparseGradientBuffer(2, np.float32)
+        buffer.add(np.ones((2, 2), dtype=np.float32), np.array([0, 1]))
+        buffer.reset()
+        self.assertEqual(len(buffer), 0)
+
+        buffer.add(np.ones((1, 2), dtype=np.float32), np.array([1]))
+        result = buffer.to_tensor()
+        self.assertEqual(result.indices.tolist(), [1])
+        self.assertTrue(np.array_equal(result.values, [[1.0, 1.0]]))
+
+
+class GradientAccumulatorTest(unittest.TestCase):
+    def test_accumulate(self):
+        accumulator = GradientAccumulator()
+        dense_grads = [
+            np.array([1.0, 2.0, 3.0], np.float32),
+            np.array([0.0, 0.0, 7.0], np.float32),
+        ]
+        for grad in dense_grads:
+            # Gradients parsed from protobuf are read-only
+            grad.setflags(write=False)
+            accumulator.add_dense("dense", grad)
+        accumulator.add_sparse(
+            "embedding",
+            Tensor(None, np.ones((3, 2), np.float32), np.array([3, 1, 3])),
+        )
+
+        grads = dict(accumulator.items())
+        self.assertEqual(list(grads.keys()), ["dense", "embedding"])
+        self.assertTrue(np.array_equal(grads["dense"], [1.0, 2.0, 10.0]))
+        embedding_grads = _to_dict(grads["embedding"])
+        self.assertEqual(sorted(embedding_grads.keys()), [1, 3])
+        self.assertTrue(np.array_equal(embedding_grads[3], [2.0, 2.0]))
+
+        # The dense buffer is reused after reset
+        dense_buffer = grads["dense"]
+        accumulator.reset()
+        self.assertEqual(list(accumulator.items()), [])
+        accumulator.add_dense("dense", dense_grads[1])
+        grads = dict(accumulator.items())
+        self.assertIs(grads["dense"], dense_buffer)
+        self.assertTrue(np.array_equal(grads["dense"], dense_grads[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
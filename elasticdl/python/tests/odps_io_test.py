@@ -12,6 +12,7 @@
 # limitations under the License.
 
 import os
+import pickle
 import random
 import time
 import unittest
@@ -24,7 +25,63 @@ from elasticdl.python.data.odps_io import (
     ODPSWriter,
     is_odps_configured,
 )
-from elasticdl.python.tests.test_utils import create_iris_odps_table
+from elasticdl.python.tests.test_utils import (
+    FakeODPSTable,
+    create_iris_odps_table,
+    fake_odps_table,
+)
+
+
+class ODPSReaderFakeTableTest(unittest.TestCase):
+    def test_parallel_read_in_order(self):
+        table = FakeODPSTable(["num"], ["bigint"], [[i] for i in range(20)])
+        with fake_odps_table(table):
+            reader = ODPSReader(
+                project="test_project",
+                access_id="test_id",
+                access_key="test_key",
+                endpoint=None,
+                table="test_table",
+                num_processes=3,
+                start_method="fork",
+            )
+            # The worker processes are reused by the second reset.
+            for start in [0, 5]:
+                reader.reset((start, 15), 2)
+                records = []
+                for _ in range(reader.get_shards_count()):
+                    records.extend(reader.get_records())
+                self.assertEqual(
+                    records, [[str(i)] for i in range(start, start + 15)]
+                )
+            workers = reader._workers
+            self.assertEqual(len(workers), 3)
+            reader.stop()
+            self.assertFalse(any(p.is_alive() for p in workers))
+            self.assertTrue(all(p.exitcode == 0 for p in workers))
+
+    def test_pickle_reader(self):
+        table = FakeODPSTable(["num"], ["bigint"], [[i] for i in range(4)])
+        with fake_odps_table(table):
+            reader = ODPSReader(
+                project="test_project",
+                access_id="test_id",
+                access_key="test_key",
+                endpoint=None,
+                table="test_table",
+                num_processes=2,
+                start_method="fork",
+            )
+            reader.reset((0, 4), 2)
+            # The reader is pickled to the spawned worker processes
+            # without the processes and the queues, and opens the table
+            # again.
+            pickled_reader = pickle.loads(pickle.dumps(reader))
+            self.assertEqual(
+                list(pickled_reader.record_generator(0, 4)),
+                [[str(i)] for i in range(4)],
+            )
+            reader.stop()
 
 
 @unittest.skipIf(
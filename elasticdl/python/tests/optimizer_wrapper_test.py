@@ -457,6 +457,7 @@ class OptimizerWrapperTest(unittest.TestCase):
         embed_values,
         expected_non_embed_values,
         expected_embed_values=None,
+        use_hogwild=False,
     ):
         """Checks the correctness of async OptimizerWrapper. This function
         creates many threads and these threads call
@@ -472,6 +473,8 @@ class OptimizerWrapperTest(unittest.TestCase):
             expected_embed_values: A python dictionary of expected embedding
                 values after applying gradients. None means no need to check
                 embedding values.
+            use_hogwild: A python bool. True if updating embedding tables
+                with striped row locks instead of the global lock.
         """
         thread_num = len(grads_and_vars_batches)
         input_dims = {}
@@ -490,6 +493,7 @@ class OptimizerWrapperTest(unittest.TestCase):
             True,
             lookup_embedding_func=params.get_embedding_param,
             update_embedding_func=params.set_embedding_param,
+            use_hogwild=use_hogwild,
         )
 
         # call optimizer_wrapper.apply_gradients asynchronously
@@ -627,6 +631,56 @@ class OptimizerWrapperTest(unittest.TestCase):
             grads_and_vars_batches, embed_values, expected_non_embed_values
         )
 
+    def test_hogwild_async_correctness(self):
+        """Tests async updates in `OptimizerWrapper` without the global lock.
+
+        In Hogwild mode, the concurrent updates of the same embedding rows
+        are serialized by the striped row locks, so no update is lost.
+        Non-embedding variables are still updated by all threads.
+        """
+        thread_num = 2
+        input_dim = 4
+        output_dim = 3
+        non_embed_vars = [tf.Variable([0.0] * output_dim)]
+        embed_shape = (input_dim, output_dim)
+        embed_value_count = output_dim * input_dim
+        embed_layer = "embed_1"
+        embed_values = {
+            embed_layer: np.arange(
+                embed_value_count, dtype=np.float32
+            ).reshape(embed_shape)
+        }
+        grads_and_vars_batches = [
+            [
+                (
+                    tf.constant([i + 1] * output_dim, dtype=tf.float32),
+                    non_embed_vars[0],
+                ),
+                (
+                    tf.IndexedSlices(
+                        tf.reshape(
+                            tf.constant([i + 1.0] * embed_value_count),
+                            embed_shape,
+                        ),
+                        tf.constant(list(range(input_dim))),
+                    ),
+                    embed_layer,
+                ),
+            ]
+            for i in range(thread_num)
+        ]
+        expected_non_embed_values = [[-0.3, -0.3, -0.3]]
+        expected_embed_values = {
+            embed_layer: [(np.arange(12) - 0.3).reshape(embed_shape)]
+        }
+        self._test_async_correctness(
+            grads_and_vars_batches,
+            embed_values,
+            expected_non_embed_values,
+            expected_embed_values,
+            use_hogwild=True,
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -13,7 +13,9 @@
 
 import os
 import tempfile
+import time
 import unittest
+from unittest.mock import Mock
 
 import grpc
 import numpy as np
@@ -48,6 +50,22 @@ _module_file = get_module_file_path(
 )
 
 
+class _VersionUpdatingLock(object):
+    """A lock which updates the model version before it is acquired, as if
+    another gradient updated the model just before."""
+
+    def __init__(self, lock, parameters):
+        self._lock = lock
+        self._parameters = parameters
+
+    def __enter__(self):
+        self._parameters.version += 1
+        return self._lock.__enter__()
+
+    def __exit__(self, *args):
+        return self._lock.__exit__(*args)
+
+
 class PserverServicerTest(unittest.TestCase):
     def setUp(self):
         self._port = 9999
@@ -80,6 +98,7 @@ class PserverServicerTest(unittest.TestCase):
         pserver.prepare()
         self._parameters = pserver.parameters
         self._server = pserver.server
+        self._servicer = pserver.servicer
         self._stub = elasticdl_pb2_grpc.PserverStub(self._channel)
         grpc.channel_ready_future(self._channel).result()
 
@@ -363,6 +382,26 @@ class PserverServicerTest(unittest.TestCase):
                 )
             )
 
+    def test_push_gradient_async_update_with_ssp(self):
+        self.create_default_server_and_stub(ssp_staleness=1)
+        self.push_gradient_test_setup()
+
+        responses = []
+        for worker_id in [0, 1, 0, 0, 0, 0, 1, 0]:
+            req = elasticdl_pb2.PushGradientsRequest(worker_id=worker_id)
+            for g, name in zip(self.grad_values0, self.var_names):
+                serialize_ndarray(g, req.gradients.dense_parameters[name])
+            res = self._stub.push_gradients(req)
+            responses.append((res.accepted, res.retry_after_secs > 0))
+
+        # The sixth gradient is not applied since worker 0 is too far ahead
+        # of worker 1, until worker 1 pushes another gradient.
+        self.assertEqual(
+            responses,
+            [(True, False)] * 5 + [(False, True)] + [(True, False)] * 2,
+        )
+        self.assertEqual(self._parameters.version, 7)
+
     def test_push_gradient_sync_update(self):
         self.create_server_and_stub(
             grads_to_wait=2, lr_staleness_modulation=False, use_async=False
@@ -431,6 +470,185 @@ class PserverServicerTest(unittest.TestCase):
         )
         self.assertTrue(np.allclose(expected_embed_table, actual_embed_table))
 
+    def test_push_gradient_sync_update_with_backup_workers(self):
+        self.create_server_and_stub(
+            grads_to_wait=1,
+            lr_staleness_modulation=False,
+            use_async=False,
+            sync_version_tolerance=1,
+            num_backup_workers=1,
+        )
+        self.push_gradient_test_setup()
+
+        accepted = []
+        for grad_values, version in [
+            (self.grad_values0, 0),
+            (self.grad_values1, 0),
+            (self.grad_values1, 1),
+        ]:
+            req = elasticdl_pb2.PushGradientsRequest()
+            req.gradients.version = version
+            for g, name in zip(grad_values, self.var_names):
+                serialize_ndarray(g, req.gradients.dense_parameters[name])
+            res = self._stub.push_gradients(req)
+            accepted.append(res.accepted)
+
+        # The second gradient of version 0 is stale although it is within
+        # `sync_version_tolerance`
+        self.assertEqual(accepted, [True, False, True])
+        self.assertEqual(self._parameters.version, 2)
+        stats = self._servicer.get_sync_stats()
+        self.assertEqual([s.version for s in stats], [1, 2])
+        self.assertEqual([s.grads_num for s in stats], [1, 1])
+        self.assertEqual([s.dropped_grads_num for s in stats], [0, 1])
+
+        expected_values = [
+            v - self._lr * (g0 + g1)
+            for v, g0, g1 in zip(
+                self.var_values, self.grad_values0, self.grad_values1
+            )
+        ]
+        for expected_value, name in zip(expected_values, self.var_names):
+            self.assertTrue(
+                np.allclose(
+                    expected_value,
+                    self._parameters.non_embedding_params[name].numpy(),
+                )
+            )
+
+    def test_push_gradient_sync_update_stale_in_lock(self):
+        self.create_server_and_stub(
+            grads_to_wait=2,
+            lr_staleness_modulation=False,
+            use_async=False,
+            num_backup_workers=1,
+        )
+        self.push_gradient_test_setup()
+        self._servicer._lock = _VersionUpdatingLock(
+            self._servicer._lock, self._parameters
+        )
+
+        req = elasticdl_pb2.PushGradientsRequest()
+        req.gradients.version = 0
+        for g, name in zip(self.grad_values0, self.var_names):
+            serialize_ndarray(g, req.gradients.dense_parameters[name])
+        res = self._stub.push_gradients(req)
+        # The gradient is stale once the version is updated.
+        self.assertEqual(res.accepted, False)
+        self.assertEqual(res.version, 1)
+        self.assertEqual(self._servicer._grads_n, 0)
+
+    def test_push_gradient_sync_update_with_deadline(self):
+        self.create_server_and_stub(
+            grads_to_wait=2,
+            lr_staleness_modulation=False,
+            use_async=False,
+            sync_deadline_secs=0.5,
+        )
+        self.push_gradient_test_setup()
+
+        req = elasticdl_pb2.PushGradientsRequest()
+        req.gradients.version = 0
+        for g, name in zip(self.grad_values0, self.var_names):
+            serialize_ndarray(g, req.gradients.dense_parameters[name])
+        res = self._stub.push_gradients(req)
+        self.assertEqual(res.accepted, True)
+        self.assertEqual(res.version, 0)
+
+        # The model is updated with the only gradient after the deadline
+        time.sleep(2)
+        self.assertEqual(self._parameters.version, 1)
+        stats = self._servicer.get_sync_stats()
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0].grads_num, 1)
+        self.assertGreaterEqual(stats[0].wait_secs, 0.5)
+        for v, g, name in zip(
+            self.var_values, self.grad_values0, self.var_names
+        ):
+            self.assertTrue(
+                np.allclose(
+                    v - self._lr * g,
+                    self._parameters.non_embedding_params[name].numpy(),
+                )
+            )
+
+    def test_pull_from_evaluation_snapshots(self):
+        self.create_default_server_and_stub(
+            evaluation_steps=2, max_evaluation_snapshots=2
+        )
+        evaluation_versions = []
+        self._servicer._master_stub = Mock()
+        self._servicer._master_stub.report_version = Mock(
+            side_effect=lambda req: elasticdl_pb2.ReportVersionResponse(
+                evaluation_versions=evaluation_versions
+            )
+        )
+        self.push_gradient_test_setup()
+        name = self._embedding_info.name
+        dense_values = {}
+        embedding_values = {}
+
+        def _push_gradients():
+            req = elasticdl_pb2.PushGradientsRequest()
+            for g, var_name in zip(self.grad_values0, self.var_names):
+                serialize_ndarray(g, req.gradients.dense_parameters[var_name])
+            serialize_indexed_slices(
+                self.embedding_grads0, req.gradients.embedding_tables[name]
+            )
+            version = self._stub.push_gradients(req).version
+            dense_values[version] = {
+                var_name: var.numpy()
+                for var_name, var in (
+                    self._parameters.non_embedding_params.items()
+                )
+            }
+            embedding_values[version] = self._parameters.get_embedding_param(
+                name, [0, 1, 3]
+            )
+
+        # The master evaluates version 2 and 4, and then only version 4
+        evaluation_versions.append(2)
+        for _ in range(3):
+            _push_gradients()
+        evaluation_versions.append(4)
+        _push_gradients()
+        evaluation_versions.remove(2)
+        for _ in range(2):
+            _push_gradients()
+        self.assertEqual(self._parameters.version, 6)
+        self.assertEqual(self._servicer.get_eval_snapshot_versions(), [4])
+
+        pull_req = elasticdl_pb2.PullDenseParametersRequest()
+        pull_req.version = -1
+        pull_req.snapshot_version = 4
+        res = self._stub.pull_dense_parameters(pull_req)
+        self.assertEqual(res.version, 4)
+        for var_name, pb in res.dense_parameters.items():
+            self.assertTrue(
+                np.allclose(pb_to_ndarray(pb), dense_values[4][var_name])
+            )
+        pull_req = elasticdl_pb2.PullEmbeddingVectorRequest()
+        pull_req.name = name
+        pull_req.ids.extend([0, 1, 3, 10])
+        pull_req.snapshot_version = 4
+        vectors = pb_to_ndarray(self._stub.pull_embedding_vectors(pull_req))
+        self.assertEqual(vectors.shape, (4, self._embedding_info.dim))
+        self.assertTrue(np.allclose(vectors[:3], embedding_values[4]))
+        self.assertFalse(np.allclose(vectors[:3], embedding_values[6]))
+
+        # The released snapshot falls back to the latest parameters
+        pull_req = elasticdl_pb2.PullDenseParametersRequest()
+        pull_req.version = -1
+        pull_req.snapshot_version = 2
+        res = self._stub.pull_dense_parameters(pull_req)
+        self.assertEqual(res.version, 6)
+
+        # The oldest snapshots are dropped beyond the limit
+        evaluation_versions.extend([8, 10])
+        for _ in range(4):
+            _push_gradients()
+        self.assertEqual(self._servicer.get_eval_snapshot_versions(), [8, 10])
+
     def test_save_parameters_to_checkpoint_file(self):
         with tempfile.TemporaryDirectory() as tempdir:
             checkpoint_saver = CheckpointSaver(
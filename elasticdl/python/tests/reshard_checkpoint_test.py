@@ -0,0 +1,159 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import tensorflow as tf
+
+from elasticdl.python.common import save_utils
+from elasticdl.python.common.hash_utils import string_to_id
+from elasticdl.python.common.reshard_checkpoint import main
+from elasticdl.python.common.save_utils import CheckpointSaver
+from elasticdl.python.ps.embedding_table import EmbeddingTable
+from elasticdl.python.ps.parameters import Parameters
+from elasticdl_client.common.constants import CheckpointFormat
+
+
+class ReshardCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.dense_values = {
+            "dense_%d" % i: np.full((2, 2), i, dtype=np.float32)
+            for i in range(6)
+        }
+        self.embedding_values = np.random.rand(30, 3).astype(np.float32)
+
+    def _save_checkpoint(self, checkpoint_dir, shard_num):
+        saver = CheckpointSaver(checkpoint_dir, 1, 0, False)
+        for shard_index in range(shard_num):
+            params = Parameters()
+            params.version = 20
+            for name, value in self.dense_values.items():
+                if string_to_id(name, shard_num) == shard_index:
+                    params.non_embedding_params[name] = tf.Variable(value)
+            table = EmbeddingTable("embedding", 3, "zeros")
+            ids = list(range(shard_index, 30, shard_num))
+            table.set(ids, self.embedding_values[ids])
+            params.embedding_params["embedding"] = table
+            saver.save_snapshot(params.snapshot(), shard_index, shard_num)
+        return os.path.join(checkpoint_dir, "version-20")
+
+    def test_reshard_checkpoint(self):
+        for checkpoint_format in [
+            CheckpointFormat.PROTOBUF,
+            CheckpointFormat.CHUNKED,
+        ]:
+            with tempfile.TemporaryDirectory() as tempdir:
+                input_dir = self._save_checkpoint(
+                    os.path.join(tempdir, "input"), 2
+                )
+                output_dir = os.path.join(tempdir, "output")
+                main(
+                    [
+                        input_dir,
+                        output_dir,
+                        "--num_shards=3",
+                        "--checkpoint_format=%s" % checkpoint_format,
+                    ]
+                )
+                version_dir = os.path.join(output_dir, "version-20")
+                self.assertTrue(
+                    CheckpointSaver.check_checkpoint_valid(version_dir)
+                )
+                self.assertEqual(len(os.listdir(version_dir)), 3)
+
+                restored_ids = []
+                restored_names = []
+                for shard_index in range(3):
+                    # Each PS instance only reads its own shard file
+                    self.assertEqual(
+                        len(
+                            CheckpointSaver._get_shard_files_to_restore(
+                                version_dir, shard_index, 3
+                            )
+                        ),
+                        1,
+                    )
+                    params = CheckpointSaver.restore_params_from_checkpoint(
+                        version_dir, shard_index, 3
+                    )
+                    self.assertEqual(params.version, 20)
+                    table = params.embedding_params["embedding"]
+                    ids = list(table.embedding_vectors.keys())
+                    self.assertTrue(all(i % 3 == shard_index for i in ids))
+                    self.assertTrue(
+                        np.array_equal(
+                            table.get(ids), self.embedding_values[ids]
+                        )
+                    )
+                    restored_ids.extend(ids)
+                    for name, var in params.non_embedding_params.items():
+                        self.assertTrue(
+                            np.array_equal(
+                                var.numpy(), self.dense_values[name]
+                            )
+                        )
+                        restored_names.append(name)
+                self.assertEqual(sorted(restored_ids), list(range(30)))
+                self.assertEqual(
+                    sorted(restored_names), sorted(self.dense_values.keys())
+                )
+
+                # The output directory must not be overwritten
+                self.assertRaises(
+                    ValueError,
+                    main,
+                    [input_dir, output_dir, "--num_shards=3"],
+                )
+
+    def test_reshard_checkpoint_reads_input_once(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            input_dir = self._save_checkpoint(
+                os.path.join(tempdir, "input"), 4
+            )
+            self.assertEqual(
+                CheckpointSaver.get_independent_shard_groups(input_dir, 6),
+                [[0, 2, 4], [1, 3, 5]],
+            )
+            output_dir = os.path.join(tempdir, "output")
+            with mock.patch.object(
+                save_utils,
+                "load_pb_from_file",
+                wraps=save_utils.load_pb_from_file,
+            ) as load_pb:
+                main([input_dir, output_dir, "--num_shards=6"])
+            # Each input shard file is read once, and one more time to get
+            # the version of the checkpoint
+            self.assertEqual(load_pb.call_count, 5)
+
+            version_dir = os.path.join(output_dir, "version-20")
+            restored_ids = []
+            for shard_index in range(6):
+                params = CheckpointSaver.restore_params_from_checkpoint(
+                    version_dir, shard_index, 6
+                )
+                table = params.embedding_params["embedding"]
+                ids = list(table.embedding_vectors.keys())
+                self.assertTrue(all(i % 6 == shard_index for i in ids))
+                self.assertTrue(
+                    np.array_equal(table.get(ids), self.embedding_values[ids])
+                )
+                restored_ids.extend(ids)
+            self.assertEqual(sorted(restored_ids), list(range(30)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,12 +17,21 @@ import unittest
 
 import numpy as np
 
+from elasticdl.proto import elasticdl_pb2
+from elasticdl.python.common.chunked_checkpoint import MANIFEST_FILE
+from elasticdl.python.common.hash_utils import string_to_id
 from elasticdl.python.common.model_utils import (
     get_module_file_path,
     load_module,
 )
-from elasticdl.python.common.save_utils import CheckpointSaver
+from elasticdl.python.common.save_utils import (
+    AsyncCheckpointWriter,
+    CheckpointSaver,
+    load_pb_from_file,
+)
+from elasticdl.python.ps.embedding_table import EmbeddingTable
 from elasticdl.python.ps.parameters import Parameters
+from elasticdl_client.common.constants import CheckpointFormat
 
 _model_zoo_path = os.path.dirname(os.path.realpath(__file__))
 _model_file = get_module_file_path(_model_zoo_path, "test_module.custom_model")
@@ -38,6 +47,13 @@ def save_variables_to_checkpoint(root_dir, params):
     return ckpt_dir
 
 
+def save_checkpoint_with_delta(checkpoint_saver, params):
+    is_delta = not checkpoint_saver.need_full_checkpoint(params.version)
+    dirty_rows = params.pop_dirty_rows()
+    model_pb = params.to_model_pb(dirty_rows if is_delta else None)
+    checkpoint_saver.save(params.version, model_pb, False, is_delta=is_delta)
+
+
 class SaveUtilsTest(unittest.TestCase):
     def setUp(self):
         init_var = m["custom_model"]().trainable_variables
@@ -84,6 +100,251 @@ class SaveUtilsTest(unittest.TestCase):
                     )
                 )
 
+    def testSaveLoadDeltaCheckpoint(self):
+        table = EmbeddingTable("embedding", 2, "zeros")
+        self.params.embedding_params["embedding"] = table
+        self.params.track_dirty_rows()
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpoint_saver = CheckpointSaver(
+                tempdir, 1, 2, False, full_checkpoint_steps=3
+            )
+            table.set([0, 1, 2, 3], np.ones((4, 2), np.float32))
+            self.params.version = 3
+            save_checkpoint_with_delta(checkpoint_saver, self.params)
+
+            table.set([1], np.array([[2.0, 2.0]], np.float32))
+            self.params.version = 4
+            save_checkpoint_with_delta(checkpoint_saver, self.params)
+
+            # A lazily initialized embedding vector is also dirty
+            table.get([7])
+            table.set([2], np.array([[3.0, 3.0]], np.float32))
+            self.params.version = 5
+            save_checkpoint_with_delta(checkpoint_saver, self.params)
+
+            self.assertEqual(
+                os.listdir(os.path.join(tempdir, "version-5")),
+                ["variables-0-of-1.delta.ckpt"],
+            )
+            model_pb = load_pb_from_file(
+                elasticdl_pb2.Model(),
+                os.path.join(
+                    tempdir, "version-5", "variables-0-of-1.delta.ckpt"
+                ),
+            )
+            self.assertEqual(
+                sorted(model_pb.embedding_tables["embedding"].ids), [2, 7]
+            )
+
+            restore_params = CheckpointSaver.restore_params_from_checkpoint(
+                os.path.join(tempdir, "version-5"), 0, 1
+            )
+            self.assertEqual(restore_params.version, 5)
+            restore_table = restore_params.embedding_params["embedding"]
+            self.assertTrue(
+                np.array_equal(
+                    restore_table.get([0, 1, 2, 3, 7]),
+                    [[1, 1], [2, 2], [3, 3], [1, 1], [0, 0]],
+                )
+            )
+
+            # The full checkpoint is deleted with the delta checkpoints
+            # based on it.
+            for version in [6, 7]:
+                self.params.version = version
+                save_checkpoint_with_delta(checkpoint_saver, self.params)
+            self.assertEqual(
+                sorted(os.listdir(tempdir)), ["version-6", "version-7"]
+            )
+
+    def testAsyncCheckpointWriter(self):
+        table = EmbeddingTable("embedding", 2, "zeros")
+        table.set([0, 1], np.ones((2, 2), np.float32))
+        self.params.embedding_params["embedding"] = table
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpoint_saver = CheckpointSaver(tempdir, 1, 0, False)
+            writer = AsyncCheckpointWriter(checkpoint_saver, 1)
+            self.params.version = 1
+            writer.submit(self.params.snapshot())
+
+            # The updates after the snapshot are not in the checkpoint
+            table.set([1], np.array([[2.0, 2.0]], np.float32))
+            self.params.version = 2
+            writer.submit(self.params.snapshot())
+            writer.flush()
+
+            restore_params = CheckpointSaver.restore_params_from_checkpoint(
+                os.path.join(tempdir, "version-1"), 0, 1
+            )
+            self.assertEqual(restore_params.version, 1)
+            self.assertTrue(
+                np.array_equal(
+                    restore_params.embedding_params["embedding"].get([0, 1]),
+                    [[1, 1], [1, 1]],
+                )
+            )
+            for var_name in self.params.non_embedding_params:
+                self.assertTrue(
+                    np.array_equal(
+                        self.params.non_embedding_params[var_name].numpy(),
+                        restore_params.non_embedding_params[var_name].numpy(),
+                    )
+                )
+            self.assertTrue(
+                os.path.exists(
+                    os.path.join(tempdir, "version-2", "variables-0-of-1.ckpt")
+                )
+            )
+
+    def testSaveLoadChunkedCheckpoint(self):
+        table = EmbeddingTable("embedding", 2, "zeros")
+        table.set(list(range(10)), np.random.rand(10, 2).astype(np.float32))
+        self.params.embedding_params["embedding"] = table
+        self.params.version = 6
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpoint_saver = CheckpointSaver(
+                tempdir,
+                3,
+                5,
+                False,
+                checkpoint_format=CheckpointFormat.CHUNKED,
+            )
+            checkpoint_saver.save_snapshot(self.params.snapshot())
+            ckpt_version_dir = os.path.join(tempdir, "version-6")
+            self.assertEqual(
+                os.listdir(ckpt_version_dir), ["variables-0-of-1.chunks"]
+            )
+            self.assertEqual(
+                CheckpointSaver.get_version_from_checkpoint(ckpt_version_dir),
+                6,
+            )
+            self.assertTrue(
+                CheckpointSaver.check_checkpoint_valid(ckpt_version_dir)
+            )
+
+            # Restore the parameters into 2 shards
+            restored_ids = []
+            restored_var_names = []
+            for shard_index in range(2):
+                shard_params = CheckpointSaver.restore_params_from_checkpoint(
+                    ckpt_version_dir, shard_index, 2
+                )
+                self.assertEqual(shard_params.version, 6)
+                restore_table = shard_params.embedding_params["embedding"]
+                ids = list(restore_table.embedding_vectors.keys())
+                self.assertTrue(all(i % 2 == shard_index for i in ids))
+                self.assertTrue(
+                    np.array_equal(restore_table.get(ids), table.get(ids))
+                )
+                restored_ids.extend(ids)
+                restored_var_names.extend(
+                    shard_params.non_embedding_params.keys()
+                )
+            self.assertEqual(sorted(restored_ids), list(range(10)))
+            self.assertEqual(
+                sorted(restored_var_names),
+                sorted(self.params.non_embedding_params.keys()),
+            )
+
+    def testRestoreCheckpointOfShards(self):
+        values = np.random.rand(20, 2).astype(np.float32)
+        self.params.version = 8
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpoint_saver = CheckpointSaver(tempdir, 3, 5, False)
+            # Save the checkpoint of 4 PS instances, each of which owns
+            # the parameters routed to it
+            for ps_id in range(4):
+                params = Parameters()
+                params.version = self.params.version
+                for name, var in self.params.non_embedding_params.items():
+                    if string_to_id(name, 4) == ps_id:
+                        params.non_embedding_params[name] = var
+                table = EmbeddingTable("embedding", 2, "zeros")
+                ids = list(range(ps_id, 20, 4))
+                table.set(ids, values[ids])
+                params.embedding_params["embedding"] = table
+                checkpoint_saver.save_snapshot(params.snapshot(), ps_id, 4)
+            ckpt_version_dir = os.path.join(tempdir, "version-8")
+
+            self.assertEqual(
+                CheckpointSaver._get_shard_files_to_restore(
+                    ckpt_version_dir, 1, 4
+                ),
+                ["variables-1-of-4.ckpt"],
+            )
+            self.assertEqual(
+                CheckpointSaver._get_shard_files_to_restore(
+                    ckpt_version_dir, 1, 2
+                ),
+                ["variables-1-of-4.ckpt", "variables-3-of-4.ckpt"],
+            )
+            self.assertEqual(
+                CheckpointSaver._get_shard_files_to_restore(
+                    ckpt_version_dir, 5, 8
+                ),
+                ["variables-1-of-4.ckpt"],
+            )
+            self.assertEqual(
+                len(
+                    CheckpointSaver._get_shard_files_to_restore(
+                        ckpt_version_dir, 0, 3
+                    )
+                ),
+                4,
+            )
+
+            for shard_num in [1, 2, 3, 4, 8]:
+                restored_ids = []
+                restored_var_names = []
+                for shard_index in range(shard_num):
+                    shard_params = (
+                        CheckpointSaver.restore_params_from_checkpoint(
+                            ckpt_version_dir, shard_index, shard_num
+                        )
+                    )
+                    self.assertEqual(shard_params.version, 8)
+                    restore_table = shard_params.embedding_params["embedding"]
+                    ids = list(restore_table.embedding_vectors.keys())
+                    self.assertTrue(
+                        all(i % shard_num == shard_index for i in ids)
+                    )
+                    self.assertTrue(
+                        np.array_equal(restore_table.get(ids), values[ids])
+                    )
+                    restored_ids.extend(ids)
+                    restored_var_names.extend(
+                        shard_params.non_embedding_params.keys()
+                    )
+                self.assertEqual(sorted(restored_ids), list(range(20)))
+                self.assertEqual(
+                    sorted(restored_var_names),
+                    sorted(self.params.non_embedding_params.keys()),
+                )
+
+    def testCheckChunkedCheckpointWithoutManifest(self):
+        self.params.version = 6
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpoint_saver = CheckpointSaver(
+                tempdir,
+                3,
+                5,
+                False,
+                checkpoint_format=CheckpointFormat.CHUNKED,
+            )
+            checkpoint_saver.save_snapshot(self.params.snapshot())
+            ckpt_version_dir = os.path.join(tempdir, "version-6")
+            os.remove(
+                os.path.join(
+                    ckpt_version_dir, "variables-0-of-1.chunks", MANIFEST_FILE
+                )
+            )
+            self.assertFalse(
+                CheckpointSaver.check_checkpoint_valid(ckpt_version_dir)
+            )
+            self.assertIsNone(
+                CheckpointSaver.get_valid_lastest_version_dir(tempdir)
+            )
+
     def testGetVersionFromCheckpoint(self):
         with tempfile.TemporaryDirectory() as tempdir:
             self.params.version = 100
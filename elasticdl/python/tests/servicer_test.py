@@ -12,6 +12,7 @@
 # limitations under the License.
 
 import random
+import time
 import unittest
 from collections import defaultdict
 from unittest.mock import MagicMock, Mock
@@ -124,6 +125,54 @@ class ServicerTest(unittest.TestCase):
             tasks,
         )
 
+    def test_get_tasks_and_report_task_results(self):
+        self.master.task_manager = create_task_manager(
+            [("shard_1", 0, 10), ("shard_2", 0, 9)], []
+        )
+        task_manager = self.master.task_manager
+        master = MasterServicer(
+            task_manager, self.master.instance_manager, None, None,
+        )
+
+        req = elasticdl_pb2.GetTasksRequest(worker_id=1, num_tasks=3)
+        res = master.get_tasks(req, None)
+        self.assertEqual(len(res.tasks), 3)
+        task_ids = [task.task_id for task in res.tasks]
+        # Every leased task is a doing task of the worker.
+        self.assertEqual(sorted(task_manager._doing), sorted(task_ids))
+
+        # The tasks of a dead worker are recovered one by one.
+        task_manager.recover_tasks(1)
+        self.assertEqual(task_manager._doing, {})
+        self.assertEqual(len(task_manager._todo), 7)
+
+        req.worker_id = 2
+        req.num_tasks = 10
+        res = master.get_tasks(req, None)
+        self.assertEqual(len(res.tasks), 7)
+        results = elasticdl_pb2.ReportTaskResultsRequest()
+        for task in res.tasks[1:]:
+            results.results.add(task_id=task.task_id)
+        master.report_task_results(results, None)
+        self.assertEqual(list(task_manager._doing), [res.tasks[0].task_id])
+
+        # The start time of a leased task is reset when the worker starts it
+        task_id = res.tasks[0].task_id
+        lease_time = task_manager._doing[task_id][2]
+        time.sleep(0.01)
+        results = elasticdl_pb2.ReportTaskResultsRequest(
+            started_task_id=task_id
+        )
+        master.report_task_results(results, None)
+        start_time = task_manager._doing[task_id][2]
+        self.assertGreater(start_time, lease_time)
+        self.assertEqual(task_manager._worker_start_task_time[2], start_time)
+
+        # No task is left, so a WAIT task is returned.
+        res = master.get_tasks(req, None)
+        self.assertEqual(len(res.tasks), 1)
+        self.assertEqual(res.tasks[0].type, elasticdl_pb2.WAIT)
+
     def test_get_comm_rank(self):
         self.master.rendezvous_server = HorovodRendezvousServer(
             server_host="localhost"
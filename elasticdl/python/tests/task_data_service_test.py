@@ -0,0 +1,189 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, Mock
+
+import tensorflow as tf
+
+from elasticdl.proto import elasticdl_pb2
+from elasticdl.python.data.reader.data_reader import AbstractDataReader
+from elasticdl.python.master.task_manager import _Task
+from elasticdl.python.worker.data_shard_service import DataShardService
+from elasticdl.python.worker.record_cache import RecordCache
+from elasticdl.python.worker.task_data_service import TaskDataService
+
+
+class _SlowDataReader(object):
+    """Reads the indices of the records in a task, where the earlier
+    tasks are slower to read."""
+
+    records_output_types = tf.string
+
+    def __init__(self, **kwargs):
+        pass
+
+    def read_records(self, task):
+        for i in range(task.shard.start, task.shard.end):
+            time.sleep(0.001 * (10 - task.shard.start // 10))
+            if task.shard.name == "bad_file":
+                raise ValueError("Failed to read %s" % task.shard.name)
+            yield str(i)
+
+
+class _RangeDataReader(AbstractDataReader):
+    """Reads the indices of the records in a task."""
+
+    def read_records(self, task):
+        for i in range(task.shard.start, task.shard.end):
+            yield str(i)
+
+    def create_shards(self):
+        return []
+
+    @property
+    def records_output_types(self):
+        return tf.string
+
+
+class TaskDataServiceTest(unittest.TestCase):
+    def _create_task_data_service(
+        self,
+        tasks,
+        num_read_ahead_tasks,
+        data_reader=_SlowDataReader,
+        read_batch_size=0,
+    ):
+        master_client = Mock()
+        master_client.get_task = MagicMock(
+            side_effect=tasks + [_Task("", 0, 0, elasticdl_pb2.WAIT)]
+        )
+        master_client.report_task_result = MagicMock()
+        data_shard_service = DataShardService(10, master_client)
+        task_data_service = TaskDataService(
+            data_shard_service,
+            custom_data_reader=data_reader,
+            num_read_ahead_tasks=num_read_ahead_tasks,
+            read_batch_size=read_batch_size,
+        )
+        return task_data_service, master_client
+
+    def test_read_ahead(self):
+        tasks = []
+        for i in range(6):
+            task = _Task("f1", i * 10, (i + 1) * 10, elasticdl_pb2.TRAINING)
+            task.task_id = i
+            tasks.append(task)
+        task_data_service, master_client = self._create_task_data_service(
+            tasks, num_read_ahead_tasks=3
+        )
+        records = []
+        for data in task_data_service._gen():
+            records.append(int(data))
+            if len(records) % 10 == 0:
+                self.assertEqual(
+                    task_data_service.get_current_task().task_id,
+                    len(records) // 10 - 1,
+                )
+                task_data_service.report_record_done(10)
+        # The records are in the order of the tasks.
+        self.assertEqual(records, list(range(60)))
+        reported_task_ids = [
+            call[0][0]
+            for call in master_client.report_task_result.call_args_list
+        ]
+        self.assertEqual(reported_task_ids, list(range(6)))
+
+    def test_read_error(self):
+        tasks = [
+            _Task("f1", 0, 10, elasticdl_pb2.TRAINING),
+            _Task("bad_file", 10, 20, elasticdl_pb2.TRAINING),
+        ]
+        task_data_service, _ = self._create_task_data_service(
+            tasks, num_read_ahead_tasks=2
+        )
+        gen = task_data_service._gen()
+        records = [int(next(gen)) for _ in range(10)]
+        self.assertEqual(records, list(range(10)))
+        self.assertRaises(ValueError, next, gen)
+
+    def test_record_cache(self):
+        tasks = [
+            _Task("f1", 0, 10, elasticdl_pb2.TRAINING),
+            _Task("f1", 10, 20, elasticdl_pb2.TRAINING),
+        ]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            task_data_service, _ = self._create_task_data_service(
+                tasks + tasks, num_read_ahead_tasks=0
+            )
+            task_data_service._record_cache = RecordCache(cache_dir, 1 << 20)
+            task_data_service.data_reader.read_records = Mock(
+                wraps=task_data_service.data_reader.read_records
+            )
+            records = [int(data) for data in task_data_service._gen()]
+            # The tasks of the second epoch are read from the cache.
+            self.assertEqual(records, list(range(20)) * 2)
+            self.assertEqual(
+                task_data_service.data_reader.read_records.call_count, 2
+            )
+
+    def test_record_cache_eviction(self):
+        tasks = [
+            _Task("f1", i * 10, (i + 1) * 10, elasticdl_pb2.TRAINING)
+            for i in range(3)
+        ]
+        records = [str(i) * 100 for i in range(10)]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            record_cache = RecordCache(cache_dir, 2500)
+            for task in tasks:
+                record_cache.put(task, records)
+            # The least recently used task is evicted.
+            self.assertIsNone(record_cache.get(tasks[0]))
+            self.assertEqual(record_cache.get(tasks[1]), records)
+            record_cache.put(tasks[0], records)
+            self.assertIsNone(record_cache.get(tasks[2]))
+            self.assertEqual(record_cache.get(tasks[0]), records)
+            self.assertLessEqual(record_cache.total_bytes, 2500)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_read_batches(self):
+        tasks = [
+            _Task("f1", 0, 10, elasticdl_pb2.TRAINING),
+            _Task("f1", 10, 15, elasticdl_pb2.TRAINING),
+        ]
+        for num_read_ahead_tasks in [0, 2]:
+            task_data_service, _ = self._create_task_data_service(
+                tasks,
+                num_read_ahead_tasks,
+                data_reader=_RangeDataReader,
+                read_batch_size=4,
+            )
+            batches = list(task_data_service._gen())
+            self.assertEqual(
+                [len(batch) for batch in batches], [4, 4, 2, 4, 1]
+            )
+            task_data_service, _ = self._create_task_data_service(
+                tasks,
+                num_read_ahead_tasks,
+                data_reader=_RangeDataReader,
+                read_batch_size=4,
+            )
+            records = [int(data) for data in task_data_service.get_dataset()]
+            self.assertEqual(records, list(range(15)))
+
+
+if __name__ == "__main__":
+    unittest.main()
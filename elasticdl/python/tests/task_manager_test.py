@@ -124,6 +124,53 @@ class TaskManagerTest(unittest.TestCase):
             sorted([v._info() for _, v in got_tasks]), epoch_tasks
         )
 
+    def test_prefer_cached_tasks(self):
+        task_d = create_task_manager([("f1", 0, 10), ("f2", 0, 10)], [], 2)
+        task_d._prefer_cached_tasks = True
+        request = elasticdl_pb2.ReportTaskResultRequest()
+        worker_tasks = {0: set(), 1: set()}
+        for i in range(8):
+            task_id, task = task_d.get(i % 2)
+            worker_tasks[i % 2].add(task._info())
+            request.task_id = task_id
+            task_d.report(request, True)
+
+        # In the second epoch, each worker gets the tasks it completed.
+        for i in range(8):
+            task_id, task = task_d.get(i % 2)
+            self.assertIn(task._info(), worker_tasks[i % 2])
+            request.task_id = task_id
+            task_d.report(request, True)
+
+        # The tasks of a dead worker are no longer preferred for it.
+        task_d.recover_tasks(0)
+        self.assertEqual(set(task_d._task_readers.values()), {1})
+
+    def test_prefer_sequential_tasks(self):
+        task_d = create_task_manager([("f1", 0, 10), ("f2", 0, 10)], [])
+        task_d._prefer_sequential_tasks = True
+        # Dispatch the first tasks of f1 and f2 first without preferences.
+        tasks = sorted(
+            task_d._todo,
+            key=lambda task: (task.shard.start, task.shard.name),
+            reverse=True,
+        )
+        task_d._todo.clear()
+        task_d._todo.extend(tasks)
+        task_d._todo_by_start = {
+            (task.shard.name, task.shard.start): task for task in task_d._todo
+        }
+        worker_tasks = {0: [], 1: []}
+        for i in range(8):
+            _, task = task_d.get(i % 2)
+            worker_tasks[i % 2].append(task._info()[:3])
+        for worker_id, shard_name in [(0, "f1"), (1, "f2")]:
+            self.assertEqual(
+                worker_tasks[worker_id],
+                [(shard_name, i, min(i + 3, 10)) for i in range(0, 10, 3)],
+            )
+        self.assertFalse(task_d._todo_by_start)
+
     def test_invoke_train_end_callback(self):
         task_d = create_task_manager([("f1", 0, 10), ("f2", 0, 10)], [])
         task_d._add_deferred_callback_create_train_end_task()
@@ -131,7 +178,7 @@ class TaskManagerTest(unittest.TestCase):
         task_d.invoke_deferred_callback()
         self.assertEqual(len(task_d._todo), 1)
         self.assertEqual(
-            task_d._todo[0].type, elasticdl_pb2.TRAIN_END_CALLBACK
+            next(iter(task_d._todo)).type, elasticdl_pb2.TRAIN_END_CALLBACK
         )
 
     def test_check_and_reassign_timeout_tasks(self):
@@ -140,8 +187,8 @@ class TaskManagerTest(unittest.TestCase):
         task_count = len(task_manager._todo)
         task_start_time = time.time() - 1000
         task_manager._worker_start_task_time[0] = task_start_time
-        task_manager._doing[0] = (0, task_manager._todo[0], task_start_time)
-        task_manager._todo.pop()
+        task = task_manager._todo.pop()
+        task_manager._doing[0] = (0, task, task_start_time)
 
         threading.Thread(
             target=task_manager._check_and_reassign_timeout_tasks,
@@ -15,8 +15,9 @@ import csv
 import os
 import tempfile
 from collections.__init__ import namedtuple
-from contextlib import closing
+from contextlib import closing, contextmanager
 from pathlib import Path
+from unittest import mock
 from unittest.mock import Mock
 
 import grpc
@@ -24,6 +25,7 @@ import numpy as np
 import recordio
 import tensorflow as tf
 from odps import ODPS
+from odps.models import Record, Schema
 
 from elasticdl.proto import elasticdl_pb2
 from elasticdl.python.common.args import parse_worker_args
@@ -33,6 +35,9 @@ from elasticdl.python.common.model_utils import (
     get_module_file_path,
     load_module,
 )
+from elasticdl.python.data import odps_io
+from elasticdl.python.data.odps_io import pa
+from elasticdl.python.data.reader import odps_reader
 from elasticdl.python.data.recordio_gen.frappe_recordio_gen import (
     load_raw_data,
 )
@@ -44,7 +49,10 @@ from elasticdl.python.tests.mock_service import _server
 from elasticdl.python.worker.master_client import MasterClient
 from elasticdl.python.worker.ps_client import PSClient
 from elasticdl.python.worker.worker import Worker
-from elasticdl_client.common.constants import DistributionStrategy
+from elasticdl_client.common.constants import (
+    CheckpointFormat,
+    DistributionStrategy,
+)
 
 
 class PserverArgs(object):
@@ -53,7 +61,13 @@ class PserverArgs(object):
         grads_to_wait=8,
         lr_staleness_modulation=0,
         sync_version_tolerance=0,
+        num_backup_workers=0,
+        sync_deadline_secs=0,
+        ssp_staleness=0,
+        ssp_worker_timeout_secs=60,
+        embedding_pull_window_ms=0,
         use_async=False,
+        use_hogwild=False,
         model_zoo=None,
         model_def=None,
         optimizer="optimizer",
@@ -63,9 +77,13 @@ class PserverArgs(object):
         namespace="default",
         master_addr="test:1111",
         evaluation_steps=0,
+        max_evaluation_snapshots=0,
         checkpoint_dir=None,
         checkpoint_steps=None,
         keep_checkpoint_max=0,
+        full_checkpoint_steps=0,
+        max_inflight_checkpoints=0,
+        checkpoint_format=CheckpointFormat.PROTOBUF,
         ps_id=0,
         num_ps_pods=1,
         num_workers=2,
@@ -74,7 +92,13 @@ class PserverArgs(object):
         self.grads_to_wait = grads_to_wait
         self.lr_staleness_modulation = lr_staleness_modulation
         self.sync_version_tolerance = sync_version_tolerance
+        self.num_backup_workers = num_backup_workers
+        self.sync_deadline_secs = sync_deadline_secs
+        self.ssp_staleness = ssp_staleness
+        self.ssp_worker_timeout_secs = ssp_worker_timeout_secs
+        self.embedding_pull_window_ms = embedding_pull_window_ms
         self.use_async = use_async
+        self.use_hogwild = use_hogwild
         self.model_zoo = model_zoo
         self.model_def = model_def
         self.optimizer = optimizer
@@ -84,9 +108,13 @@ class PserverArgs(object):
         self.namespace = namespace
         self.master_addr = master_addr
         self.evaluation_steps = evaluation_steps
+        self.max_evaluation_snapshots = max_evaluation_snapshots
         self.checkpoint_dir = checkpoint_dir
         self.checkpoint_steps = checkpoint_steps
         self.keep_checkpoint_max = keep_checkpoint_max
+        self.full_checkpoint_steps = full_checkpoint_steps
+        self.max_inflight_checkpoints = max_inflight_checkpoints
+        self.checkpoint_format = checkpoint_format
         self.ps_id = ps_id
         self.num_ps_pods = num_ps_pods
         self.num_workers = num_workers
@@ -109,6 +137,8 @@ class TaskManagerArgs(object):
         checkpoint_dir_for_init="",
         custom_training_loop=False,
         task_fault_tolerance=True,
+        record_cache_dir="",
+        prefer_sequential_tasks=False,
     ):
         self.training_data = training_data
         self.validation_data = validation_data
@@ -123,6 +153,8 @@ class TaskManagerArgs(object):
         self.checkpoint_dir_for_init = checkpoint_dir_for_init
         self.custom_training_loop = custom_training_loop
         self.task_fault_tolerance = task_fault_tolerance
+        self.record_cache_dir = record_cache_dir
+        self.prefer_sequential_tasks = prefer_sequential_tasks
 
 
 class DatasetName(object):
@@ -631,6 +663,79 @@ def delete_iris_odps_table_from_env():
     )
 
 
+class FakeODPSTable(object):
+    """A local stand-in of an ODPS table with the rows in memory for the
+    tests of the ODPS readers. The readers opened with `arrow=True` yield
+    pyarrow record batches of at most `arrow_batch_size` rows like the
+    readers of the Arrow tunnel."""
+
+    def __init__(self, column_names, column_types, rows, arrow_batch_size=4):
+        self.schema = Schema.from_lists(column_names, column_types)
+        self.rows = rows
+        self._arrow_batch_size = arrow_batch_size
+
+    def open_reader(self, partition=None, reopen=False, arrow=False, **kw):
+        return _FakeODPSTableReader(self, arrow, self._arrow_batch_size)
+
+
+class _FakeODPSTableReader(object):
+    def __init__(self, table, arrow, arrow_batch_size):
+        self._table = table
+        self._arrow = arrow
+        self._arrow_batch_size = arrow_batch_size
+        self.count = len(table.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def read(self, start=0, count=None, columns=None):
+        if columns is None:
+            columns = self._table.schema.names
+        if count is None:
+            count = self.count - start
+        column_indices = [
+            self._table.schema.names.index(column) for column in columns
+        ]
+        rows = [
+            [row[i] for i in column_indices]
+            for row in self._table.rows[start : start + count]  # noqa: E203
+        ]
+        if not self._arrow:
+            column_types = [
+                self._table.schema[column].type for column in columns
+            ]
+            schema = Schema.from_lists(columns, column_types)
+            for row in rows:
+                yield Record(schema=schema, values=row)
+            return
+        for i in range(0, len(rows), self._arrow_batch_size):
+            batch_rows = rows[i : i + self._arrow_batch_size]  # noqa: E203
+            yield pa.RecordBatch.from_arrays(
+                [
+                    pa.array([row[j] for row in batch_rows])
+                    for j in range(len(columns))
+                ],
+                names=columns,
+            )
+
+
+@contextmanager
+def fake_odps_table(table, arrow=False):
+    """Make the ODPS readers read the `FakeODPSTable` instead of a table
+    in MaxCompute, with the Arrow tunnel if `arrow` is true."""
+    odps_client = Mock()
+    odps_client.get_table.return_value = table
+    with mock.patch.object(odps_io, "ODPS", return_value=odps_client):
+        with mock.patch.object(odps_reader, "ODPS", return_value=odps_client):
+            with mock.patch.object(
+                odps_io, "_is_arrow_tunnel_supported", return_value=arrow
+            ):
+                yield
+
+
 def get_random_batch(batch_size):
     shape = (28, 28)
     shape = (batch_size,) + shape
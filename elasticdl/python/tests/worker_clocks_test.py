@@ -0,0 +1,70 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+
+from elasticdl.python.ps.worker_clocks import WorkerClocks
+
+
+class WorkerClocksTest(unittest.TestCase):
+    def test_tick_within_staleness(self):
+        clocks = WorkerClocks(staleness=2, worker_timeout_secs=60)
+        self.assertTrue(clocks.tick(0))
+        self.assertTrue(clocks.tick(1))
+        self.assertTrue(clocks.tick(0))
+        self.assertTrue(clocks.tick(0))
+        self.assertEqual(clocks.get_clocks(), {0: 3, 1: 2})
+
+        # A new worker joins with the clock of the slowest worker, and
+        # advances it by the gradients pushed
+        self.assertTrue(clocks.tick(2))
+        self.assertEqual(clocks.get_clocks()[2], 3)
+
+    def test_reject_fastest_worker(self):
+        clocks = WorkerClocks(staleness=1, worker_timeout_secs=60)
+        for worker_id in [0, 1, 0, 0, 0]:
+            self.assertTrue(clocks.tick(worker_id))
+
+        # Worker 0 is too far ahead until worker 1 catches up
+        self.assertFalse(clocks.tick(0))
+        self.assertEqual(clocks.get_clocks(), {0: 4, 1: 2})
+        self.assertTrue(clocks.tick(1))
+        self.assertTrue(clocks.tick(0))
+        self.assertEqual(clocks.get_clocks(), {0: 5, 1: 3})
+
+    def test_join_does_not_block_workers_at_staleness_limit(self):
+        clocks = WorkerClocks(staleness=1, worker_timeout_secs=60)
+        for worker_id in [0, 1, 0, 0]:
+            self.assertTrue(clocks.tick(worker_id))
+        # Worker 0 is at the staleness limit of the slowest worker 1.
+        self.assertEqual(clocks.get_clocks(), {0: 3, 1: 2})
+
+        # A joining worker does not lower the slowest clock.
+        self.assertTrue(clocks.tick(2))
+        self.assertTrue(clocks.tick(0))
+        self.assertEqual(clocks.get_clocks(), {0: 4, 1: 2, 2: 3})
+
+    def test_admit_when_worker_leaves(self):
+        clocks = WorkerClocks(staleness=0, worker_timeout_secs=0.5)
+        for worker_id in [0, 1, 0, 0]:
+            self.assertTrue(clocks.tick(worker_id))
+        self.assertFalse(clocks.tick(0))
+
+        time.sleep(1)
+        self.assertTrue(clocks.tick(0))
+        self.assertEqual(clocks.get_clocks(), {0: 4})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,8 +20,19 @@ from elasticdl.python.common.constants import TaskExecCounterKey
 
 class DataShardService(object):
     def __init__(
-        self, batch_size, master_client=None,
+        self, batch_size, master_client=None, num_tasks_per_lease=1,
     ):
+        """
+        Args:
+            batch_size: The default number of records in a batch.
+            master_client: A `MasterClient` to get tasks and report task
+                results.
+            num_tasks_per_lease: If larger than 1, the training tasks are
+                leased from the master by `get_tasks` in batches of this
+                size and kept in a local queue. The task results are
+                reported by `report_task_results` in batches, at the latest
+                when the worker starts the next leased task.
+        """
         self._mc = master_client
         self._batch_size = batch_size
         self._lock = threading.Lock()
@@ -29,12 +40,21 @@ class DataShardService(object):
         self._reported_record_count = 0
         self._current_task = None
         self._pending_tasks = deque()
+        self._num_tasks_per_lease = num_tasks_per_lease
+        self._leased_tasks = deque()
+        self._task_results = []
 
     def get_current_task(self):
         return self._current_task
 
     def get_task(self, task_type=None):
-        task = self._mc.get_task(task_type)
+        if self._num_tasks_per_lease > 1 and task_type in (
+            None,
+            elasticdl_pb2.TRAINING,
+        ):
+            task = self._get_leased_task()
+        else:
+            task = self._mc.get_task(task_type)
         # TODO Use task type to determine whether there are new tasks or not
         if task.shard.name and task.type == elasticdl_pb2.TRAINING:
             self._pending_tasks.append(task)
@@ -42,6 +62,29 @@ class DataShardService(object):
                 self._current_task = task
         return task
 
+    def _get_leased_task(self):
+        if not self._leased_tasks:
+            with self._lock:
+                # Report the results of the completed tasks before leasing
+                # new tasks, so the master knows the progress.
+                self._flush_task_results()
+            self._leased_tasks.extend(
+                self._mc.get_tasks(self._num_tasks_per_lease)
+            )
+            return self._leased_tasks.popleft()
+        task = self._leased_tasks.popleft()
+        with self._lock:
+            # Report the results of the completed tasks together with the
+            # start of the task, so the master knows the progress and the
+            # execution time of the task.
+            self._flush_task_results(started_task_id=task.task_id)
+        return task
+
+    def _flush_task_results(self, started_task_id=0):
+        if self._task_results or started_task_id:
+            self._mc.report_task_results(self._task_results, started_task_id)
+            self._task_results = []
+
     def _report_task(self, task, err_msg=""):
         if self._failed_record_count != 0:
             exec_counters = {
@@ -49,9 +92,21 @@ class DataShardService(object):
             }
         else:
             exec_counters = None
-        self._mc.report_task_result(
-            task.task_id, err_msg, exec_counters=exec_counters
-        )
+        if self._num_tasks_per_lease > 1:
+            self._task_results.append((task.task_id, err_msg, exec_counters))
+            # Report a failed task at once so that the master can retry it
+            # soon. Also report if the worker has no leased or pending task,
+            # since it may not lease tasks any more.
+            if (
+                err_msg
+                or not (self._leased_tasks or self._pending_tasks)
+                or len(self._task_results) >= self._num_tasks_per_lease
+            ):
+                self._flush_task_results()
+        else:
+            self._mc.report_task_result(
+                task.task_id, err_msg, exec_counters=exec_counters
+            )
 
     def report_batch_done(self, batch_size=None, err_msg=""):
         """
@@ -84,8 +139,7 @@ class DataShardService(object):
                         self._pending_tasks[0].shard.end
                         - self._pending_tasks[0].shard.start
                     )
-                    self._pending_tasks.popleft()
-                    self._report_task(task, err_msg)
+                    self._report_task(self._pending_tasks.popleft(), err_msg)
                     self._failed_record_count = 0
                 if self._pending_tasks:
                     self._current_task = self._pending_tasks[0]
@@ -48,7 +48,7 @@ def main():
     master_client = MasterClient(build_channel(master_addr), worker_id)
 
     ps_client = (
-        build_ps_client(args.ps_addrs, logger)
+        build_ps_client(args.ps_addrs, logger, worker_id)
         if args.distribution_strategy == DistributionStrategy.PARAMETER_SERVER
         else None
     )
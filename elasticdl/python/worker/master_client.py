@@ -68,6 +68,56 @@ class MasterClient:
             res = elasticdl_pb2.Task()
         return res
 
+    def get_tasks(self, num_tasks, task_type=None):
+        """Lease at most `num_tasks` tasks from master in one call.
+
+        Args:
+            num_tasks: int
+            the maximum number of tasks to lease.
+
+            task_type: elasticdl_pb.TaskType
+            the training phase, c.f. /elasticdl/proto/elasticdl.proto
+
+        Returns:
+            a list of the task units assigned by master. If no task is
+            leased, the list contains a single task, e.g. a WAIT task.
+        """
+
+        req = elasticdl_pb2.GetTasksRequest()
+        req.worker_id = self._worker_id
+        req.num_tasks = num_tasks
+        if task_type is not None:
+            req.task_type = task_type
+
+        try:
+            res = self._stub.get_tasks(req)
+        except Exception:
+            # the master node would stop the gRPC service if no more tasks.
+            # And this will result a gRPC call exception.
+            return [elasticdl_pb2.Task()]
+        return list(res.tasks) or [elasticdl_pb2.Task()]
+
+    def report_task_results(self, results, started_task_id=0):
+        """Report the results of several tasks to master in one call.
+
+        Args:
+            results: list
+            a list of `(task_id, err_msg, exec_counters)` tuples with the
+            same meaning as the arguments of `report_task_result`.
+
+            started_task_id: int
+            the ID of the leased task which the worker starts, or 0.
+        """
+        req = elasticdl_pb2.ReportTaskResultsRequest()
+        req.started_task_id = started_task_id
+        for task_id, err_msg, exec_counters in results:
+            report = req.results.add()
+            report.task_id = task_id
+            report.err_message = err_msg
+            if isinstance(exec_counters, dict):
+                report.exec_counters.update(exec_counters)
+        return self._stub.report_task_results(req)
+
     def report_task_result(self, task_id, err_msg, exec_counters=None):
         """Report task result to master.
 
@@ -89,7 +139,9 @@ class MasterClient:
             report.exec_counters.update(exec_counters)
         return self._stub.report_task_result(report)
 
-    def report_evaluation_metrics(self, model_outputs, labels):
+    def report_evaluation_metrics(
+        self, model_outputs, labels, model_version=0
+    ):
         """Report evaluation metrics to master.
 
         Args:
@@ -98,6 +150,9 @@ class MasterClient:
 
             labels: numpy array
             the labels on training dataset.
+
+            model_version: int
+            the model version of the evaluation task.
         """
         req = elasticdl_pb2.ReportEvaluationMetricsRequest()
         for name, output in model_outputs.items():
@@ -106,6 +161,44 @@ class MasterClient:
         labels = np.concatenate(labels)
         serialize_ndarray(labels, req.labels)
         req.worker_id = self._worker_id
+        req.model_version = model_version
+        self._stub.report_evaluation_metrics(req)
+
+    def report_evaluation_metric_states(
+        self, metric_states, model_version=0, model_outputs=None, labels=None
+    ):
+        """Report the evaluation metric states computed by the worker to
+        master, which merges the states of all workers.
+
+        Args:
+            metric_states: dict
+            the metric states returned by
+            `EvaluationMetrics.get_metric_states`.
+
+            model_version: int
+            the model version of the evaluation task.
+
+            model_outputs: dict
+            the model outputs in numpy.ndarray for the metrics whose states
+            cannot be merged. If None, no model outputs are reported.
+
+            labels: numpy.ndarray
+            the labels reported with `model_outputs`.
+        """
+        req = elasticdl_pb2.ReportEvaluationMetricsRequest()
+        if model_outputs is not None:
+            for name, output in model_outputs.items():
+                serialize_ndarray(output, req.model_outputs[name])
+            serialize_ndarray(labels, req.labels)
+        for output_name, states in metric_states.items():
+            for metric_name, values in states.items():
+                state_pb = req.metric_states.add()
+                state_pb.output_name = output_name
+                state_pb.metric_name = metric_name
+                for value in values:
+                    serialize_ndarray(value, state_pb.variables.add())
+        req.worker_id = self._worker_id
+        req.model_version = model_version
         self._stub.report_evaluation_metrics(req)
 
     def get_model_version(self):
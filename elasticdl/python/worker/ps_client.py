@@ -11,6 +11,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+
 import grpc
 import numpy as np
 
@@ -34,13 +36,14 @@ CONNECT_PS_MAX_RETRIES = 3
 CONNECT_PS_TIMEOUT = 300
 
 
-def build_ps_client(ps_addrs, logger):
+def build_ps_client(ps_addrs, logger, worker_id=0):
     """
     Build a PSClient from the address list.
     Args:
         ps_addrs: a string of common separated format that stands for a list
             of address for parameter servers
         logger: a logger object
+        worker_id: the id of the worker which uses the PSClient
     Returns:
         A PS Client.
     """
@@ -79,13 +82,14 @@ def build_ps_client(ps_addrs, logger):
                 % addr.split(".")[0]
             )
 
-    ps_client = PSClient(ps_channels)
+    ps_client = PSClient(ps_channels, worker_id)
 
     return ps_client
 
 
 class PSClient(object):
-    def __init__(self, ps_channels):
+    def __init__(self, ps_channels, worker_id=0):
+        self.worker_id = worker_id
         self.ps_stubs = [
             elasticdl_pb2_grpc.PserverStub(c) for c in ps_channels
         ]
@@ -93,12 +97,16 @@ class PSClient(object):
         self.parameter_to_ps = {}
         self.ps_to_parameter = {}
 
-    def pull_embedding_vectors(self, layer_name, embedding_ids):
+    def pull_embedding_vectors(
+        self, layer_name, embedding_ids, snapshot_version=0
+    ):
         """
         Pulls and returns embedding vectors ordered by the embedding ids.
         Args:
             layer_name: layer name
             embedding_ids: a list of ids
+            snapshot_version: if positive, pull from the parameter snapshots
+                of this model version kept by PS for evaluation
         Return:
             embedding_vectors: a 2-D numpy ndarray
         """
@@ -116,6 +124,7 @@ class PSClient(object):
             req = elasticdl_pb2.PullEmbeddingVectorRequest()
             req.name = layer_name
             req.ids.extend(embedding_ids)
+            req.snapshot_version = snapshot_version
             pb_future = self.ps_stubs[ps_id].pull_embedding_vectors.future(req)
             pb_future_and_id_pairs.append((pb_future, ps_id))
         for pb_future, ps_id in pb_future_and_id_pairs:
@@ -158,9 +167,13 @@ class PSClient(object):
                 serialize_ndarray(p.values, model.dense_parameters[p.name])
         self.ps_stubs[ps_id].push_model(model)
 
-    def pull_dense_parameters(self, ps_ids, model_versions):
+    def pull_dense_parameters(
+        self, ps_ids, model_versions, snapshot_version=0
+    ):
         """
-        Pull dense parameters from PS.
+        Pull dense parameters from PS. If `snapshot_version` is positive,
+        pull from the parameter snapshots of this model version kept by PS
+        for evaluation.
         """
         variable_future_and_id_pairs = []
         for ps_id in ps_ids:
@@ -170,6 +183,7 @@ class PSClient(object):
             # async grpc call
             req = elasticdl_pb2.PullDenseParametersRequest()
             req.version = model_versions[ps_id]
+            req.snapshot_version = snapshot_version
             var_future = stub.pull_dense_parameters.future(req)
             variable_future_and_id_pairs.append((var_future, ps_id))
 
@@ -196,7 +210,8 @@ class PSClient(object):
          - sparse gradients of ElasticDL embedding layers
         """
         reqs = [
-            elasticdl_pb2.PushGradientsRequest() for i in range(self.ps_num)
+            elasticdl_pb2.PushGradientsRequest(worker_id=self.worker_id)
+            for i in range(self.ps_num)
         ]
         ps_grads = {}
 
@@ -278,8 +293,13 @@ class PSClient(object):
 
         accepted = False
         max_version = -1
-        for report_future in report_futures:
+        for ps_id, report_future in enumerate(report_futures):
             res = report_future.result()
+            # In SSP mode, the PS asks the worker to push the gradients
+            # again later if the worker runs too far ahead of the others.
+            while res.retry_after_secs > 0:
+                time.sleep(res.retry_after_secs)
+                res = self.ps_stubs[ps_id].push_gradients(reqs[ps_id])
             if res.accepted:
                 accepted = True
             if res.version > max_version:
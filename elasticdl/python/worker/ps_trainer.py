@@ -62,6 +62,15 @@ class ParameterServerTrainer(Trainer):
         self._var_created = False
         self._timing = timing
         self._get_model_steps = args.get_model_steps
+        # The model version to evaluate against the parameter snapshots on
+        # PS, and the version of the snapshot in the local model if any.
+        self._eval_snapshot_version = 0
+        self._local_snapshot_version = 0
+
+    def _lookup_embedding(self, name, ids):
+        return self._ps_client.pull_embedding_vectors(
+            name, ids, self._eval_snapshot_version
+        )
 
     def _init_embedding_layer(self):
         """
@@ -69,9 +78,7 @@ class ParameterServerTrainer(Trainer):
         """
         self._embedding_layers = find_layer(self._model, Embedding)
         for layer in self._embedding_layers:
-            layer.set_lookup_embedding_func(
-                self._ps_client.pull_embedding_vectors
-            )
+            layer.set_lookup_embedding_func(self._lookup_embedding)
 
     def _init_embedding_column(self):
         self._embedding_columns = []
@@ -87,9 +94,7 @@ class ParameterServerTrainer(Trainer):
                         )
 
         for column in self._embedding_columns:
-            column.set_lookup_embedding_func(
-                self._ps_client.pull_embedding_vectors
-            )
+            column.set_lookup_embedding_func(self._lookup_embedding)
 
     def _check_name_conflict_of_embedding_layer_and_column(self):
         if not self._embedding_layers or not self._embedding_columns:
@@ -373,6 +378,7 @@ class ParameterServerTrainer(Trainer):
         training for models with elasticdl.layers.embedding does not
         support tf.function decorator
         """
+        self._local_snapshot_version = 0
         if not train_with_local_model:
             self._get_model()
         if self._train_eagerly:
@@ -427,8 +433,37 @@ class ParameterServerTrainer(Trainer):
         else:
             self._evaluation_result[key].append(labels.numpy())
 
-    def evaluate_minibatch(self, features, labels):
-        outputs = self._forward_process(features)
+    def _get_model_snapshot(self, model_version):
+        """Pulls the dense parameters of the snapshot of `model_version`
+        on PS into the local model.
+        """
+        ps_num = self._ps_client.ps_num
+        dense_params, _ = self._ps_client.pull_dense_parameters(
+            [i for i in range(ps_num)],
+            [-1 for _ in range(ps_num)],
+            snapshot_version=model_version,
+        )
+        for k, v in dense_params.items():
+            self._non_embed_vars[k].assign(v)
+        # The local model is not the latest model on PS now, so the next
+        # training minibatch pulls all dense parameters.
+        self._model_versions_from_ps = [-1 for _ in range(ps_num)]
+        self._local_snapshot_version = model_version
+
+    def evaluate_minibatch(self, features, labels, model_version=None):
+        """Evaluates the model with a minibatch. If `model_version` is
+        positive, the model is evaluated against the parameter snapshot of
+        the version on PS. PS falls back to the latest parameters if it
+        does not keep the snapshot.
+        """
+        if model_version is not None and model_version > 0:
+            if self._local_snapshot_version != model_version:
+                self._get_model_snapshot(model_version)
+            self._eval_snapshot_version = model_version
+        try:
+            outputs = self._forward_process(features)
+        finally:
+            self._eval_snapshot_version = 0
         if not isinstance(outputs, dict):
             outputs = {MetricsDictKey.MODEL_OUTPUT: outputs}
         self._collect_evaluation_result(outputs, labels)
@@ -0,0 +1,117 @@
+# Copyright 2020 The ElasticDL Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from elasticdl.python.common.log_utils import default_logger as logger
+
+
+class RecordCache(object):
+    """A worker-local cache of the records read by the data reader for
+    tasks, keyed by the shard name and the record range of a task. The
+    records of a task are pickled into a file in `cache_dir`, which can be
+    on a local disk or in shared memory like "/dev/shm". The least
+    recently used files are evicted when the total size exceeds
+    `max_bytes`. The batches of the records of a task read with
+    different batch sizes are cached separately.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Ordered from the least to the most recently used,
+        # from the key to the file size.
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        # Remove the files left by a previous worker with the directory.
+        for filename in os.listdir(cache_dir):
+            if filename.endswith((".pkl", ".tmp")):
+                os.remove(os.path.join(cache_dir, filename))
+
+    @staticmethod
+    def task_key(task, batch_size=0):
+        return (task.shard.name, task.shard.start, task.shard.end, batch_size)
+
+    def _path(self, key):
+        digest = hashlib.md5(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self._cache_dir, digest + ".pkl")
+
+    def get(self, task, batch_size=0):
+        """Return the list of cached records of the task, or of their
+        batches if `batch_size` is positive, or `None` if they are not
+        cached."""
+        key = self.task_key(task, batch_size)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning("Failed to read the cached records: %s" % e)
+            self._remove(key)
+            return None
+
+    def put(self, task, records, batch_size=0):
+        """Cache the records of the task, or their batches if
+        `batch_size` is positive, and evict the least recently used
+        records if the cache is full."""
+        key = self.task_key(task, batch_size)
+        data = pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self._max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = "%s.%d.tmp" % (path, threading.get_ident())
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to cache the records: %s" % e)
+            return
+
+        evicted_keys = []
+        with self._lock:
+            self._total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            while self._total_bytes > self._max_bytes:
+                evicted_key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                evicted_keys.append(evicted_key)
+        for evicted_key in evicted_keys:
+            self._remove_file(evicted_key)
+
+    def _remove(self, key):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+        self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __contains__(self, task):
+        return self.task_key(task) in self._entries
@@ -11,8 +11,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import queue
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import tensorflow as tf
 
@@ -20,6 +24,11 @@ from elasticdl.proto import elasticdl_pb2
 from elasticdl.python.common.log_utils import default_logger as logger
 from elasticdl.python.data.reader.data_reader_factory import create_data_reader
 
+# The maximum number of records buffered for a read-ahead task.
+_READ_AHEAD_BUFFER_SIZE = 1024
+# The marker of the end of the records of a read-ahead task.
+_END_OF_TASK = object()
+
 
 class TaskDataService(object):
     def __init__(
@@ -28,11 +37,45 @@ class TaskDataService(object):
         custom_data_reader=None,
         data_reader_params=None,
         data_origin=None,
+        num_read_ahead_tasks=0,
+        record_cache=None,
+        read_batch_size=0,
     ):
+        """
+        Args:
+            data_shard_service: A `DataShardService` to get tasks from the
+                master and report the processed records.
+            custom_data_reader: The function to create a custom data reader.
+            data_reader_params: The keyword arguments to create the data
+                reader.
+            data_origin: The data origin to create the data reader.
+            num_read_ahead_tasks: If positive, the training tasks are
+                leased ahead and read concurrently in this many threads.
+                The records are still yielded in the order of the tasks,
+                so `DataShardService` accounts the records to the right
+                tasks.
+            record_cache: A `RecordCache` to cache the records of the
+                tasks, so that the tasks of the later epochs are read from
+                the local cache instead of the data source.
+            read_batch_size: If positive, the training records are read
+                with `read_batches` of the data reader in batches of this
+                size, and the dataset from `get_dataset` unbatches them, so
+                `feed` still gets the records one by one.
+        """
         self._data_shard_service = data_shard_service
+        self._num_read_ahead_tasks = num_read_ahead_tasks
+        self._record_cache = record_cache
+        self._read_batch_size = read_batch_size
         self._create_data_reader_fn = create_data_reader
         if custom_data_reader is not None:
             self._create_data_reader_fn = custom_data_reader
+        elif num_read_ahead_tasks > 0:
+            # The data reader keeps the resources for the tasks read
+            # concurrently, e.g. the idle processes of the ODPS reader.
+            data_reader_params = dict(
+                data_reader_params or {},
+                num_read_ahead_tasks=num_read_ahead_tasks,
+            )
         self._lock = threading.Lock()
         self._pending_train_end_callback_task = None
         if data_reader_params:
@@ -48,6 +91,10 @@ class TaskDataService(object):
     def get_current_task(self):
         return self._data_shard_service.get_current_task()
 
+    def close(self):
+        """Release the resources held by the data reader."""
+        self.data_reader.close()
+
     def report_record_done(self, count, err_msg=""):
         self._data_shard_service.report_batch_done(count, err_msg)
 
@@ -62,7 +109,7 @@ class TaskDataService(object):
 
         def gen():
             for task in tasks:
-                for data in self.data_reader.read_records(task):
+                for data in self._read_records(task):
                     if data:
                         yield data
 
@@ -105,6 +152,8 @@ class TaskDataService(object):
         ds = tf.data.Dataset.from_generator(
             self._gen, self.data_reader.records_output_types
         )
+        if self._read_batch_size > 0:
+            ds = ds.unbatch()
         return ds
 
     def _gen(self):
@@ -112,14 +161,121 @@ class TaskDataService(object):
         A generator supports the iter() protocol (e.g. a generator function),
         used to create a `tf.data.Dataset` object from a list of tasks.
         """
+        if self._num_read_ahead_tasks > 0:
+            for data in self._read_ahead_gen():
+                yield data
+            return
+
         while True:
             task = self._data_shard_service.get_task()
             if task.type != elasticdl_pb2.TRAINING:
                 break
 
-            for data in self.data_reader.read_records(task):
-                if data:
+            for data in self._read_training_data(task):
+                yield data
+
+    def _read_training_data(self, task):
+        """Reads the non-empty records of a training task, or the batches
+        of them if `read_batch_size` is positive."""
+        if self._read_batch_size > 0:
+            return self._read_records(task, self._read_batch_size)
+        return (data for data in self._read_records(task) if data)
+
+    def _read_records(self, task, batch_size=0):
+        """Reads the records of a task, or the batches of them if
+        `batch_size` is positive, from the record cache if they are
+        cached, or from the data reader otherwise, in which case the
+        records are cached after all of them are read.
+        """
+        if batch_size > 0:
+            read_fn = functools.partial(
+                self.data_reader.read_batches, batch_size=batch_size
+            )
+        else:
+            read_fn = self.data_reader.read_records
+        if self._record_cache is None:
+            for data in read_fn(task):
+                yield data
+            return
+
+        records = self._record_cache.get(task, batch_size)
+        if records is not None:
+            for data in records:
+                yield data
+            return
+
+        records = []
+        for data in read_fn(task):
+            records.append(data)
+            yield data
+        self._record_cache.put(task, records, batch_size)
+
+    def _read_task_records(self, task, records, stop_event):
+        """Reads the records of a task into the `records` queue in a reader
+        thread. An exception raised by the data reader is put into the
+        queue to be raised by the generator.
+        """
+
+        def _put(item):
+            while not stop_event.is_set():
+                try:
+                    records.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            for data in self._read_training_data(task):
+                if not _put(data):
+                    return
+        except Exception as e:
+            _put(e)
+            return
+        _put(_END_OF_TASK)
+
+    def _read_ahead_gen(self):
+        """Leases up to `num_read_ahead_tasks` training tasks ahead and
+        reads them concurrently, and yields the records task by task in
+        the order of leasing.
+        """
+        stop_event = threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=self._num_read_ahead_tasks,
+            thread_name_prefix="read_ahead",
+        )
+        task_records = deque()
+        has_more_tasks = True
+        try:
+            while True:
+                while (
+                    has_more_tasks
+                    and len(task_records) < self._num_read_ahead_tasks
+                ):
+                    task = self._data_shard_service.get_task()
+                    if task.type != elasticdl_pb2.TRAINING:
+                        has_more_tasks = False
+                        break
+                    records = queue.Queue(maxsize=_READ_AHEAD_BUFFER_SIZE)
+                    executor.submit(
+                        self._read_task_records, task, records, stop_event
+                    )
+                    task_records.append(records)
+                if not task_records:
+                    break
+
+                records = task_records.popleft()
+                while True:
+                    data = records.get()
+                    if data is _END_OF_TASK:
+                        break
+                    if isinstance(data, Exception):
+                        raise data
                     yield data
+        finally:
+            # Stop the reader threads if the generator is closed early.
+            stop_event.set()
+            executor.shutdown(wait=False)
 
     def get_eval_dataset(self):
         def _gen():
@@ -128,7 +284,7 @@ class TaskDataService(object):
                 return
             logger.info("the evaluation task_id: %d" % task.task_id)
             self.current_eval_task = task
-            for data in self.data_reader.read_records(task):
+            for data in self._read_records(task):
                 if data:
                     yield data
 
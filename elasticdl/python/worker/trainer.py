@@ -31,8 +31,8 @@ class Trainer(object):
         pass
 
     @abstractmethod
-    def evaluate_minibatch(features, labels):
-        """"Evaluate the model using a minibatch data"""
+    def evaluate_minibatch(features, labels, model_version=None):
+        """"Evaluate the model of `model_version` using a minibatch data"""
         pass
 
     @abstractmethod
@@ -14,10 +14,17 @@
 import os
 import traceback
 
+import numpy as np
 import tensorflow as tf
 
 from elasticdl.proto import elasticdl_pb2
-from elasticdl.python.common.constants import JobType, MetricsDictKey, Mode
+from elasticdl.python.common.constants import (
+    JobType,
+    MetricsDictKey,
+    Mode,
+    WorkerEnv,
+)
+from elasticdl.python.common.evaluation_utils import EvaluationMetrics
 from elasticdl.python.common.log_utils import get_logger
 from elasticdl.python.common.model_handler import ModelHandler
 from elasticdl.python.common.model_utils import (
@@ -31,6 +38,7 @@ from elasticdl.python.elasticdl.callbacks import SavedModelExporter
 from elasticdl.python.worker.allreduce_trainer import AllReduceTrainer
 from elasticdl.python.worker.data_shard_service import DataShardService
 from elasticdl.python.worker.ps_trainer import ParameterServerTrainer
+from elasticdl.python.worker.record_cache import RecordCache
 from elasticdl.python.worker.task_data_service import TaskDataService
 from elasticdl_client.common.constants import DistributionStrategy
 
@@ -85,7 +93,7 @@ class Worker(object):
         self._job_type = args.job_type
         self._minibatch_size = args.minibatch_size
         self._data_shard_service = DataShardService(
-            self._minibatch_size, self._mc
+            self._minibatch_size, self._mc, args.num_tasks_per_lease
         )
         if self._custom_training_loop:
             self._init_training_func_from_args(args)
@@ -132,8 +140,19 @@ class Worker(object):
         self._model_inst.loss = loss
         self._model_version = -1
         self._get_model_steps = args.get_model_steps
+        self._evaluation_metrics = None
 
     def _init_task_data_service(self, args):
+        record_cache = None
+        if args.record_cache_dir:
+            record_cache = RecordCache(
+                os.path.join(
+                    args.record_cache_dir,
+                    "worker-%s"
+                    % os.getenv(WorkerEnv.WORKER_ID, str(os.getpid())),
+                ),
+                args.record_cache_size_mb * 1024 * 1024,
+            )
         self._task_data_service = TaskDataService(
             self._data_shard_service,
             custom_data_reader=self._custom_data_reader,
@@ -141,6 +160,9 @@ class Worker(object):
                 args.data_reader_params
             ),
             data_origin=args.training_data,
+            num_read_ahead_tasks=args.num_read_ahead_tasks,
+            record_cache=record_cache,
+            read_batch_size=args.read_batch_size,
         )
 
     def _init_callbacks(self, args):
@@ -206,7 +228,9 @@ class Worker(object):
         self._timing.start_record_time("batch_process")
         for _ in range(self._max_minibatch_retry_num):
             if task_type == elasticdl_pb2.EVALUATION:
-                self._trainer.evaluate_minibatch(features, labels)
+                self._trainer.evaluate_minibatch(
+                    features, labels, min_model_version
+                )
                 break
             elif task_type == elasticdl_pb2.TRAINING:
                 # TODO: optimize the logic to avoid unnecessary
@@ -260,23 +284,60 @@ class Worker(object):
         err_msg = ""
         for dataset_batch in dataset:
             evaluation_exist = True
+            # The evaluation task is fetched before its first minibatch.
+            eval_task = self._task_data_service.current_eval_task
             data_err_msg = self._safe_process_minibatch(
-                dataset_batch, elasticdl_pb2.EVALUATION, None
+                dataset_batch,
+                elasticdl_pb2.EVALUATION,
+                eval_task.model_version,
             )
             if data_err_msg:
                 err_msg = data_err_msg
                 break
         if evaluation_exist:
             evaluation_result = self._trainer.get_evaluation_result()
-            self._mc.report_evaluation_metrics(
-                model_outputs=evaluation_result[MetricsDictKey.MODEL_OUTPUT],
-                labels=evaluation_result[MetricsDictKey.LABEL],
+            eval_task = self._task_data_service.current_eval_task
+            self._report_evaluation_metric_states(
+                evaluation_result, eval_task.model_version
             )
-            task_id = self._task_data_service.current_eval_task.task_id
+            task_id = eval_task.task_id
             self._mc.report_task_result(task_id, err_msg)
             self._trainer.reset_evaluation_result()
         return evaluation_exist
 
+    def _report_evaluation_metric_states(
+        self, evaluation_result, model_version
+    ):
+        """Computes the metrics of the evaluation task on the worker and
+        reports the metric states, so the master only merges the states
+        instead of computing the metrics with all model outputs.
+        """
+        if self._evaluation_metrics is None:
+            self._evaluation_metrics = EvaluationMetrics(
+                self._eval_metrics_fn()
+            )
+        self._evaluation_metrics.reset_metric_states()
+        labels = np.concatenate(evaluation_result[MetricsDictKey.LABEL])
+        model_outputs = {
+            name: np.concatenate(outputs)
+            for name, outputs in evaluation_result[
+                MetricsDictKey.MODEL_OUTPUT
+            ].items()
+        }
+        self._evaluation_metrics.update_evaluation_metrics(
+            model_outputs, labels, additive=True
+        )
+        # The metrics whose states cannot be merged are computed by the
+        # master with the model outputs and labels.
+        if not self._evaluation_metrics.has_non_additive_metrics():
+            model_outputs = labels = None
+        self._mc.report_evaluation_metric_states(
+            self._evaluation_metrics.get_metric_states(),
+            model_version,
+            model_outputs,
+            labels,
+        )
+
     def _process_train_end_callback_task_if_needed(self):
         train_end_task = self._task_data_service.get_train_end_callback_task()
         if train_end_task:
@@ -353,9 +414,13 @@ class Worker(object):
         for dataset_batch in dataset:
             if self._job_type == JobType.TRAINING_WITH_EVALUATION:
                 # Give the worker a chance to process an evaluation task
-                # during training if the task exists
+                # during training if the task exists. Only one task is
+                # processed, so training is interleaved with the tasks of
+                # concurrent evaluation jobs.
                 evaluation_task_executed = (
-                    True if self._evaluate_only() else evaluation_task_executed
+                    True
+                    if self._evaluate_only(max_tasks=1)
+                    else evaluation_task_executed
                 )
 
             task = self._task_data_service.get_current_task()
@@ -399,9 +464,12 @@ class Worker(object):
 
         self._process_train_end_callback_task_if_needed()
 
-    def _evaluate_only(self):
+    def _evaluate_only(self, max_tasks=None):
         """
         Only evaluate the model on the worker.
+        Args:
+            max_tasks: The maximum number of evaluation tasks to process.
+                If None, process the tasks until there is none.
         """
         evaluation_task_executed = False
         with tf.device("/device:cpu:0"):
@@ -413,12 +481,14 @@ class Worker(object):
             self._task_data_service.data_reader.metadata,
         )
         dataset = dataset.batch(self._minibatch_size).prefetch(1)
-        while True:
+        processed_tasks = 0
+        while max_tasks is None or processed_tasks < max_tasks:
             # The dataset will re-call generator each time when
             # calling iterator of the dataset.
             evaluation_exist = self._process_evaluation_if_exist(dataset)
             if not evaluation_exist:
                 break
+            processed_tasks += 1
         del dataset
         evaluation_task_executed = True
         return evaluation_task_executed
@@ -453,15 +523,18 @@ class Worker(object):
         Fetches task from master with and performs training, evaluation
         or prediction.
         """
-        if self._job_type == JobType.PREDICTION_ONLY:
-            self._predict_only()
-        elif self._job_type == JobType.EVALUATION_ONLY:
-            self._evaluate_only()
-        else:
-            if self._custom_training_loop:
-                self._elastic_allreduce_train()
+        try:
+            if self._job_type == JobType.PREDICTION_ONLY:
+                self._predict_only()
+            elif self._job_type == JobType.EVALUATION_ONLY:
+                self._evaluate_only()
             else:
-                self._train_and_evaluate()
+                if self._custom_training_loop:
+                    self._elastic_allreduce_train()
+                else:
+                    self._train_and_evaluate()
+        finally:
+            self._task_data_service.close()
 
     def _elastic_allreduce_train(self):
         """
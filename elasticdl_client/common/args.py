@@ -13,7 +13,10 @@
 
 from itertools import chain
 
-from elasticdl_client.common.constants import DistributionStrategy
+from elasticdl_client.common.constants import (
+    CheckpointFormat,
+    DistributionStrategy,
+)
 
 DEFAULT_BASE_IMAGE = "python:3.6"
 
@@ -102,6 +105,44 @@ def add_train_params(parser):
         "If 0, step-based evaluation is disabled",
         default=0,
     )
+    parser.add_argument(
+        "--max_concurrent_evaluation_jobs",
+        type=int,
+        help="The maximum number of evaluation jobs of different model "
+        "versions running at the same time",
+        default=1,
+    )
+    add_bool_param(
+        parser=parser,
+        name="--collapse_pending_evaluations",
+        default=False,
+        help="If True, only the latest model version waiting for evaluation "
+        "is evaluated and the earlier waiting versions are skipped",
+    )
+    parser.add_argument(
+        "--evaluation_sample_fraction",
+        type=float,
+        help="The fraction of evaluation tasks randomly sampled for an "
+        "evaluation job which is not a full evaluation",
+        default=1.0,
+    )
+    parser.add_argument(
+        "--evaluation_early_stop_tolerance",
+        type=float,
+        help="If positive, an evaluation job which is not a full evaluation "
+        "stops once the half-width of the 95%% confidence interval of "
+        "every metric over the evaluation tasks is within this tolerance",
+        default=0.0,
+    )
+    parser.add_argument(
+        "--full_evaluation_steps",
+        type=int,
+        help="Evaluate the model with all evaluation tasks every this many "
+        "steps if evaluation_sample_fraction or "
+        "evaluation_early_stop_tolerance is set. If 0, all of the step-based "
+        "evaluation jobs are sampled",
+        default=0,
+    )
     parser.add_argument(
         "--checkpoint_dir_for_init",
         help="The checkpoint directory to initialize the training model",
@@ -177,11 +218,111 @@ def add_train_params(parser):
         help="If true, task manager supports fault tolerance, otherwise "
         "no fault tolerance.",
     )
+    add_bool_param(
+        parser=parser,
+        name="--prefer_sequential_tasks",
+        default=False,
+        help="If true, the master prefers to dispatch to a worker the "
+        "training task following the previous one it got in the same "
+        "shard, so that the worker reads the shard sequentially",
+    )
     parser.add_argument(
         "--job_command",
         help="The command executed in the pod launched by the master",
         default="",
     )
+    add_ps_params(parser)
+
+
+def add_ps_params(parser):
+    """The arguments of the features only supported by the Python PS. The
+    master launches the Python PS instead of the Go PS if any of them is
+    set."""
+    add_bool_param(
+        parser=parser,
+        name="--use_hogwild",
+        default=False,
+        help="If True, PS applies embedding updates with striped locks "
+        "of the embedding rows instead of the global lock in asynchronous "
+        "SGD",
+    )
+    parser.add_argument(
+        "--num_backup_workers",
+        type=non_neg_int,
+        help="The number of backup workers in synchronous SGD. The job "
+        "should run grads_to_wait + num_backup_workers workers. PS updates "
+        "the model with the first grads_to_wait gradients of a version and "
+        "rejects the rest as stale regardless of sync_version_tolerance",
+        default=0,
+    )
+    parser.add_argument(
+        "--sync_deadline_secs",
+        type=float,
+        help="The maximum seconds PS waits for grads_to_wait gradients in "
+        "synchronous SGD. PS updates the model with the gradients received "
+        "when the deadline expires. If 0, PS waits without a deadline",
+        default=0,
+    )
+    parser.add_argument(
+        "--ssp_staleness",
+        type=non_neg_int,
+        help="The staleness threshold of stale synchronous parallel (SSP) "
+        "in asynchronous SGD. PS blocks a worker which is more than this "
+        "many steps ahead of the slowest live worker. If 0, SSP is disabled",
+        default=0,
+    )
+    parser.add_argument(
+        "--ssp_worker_timeout_secs",
+        type=float,
+        help="In SSP, a worker is considered to have left if it has not "
+        "pushed gradients for this many seconds",
+        default=60,
+    )
+    parser.add_argument(
+        "--embedding_pull_window_ms",
+        type=float,
+        help="The milliseconds PS waits to coalesce the concurrent pulls of "
+        "an embedding table into one lookup, e.g. 0.5. If 0, every pull "
+        "looks up the table on its own",
+        default=0,
+    )
+    parser.add_argument(
+        "--max_evaluation_snapshots",
+        type=non_neg_int,
+        help="The maximum number of parameter snapshots PS keeps for "
+        "evaluation. If positive, PS takes a snapshot of every model "
+        "version to evaluate, and workers evaluate the version against its "
+        "snapshot while training continues. If 0, workers evaluate against "
+        "the latest parameters",
+        default=0,
+    )
+    parser.add_argument(
+        "--full_checkpoint_steps",
+        type=non_neg_int,
+        help="Save a full checkpoint every this many steps, and delta "
+        "checkpoints with only the updated embedding vectors at the other "
+        "checkpoint steps. It should be a multiple of checkpoint_steps. "
+        "If 0, all checkpoints are full",
+        default=0,
+    )
+    parser.add_argument(
+        "--max_inflight_checkpoints",
+        type=non_neg_int,
+        help="The maximum number of checkpoints being saved in background. "
+        "PS takes a snapshot of parameters for a checkpoint and saves it "
+        "in background while training continues. If the limit is reached, "
+        "PS waits before taking the next snapshot. If 0, PS saves "
+        "checkpoints synchronously",
+        default=0,
+    )
+    parser.add_argument(
+        "--checkpoint_format",
+        choices=[CheckpointFormat.PROTOBUF, CheckpointFormat.CHUNKED],
+        help="The format to save a checkpoint shard. `protobuf` saves a "
+        "Model protobuf file, which is limited to 2GB. `chunked` streams "
+        "the parameters to raw binary files with a manifest",
+        default=CheckpointFormat.PROTOBUF,
+    )
 
 
 def add_evaluate_params(parser):
@@ -475,6 +616,47 @@ def add_common_args_between_master_and_worker(parser):
         help="The data reader parameters in a string separated by semi-colon "
         'used to instantiate the data reader, e.g. "param1=1; param2=2"',
     )
+    parser.add_argument(
+        "--num_read_ahead_tasks",
+        type=int,
+        default=0,
+        help="The number of training tasks a worker leases ahead and reads "
+        "concurrently. If 0, the worker reads the tasks one by one",
+    )
+    parser.add_argument(
+        "--num_tasks_per_lease",
+        type=int,
+        default=1,
+        help="The number of training tasks a worker leases from the master "
+        "in one call. The results of the tasks are also reported in "
+        "batches if it is larger than 1",
+    )
+    parser.add_argument(
+        "--read_batch_size",
+        type=int,
+        default=0,
+        help="If positive, a worker reads the training records from the "
+        "data reader in batches of this size, which saves the per-record "
+        "overhead for the data readers producing columns natively. If 0, "
+        "the records are read one by one",
+    )
+    parser.add_argument(
+        "--record_cache_dir",
+        type=str,
+        default="",
+        help="The local directory, e.g. on a local disk or in /dev/shm, for "
+        "a worker to cache the records of the tasks it reads, so that the "
+        "tasks of the later epochs are read from the cache. The master "
+        "also prefers to dispatch a task to the worker which has read it. "
+        "If empty, the records are not cached",
+    )
+    parser.add_argument(
+        "--record_cache_size_mb",
+        type=int,
+        default=1024,
+        help="The maximum size in MB of the records cached by a worker. The "
+        "least recently used records are evicted if it is exceeded",
+    )
     parser.add_argument(
         "--distribution_strategy",
         type=str,
@@ -555,6 +737,15 @@ def add_bool_param(parser, name, default, help):
     )
 
 
+def non_neg_int(arg):
+    res = int(arg)
+    if res < 0:
+        raise ValueError(
+            "Non-negative integer argument required. Get %s" % res
+        )
+    return res
+
+
 def build_arguments_from_parsed_result(args, filter_args=None):
     """Reconstruct arguments from parsed result
     Args:
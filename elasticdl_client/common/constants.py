@@ -18,6 +18,11 @@ class DistributionStrategy(object):
     ALLREDUCE = "AllreduceStrategy"
 
 
+class CheckpointFormat(object):
+    PROTOBUF = "protobuf"
+    CHUNKED = "chunked"
+
+
 class BashCommandTemplate(object):
     REDIRECTION = " 2>&1 | tee {}"
     SET_PIPEFAIL = "set -o pipefail;"